@@ -0,0 +1,62 @@
+"""
+Compare response serialization for a page of tasks.
+
+    python benchmarks/bench_serialization.py [--items 1000] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'handlers'))
+
+import serialization  # noqa: E402
+
+
+def make_page(count):
+    return {
+        'tasks': [
+            {
+                'taskId': f'00000000-0000-0000-0000-{index:012d}',
+                'title': f'Task {index}',
+                'description': 'Benchmark task ' * 4,
+                'status': 'pending',
+                'priority': 'medium',
+                'createdAt': '2025-01-01T00:00:00.000000',
+                'updatedAt': '2025-01-01T00:00:00.000000',
+                'dueDate': None,
+                'tags': ['bench', 'load'],
+                'points': Decimal(index % 13),
+                'estimate': Decimal('1.5')
+            }
+            for index in range(count)
+        ],
+        'count': count
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    page = make_page(args.items)
+    candidates = {
+        'json.dumps(default=str)': lambda: json.dumps(page, default=str),
+        'serialization.dumps (stdlib)': lambda: serialization.json.dumps(
+            page, default=serialization._default, separators=(',', ':')
+        ),
+    }
+    if serialization.orjson is not None:
+        candidates['serialization.dumps (orjson)'] = lambda: serialization.dumps(page)
+
+    for name, encode in candidates.items():
+        seconds = min(timeit.repeat(encode, number=args.repeat, repeat=3)) / args.repeat
+        print(f'{name:32} {seconds * 1000:8.3f} ms/page  {len(encode()):>9} bytes')
+
+
+if __name__ == '__main__':
+    main()
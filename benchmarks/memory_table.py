@@ -0,0 +1,573 @@
+"""
+In-memory stand-in for runtime.Table used by the benchmark harness.
+
+It understands the subset of DynamoDB the handlers use: item CRUD, Query on
+global secondary indexes, Scan (including Segment/TotalSegments), paging
+with Limit/ExclusiveStartKey, condition/filter/key-condition/update/projection
+expressions, and the batch calls. An optional per-call latency models the
+network round trip. Read and write capacity units are accumulated in
+`consumed` using DynamoDB's sizing rules (4 KB per RCU, 1 KB per WCU).
+"""
+import bisect
+import copy
+import math
+import re
+import threading
+import time
+import zlib
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+DEFAULT_INDEXES = {
+    'status-index': ('status', 'createdAt'),
+    'due-index': ('dueBucket', 'dueKey'),
+}
+
+_MAX_CHAR = '\uffff'
+
+_TOKEN = re.compile(r'\s*(<>|<=|>=|=|<|>|\(|\)|,|\+|-|#\w+|:\w+|[A-Za-z_][\w.]*)')
+
+
+def _value_size(value):
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, Decimal)):
+        # Numbers take roughly one byte per two significant digits plus one
+        digits = len(str(Decimal(str(value)).normalize()).lstrip('-').replace('.', ''))
+        return (digits + 1) // 2 + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(key.encode('utf-8')) + 1 + _value_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return 3 + sum(1 + _value_size(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return sum(_value_size(item) for item in value)
+    return len(str(value))
+
+
+def item_size(item):
+    """
+    Approximate stored size of an item in bytes: attribute names plus values
+    """
+    if not item:
+        return 0
+    return sum(len(name.encode('utf-8')) + _value_size(value) for name, value in item.items())
+
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise ValueError(f'Cannot parse expression near: {expression[position:]!r}')
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+class _Expression:
+    """
+    Recursive-descent evaluator for DynamoDB condition expressions
+    """
+
+    def __init__(self, expression, names, values):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if expected is not None and (token or '').upper() != expected:
+            raise ValueError(f'Expected {expected}, found {token!r}')
+        self.position += 1
+        return token
+
+    def path(self, token):
+        return self.names.get(token, token) if token.startswith('#') else token
+
+    def operand(self, item):
+        token = self.take()
+        if token.startswith(':'):
+            return self.values[token]
+        if self.peek() == '(':
+            return self.function(token, item)
+        return item.get(self.path(token))
+
+    def function(self, name, item):
+        self.take('(')
+        if name == 'size':
+            value = self.operand(item)
+            self.take(')')
+            return None if value is None else len(value)
+        path = self.path(self.take())
+        arguments = []
+        while self.peek() == ',':
+            self.take(',')
+            arguments.append(self.operand(item))
+        self.take(')')
+        value = item.get(path)
+        if name == 'attribute_exists':
+            return path in item
+        if name == 'attribute_not_exists':
+            return path not in item
+        if name == 'begins_with':
+            return isinstance(value, str) and value.startswith(arguments[0])
+        if name == 'contains':
+            return value is not None and arguments[0] in value
+        raise ValueError(f'Unsupported function: {name}')
+
+    def evaluate(self, item):
+        self.position = 0
+        result = self.or_expression(item)
+        if self.peek() is not None:
+            raise ValueError(f'Unexpected token {self.peek()!r}')
+        return result
+
+    def or_expression(self, item):
+        result = self.and_expression(item)
+        while (self.peek() or '').upper() == 'OR':
+            self.take()
+            right = self.and_expression(item)
+            result = result or right
+        return result
+
+    def and_expression(self, item):
+        result = self.not_expression(item)
+        while (self.peek() or '').upper() == 'AND':
+            self.take()
+            right = self.not_expression(item)
+            result = result and right
+        return result
+
+    def not_expression(self, item):
+        if (self.peek() or '').upper() == 'NOT':
+            self.take()
+            return not self.not_expression(item)
+        return self.primary(item)
+
+    def primary(self, item):
+        if self.peek() == '(':
+            self.take('(')
+            result = self.or_expression(item)
+            self.take(')')
+            return result
+
+        left = self.operand(item)
+        operator = (self.peek() or '').upper()
+        if operator in ('=', '<>', '<', '<=', '>', '>='):
+            self.take()
+            return _compare(left, operator, self.operand(item))
+        if operator == 'BETWEEN':
+            self.take()
+            low = self.operand(item)
+            self.take('AND')
+            high = self.operand(item)
+            return left is not None and _compare(left, '>=', low) and _compare(left, '<=', high)
+        if operator == 'IN':
+            self.take()
+            self.take('(')
+            candidates = [self.operand(item)]
+            while self.peek() == ',':
+                self.take(',')
+                candidates.append(self.operand(item))
+            self.take(')')
+            return left in candidates
+        return bool(left)
+
+
+def _compare(left, operator, right):
+    if operator == '=':
+        return left == right
+    if operator == '<>':
+        return left != right
+    if left is None or right is None or type(left) is not type(right):
+        return False
+    if operator == '<':
+        return left < right
+    if operator == '<=':
+        return left <= right
+    if operator == '>':
+        return left > right
+    return left >= right
+
+
+def _conditional_check_failed(operation):
+    return ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        operation
+    )
+
+
+def _split_top_level(text, separator=','):
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == separator and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+class MemoryTable:
+    """
+    Thread-safe, in-memory table with the runtime.Table call surface
+    """
+
+    def __init__(self, name='memory-tasks', key='taskId', indexes=None, latency=0.0, page_items=1000):
+        self.name = name
+        self.key = key
+        self.indexes = dict(DEFAULT_INDEXES if indexes is None else indexes)
+        self.latency = latency
+        self.page_items = page_items
+        self.calls = {}
+        self.consumed = {'read': 0.0, 'write': 0.0}
+        self._items = {}
+        self._keys = []
+        self._index_entries = {name: {} for name in self.indexes}
+        self._lock = threading.RLock()
+
+    # -------------------------------------------------------------- internals
+
+    def _record(self, operation):
+        # Sleep outside the table lock so concurrent callers overlap like real round trips
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _consume_read(self, size, consistent=False):
+        with self._lock:
+            self.consumed['read'] += max(1, math.ceil(size / 4096)) * (1 if consistent else 0.5)
+
+    def _consume_write(self, *items):
+        with self._lock:
+            self.consumed['write'] += max(1, math.ceil(max(item_size(item) for item in items) / 1024))
+
+    def _index_add(self, item):
+        for name, (hash_key, range_key) in self.indexes.items():
+            if hash_key in item and (range_key is None or range_key in item):
+                entries = self._index_entries[name].setdefault(item[hash_key], [])
+                bisect.insort(entries, (item.get(range_key, '') if range_key else '', item[self.key]))
+
+    def _index_remove(self, item):
+        for name, (hash_key, range_key) in self.indexes.items():
+            if hash_key in item and (range_key is None or range_key in item):
+                entries = self._index_entries[name].get(item[hash_key], [])
+                entry = (item.get(range_key, '') if range_key else '', item[self.key])
+                position = bisect.bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+
+    def _store(self, item):
+        key = item[self.key]
+        previous = self._items.get(key)
+        if previous is not None:
+            self._index_remove(previous)
+        else:
+            bisect.insort(self._keys, key)
+        self._items[key] = item
+        self._index_add(item)
+
+    def _discard(self, key):
+        previous = self._items.pop(key, None)
+        if previous is not None:
+            self._index_remove(previous)
+            position = bisect.bisect_left(self._keys, key)
+            del self._keys[position]
+        return previous
+
+    def _check(self, kwargs, item, operation):
+        condition = kwargs.get('ConditionExpression')
+        if condition and not _Expression(
+            condition, kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues')
+        ).evaluate(item or {}):
+            raise _conditional_check_failed(operation)
+
+    @staticmethod
+    def _project(item, kwargs):
+        projection = kwargs.get('ProjectionExpression')
+        if not projection:
+            return copy.deepcopy(item)
+        names = kwargs.get('ExpressionAttributeNames') or {}
+        fields = [names.get(part.strip(), part.strip()) for part in projection.split(',')]
+        return {field: copy.deepcopy(item[field]) for field in fields if field in item}
+
+    def _page(self, candidates, kwargs, key_for):
+        limit = min(kwargs.get('Limit') or self.page_items, self.page_items)
+        filter_expression = kwargs.get('FilterExpression')
+        evaluator = _Expression(
+            filter_expression, kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues')
+        ) if filter_expression else None
+
+        items, evaluated, last, size = [], 0, None, 0
+        for item in candidates:
+            evaluated += 1
+            last = item
+            size += item_size(item)
+            if evaluator is None or evaluator.evaluate(item):
+                items.append(self._project(item, kwargs))
+            if evaluated >= limit:
+                break
+        else:
+            last = None
+        self._consume_read(size, kwargs.get('ConsistentRead', False))
+
+        result = {'Items': items, 'Count': len(items), 'ScannedCount': evaluated}
+        if last is not None:
+            result['LastEvaluatedKey'] = key_for(last)
+        return result
+
+    # ------------------------------------------------------------ item calls
+
+    def get_item(self, Key, **kwargs):
+        self._record('get_item')
+        with self._lock:
+            item = self._items.get(Key[self.key])
+            self._consume_read(item_size(item), kwargs.get('ConsistentRead', False))
+            return {'Item': self._project(item, kwargs)} if item is not None else {}
+
+    def put_item(self, Item, **kwargs):
+        self._record('put_item')
+        with self._lock:
+            previous = self._items.get(Item[self.key])
+            self._check(kwargs, previous, 'PutItem')
+            self._consume_write(Item, previous)
+            self._store(copy.deepcopy(Item))
+            if kwargs.get('ReturnValues') == 'ALL_OLD' and previous is not None:
+                return {'Attributes': copy.deepcopy(previous)}
+            return {}
+
+    def delete_item(self, Key, **kwargs):
+        self._record('delete_item')
+        with self._lock:
+            previous = self._items.get(Key[self.key])
+            self._check(kwargs, previous, 'DeleteItem')
+            self._consume_write(previous)
+            self._discard(Key[self.key])
+            if kwargs.get('ReturnValues') == 'ALL_OLD' and previous is not None:
+                return {'Attributes': copy.deepcopy(previous)}
+            return {}
+
+    def update_item(self, Key, UpdateExpression, **kwargs):
+        self._record('update_item')
+        with self._lock:
+            previous = self._items.get(Key[self.key])
+            self._check(kwargs, previous, 'UpdateItem')
+
+            item = copy.deepcopy(previous) if previous is not None else dict(Key)
+            self._apply_update(item, UpdateExpression, kwargs)
+            self._consume_write(item, previous)
+            self._store(item)
+
+            return_values = kwargs.get('ReturnValues')
+            if return_values == 'ALL_NEW':
+                return {'Attributes': copy.deepcopy(item)}
+            if return_values == 'ALL_OLD' and previous is not None:
+                return {'Attributes': copy.deepcopy(previous)}
+            return {}
+
+    def _apply_update(self, item, update_expression, kwargs):
+        names = kwargs.get('ExpressionAttributeNames') or {}
+        values = kwargs.get('ExpressionAttributeValues') or {}
+        clauses = re.split(r'\b(SET|REMOVE|ADD|DELETE)\b', update_expression, flags=re.IGNORECASE)
+
+        for action, body in zip(clauses[1::2], clauses[2::2]):
+            action = action.upper()
+            for part in _split_top_level(body):
+                if action == 'SET':
+                    target, value = (side.strip() for side in part.split('=', 1))
+                    item[names.get(target, target)] = self._update_value(value, item, names, values)
+                elif action == 'REMOVE':
+                    item.pop(names.get(part, part), None)
+                elif action == 'ADD':
+                    target, value = part.split(None, 1)
+                    target = names.get(target, target)
+                    delta = values[value.strip()]
+                    if isinstance(delta, set):
+                        item[target] = set(item.get(target, set())) | delta
+                    else:
+                        item[target] = item.get(target, Decimal(0)) + delta
+                elif action == 'DELETE':
+                    target, value = part.split(None, 1)
+                    target = names.get(target, target)
+                    item[target] = set(item.get(target, set())) - values[value.strip()]
+                    if not item[target]:
+                        del item[target]
+
+    def _update_value(self, expression, item, names, values):
+        expression = expression.strip()
+        for operator in ('+', '-'):
+            parts = _split_top_level(expression, operator)
+            if len(parts) == 2:
+                left = self._update_value(parts[0], item, names, values)
+                right = self._update_value(parts[1], item, names, values)
+                return left + right if operator == '+' else left - right
+        if expression.startswith('if_not_exists('):
+            path, default = _split_top_level(expression[len('if_not_exists('):-1])
+            path = names.get(path, path)
+            return item[path] if path in item else self._update_value(default, item, names, values)
+        if expression.startswith('list_append('):
+            first, second = _split_top_level(expression[len('list_append('):-1])
+            return self._update_value(first, item, names, values) + self._update_value(second, item, names, values)
+        if expression.startswith(':'):
+            return copy.deepcopy(values[expression])
+        return copy.deepcopy(item.get(names.get(expression, expression)))
+
+    # ------------------------------------------------------------ read calls
+
+    def scan(self, **kwargs):
+        self._record('scan')
+        with self._lock:
+            segment = kwargs.get('Segment')
+            total_segments = kwargs.get('TotalSegments')
+            start = kwargs.get('ExclusiveStartKey')
+            position = bisect.bisect_right(self._keys, start[self.key]) if start else 0
+            keys = self._keys[position:]
+
+            def candidates():
+                for key in keys:
+                    if segment is not None and zlib.crc32(key.encode('utf-8')) % total_segments != segment:
+                        continue
+                    yield self._items[key]
+
+            return self._page(candidates(), kwargs, lambda item: {self.key: item[self.key]})
+
+    def query(self, KeyConditionExpression, IndexName=None, **kwargs):
+        self._record('query')
+        with self._lock:
+            if IndexName is None:
+                raise ValueError('MemoryTable only supports Query on secondary indexes')
+            hash_key, range_key = self.indexes[IndexName]
+            names = kwargs.get('ExpressionAttributeNames') or {}
+            values = kwargs.get('ExpressionAttributeValues') or {}
+
+            hash_value, range_condition = self._parse_key_condition(KeyConditionExpression, names, values, hash_key)
+            entries = self._index_entries[IndexName].get(hash_value, [])
+            forward = kwargs.get('ScanIndexForward', True)
+            start = kwargs.get('ExclusiveStartKey')
+
+            low, high = 0, len(entries)
+            if range_condition:
+                low, high = self._range_bounds(entries, range_condition)
+            if start:
+                marker = (start.get(range_key, '') if range_key else '', start[self.key])
+                if forward:
+                    low = max(low, bisect.bisect_right(entries, marker))
+                else:
+                    high = min(high, bisect.bisect_left(entries, marker))
+
+            selected = entries[low:high] if forward else entries[low:high][::-1]
+
+            def key_for(item):
+                key = {self.key: item[self.key], hash_key: item[hash_key]}
+                if range_key:
+                    key[range_key] = item[range_key]
+                return key
+
+            return self._page((self._items[task_id] for _, task_id in selected), kwargs, key_for)
+
+    @staticmethod
+    def _parse_key_condition(expression, names, values, hash_key):
+        """
+        Split `hash = :v [AND range-condition]` into the hash value and range condition
+        """
+        match = re.match(r'\s*(\S+)\s*=\s*(:\w+)\s*(?:AND\s+(.*))?$', expression, flags=re.IGNORECASE | re.S)
+        if not match or names.get(match.group(1), match.group(1)) != hash_key:
+            raise ValueError(f'Unsupported key condition: {expression}')
+        hash_value = values[match.group(2)]
+        range_expression = (match.group(3) or '').strip()
+        if not range_expression:
+            return hash_value, None
+
+        between = re.match(r'\S+\s+BETWEEN\s+(:\w+)\s+AND\s+(:\w+)$', range_expression, flags=re.IGNORECASE)
+        if between:
+            return hash_value, ('BETWEEN', values[between.group(1)], values[between.group(2)])
+        prefix = re.match(r'begins_with\s*\(\s*\S+\s*,\s*(:\w+)\s*\)$', range_expression)
+        if prefix:
+            return hash_value, ('begins_with', values[prefix.group(1)])
+        comparison = re.match(r'\S+\s*(<=|>=|=|<|>)\s*(:\w+)$', range_expression)
+        if comparison:
+            return hash_value, (comparison.group(1), values[comparison.group(2)])
+        raise ValueError(f'Unsupported key condition: {expression}')
+
+    @staticmethod
+    def _range_bounds(entries, condition):
+        operator = condition[0]
+        first = (condition[1],)
+        if operator == '=':
+            return bisect.bisect_left(entries, first), bisect.bisect_left(entries, (condition[1], _MAX_CHAR))
+        if operator == '<':
+            return 0, bisect.bisect_left(entries, first)
+        if operator == '<=':
+            return 0, bisect.bisect_left(entries, (condition[1], _MAX_CHAR))
+        if operator == '>':
+            return bisect.bisect_left(entries, (condition[1], _MAX_CHAR)), len(entries)
+        if operator == '>=':
+            return bisect.bisect_left(entries, first), len(entries)
+        if operator == 'BETWEEN':
+            return bisect.bisect_left(entries, first), bisect.bisect_left(entries, (condition[2], _MAX_CHAR))
+        prefix = condition[1]
+        return bisect.bisect_left(entries, (prefix,)), bisect.bisect_left(entries, (prefix + _MAX_CHAR,))
+
+    # ----------------------------------------------------------- batch calls
+
+    def batch_write_item(self, requests):
+        self._record('batch_write_item')
+        with self._lock:
+            for request in requests:
+                if 'PutRequest' in request:
+                    item = request['PutRequest']['Item']
+                    self._consume_write(item, self._items.get(item[self.key]))
+                    self._store(copy.deepcopy(item))
+                else:
+                    self._consume_write(self._discard(request['DeleteRequest']['Key'][self.key]))
+            return []
+
+    def batch_get_item(self, keys, **kwargs):
+        self._record('batch_get_item')
+        with self._lock:
+            items = []
+            for key in keys:
+                item = self._items.get(key[self.key])
+                self._consume_read(item_size(item))
+                if item is not None:
+                    items.append(self._project(item, kwargs))
+            return items, []
+
+    def load(self, items):
+        """
+        Bulk-load items without per-item index maintenance, for seeding large tables
+        """
+        with self._lock:
+            for item in items:
+                self._items[item[self.key]] = item
+            self._keys = sorted(self._items)
+            self._index_entries = {name: {} for name in self.indexes}
+            for name, (hash_key, range_key) in self.indexes.items():
+                entries = self._index_entries[name]
+                for item in self._items.values():
+                    if hash_key in item and (range_key is None or range_key in item):
+                        entries.setdefault(item[hash_key], []).append(
+                            (item.get(range_key, '') if range_key else '', item[self.key])
+                        )
+                for partition in entries.values():
+                    partition.sort()
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,324 @@
+"""
+Replay a mixed workload against the Lambda handlers backed by MemoryTable.
+
+    python benchmarks/run_benchmarks.py --items 100000 --requests 5000 --latency-ms 2
+    python benchmarks/run_benchmarks.py --save benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.2
+    python benchmarks/run_benchmarks.py --replay events.jsonl
+    python benchmarks/run_benchmarks.py --plain-items
+
+Reports p50/p95/p99 latency, handler-side CPU time and (with
+--track-allocations) peak allocated memory per route, plus the average
+stored item size and the read/write capacity units consumed per request.
+Items are stored with the compact codec the handlers use; --plain-items
+stores them verbatim for comparison. Results can be saved
+as a JSON baseline and compared against a previous run; the exit status is
+non-zero when any route regresses by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'handlers'))
+os.environ.setdefault('TASKS_TABLE_NAME', 'benchmark-tasks-table')
+
+import batch_create_task  # noqa: E402
+from codec import EncodedTable, encode_item  # noqa: E402
+import create_task  # noqa: E402
+import delete_task  # noqa: E402
+import get_task  # noqa: E402
+import update_task  # noqa: E402
+from memory_table import MemoryTable, item_size  # noqa: E402
+
+HANDLERS = {
+    'create_task': create_task,
+    'batch_create_task': batch_create_task,
+    'get_task': get_task,
+    'update_task': update_task,
+    'delete_task': delete_task,
+}
+
+STATUSES = ('pending', 'in-progress', 'completed')
+PRIORITIES = ('low', 'medium', 'high')
+
+DEFAULT_MIX = 'get=35,list_status=15,list_page=5,batch_get=5,create=15,update=15,delete=10'
+
+WORDS = (
+    'deploy', 'review', 'customer', 'invoice', 'migrate', 'database', 'follow', 'up', 'with', 'the',
+    'team', 'about', 'release', 'notes', 'and', 'update', 'dashboard', 'before', 'friday', 'budget'
+)
+# Most descriptions are short, a few run to a couple of paragraphs
+DESCRIPTION_WORDS = (0, 0, 5, 12, 30, 80, 250)
+
+
+def synthetic_tasks(count, rng):
+    """
+    Generate `count` stored task items with realistic attribute spread
+    """
+    start = datetime(2024, 1, 1)
+    for index in range(count):
+        created = (start + timedelta(seconds=index * 37)).isoformat()
+        yield {
+            'taskId': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'title': f'Task {index}',
+            'description': ' '.join(rng.choices(WORDS, k=rng.choice(DESCRIPTION_WORDS))),
+            'status': rng.choice(STATUSES),
+            'priority': rng.choice(PRIORITIES),
+            'createdAt': created,
+            'updatedAt': created,
+            # Every third task has a due date, so the due-index holds a realistic fraction
+            'dueDate': (start + timedelta(hours=index)).date().isoformat() if index % 3 == 0 else None,
+            'tags': rng.sample(['ops', 'web', 'mobile', 'infra', 'billing'], rng.randint(0, 3))
+        }
+
+
+class SyntheticWorkload:
+    """
+    Generate (route, handler, event) triples from a weighted route mix
+    """
+
+    def __init__(self, table, mix, rng):
+        self.table = table
+        self.rng = rng
+        self.routes = list(mix)
+        self.weights = [mix[route] for route in self.routes]
+        self.task_ids = list(table._items)
+
+    def random_id(self):
+        return self.rng.choice(self.task_ids) if self.task_ids else str(uuid.uuid4())
+
+    def next(self):
+        route = self.rng.choices(self.routes, self.weights)[0]
+        return (route,) + getattr(self, f'event_{route}')()
+
+    def event_get(self):
+        return 'get_task', {'pathParameters': {'taskId': self.random_id()}}
+
+    def event_list_status(self):
+        params = {'status': self.rng.choice(STATUSES), 'limit': '50'}
+        return 'get_task', {'queryStringParameters': params}
+
+    def event_list_page(self):
+        return 'get_task', {'queryStringParameters': {'limit': '100', 'priority': self.rng.choice(PRIORITIES)}}
+
+    def event_list_due(self):
+        due_before = (datetime(2024, 1, 1) + timedelta(days=self.rng.randint(1, 60))).date().isoformat()
+        return 'get_task', {'queryStringParameters': {'dueBefore': due_before, 'limit': '50'}}
+
+    def event_batch_get(self):
+        ids = ','.join(self.random_id() for _ in range(20))
+        return 'get_task', {'queryStringParameters': {'ids': ids}}
+
+    def event_create(self):
+        body = {'title': 'Benchmark task', 'priority': self.rng.choice(PRIORITIES), 'tags': ['bench']}
+        return 'create_task', {'body': json.dumps(body)}
+
+    def event_update(self):
+        body = {'status': self.rng.choice(STATUSES)}
+        return 'update_task', {'pathParameters': {'taskId': self.random_id()}, 'body': json.dumps(body)}
+
+    def event_delete(self):
+        task_id = self.random_id()
+        if task_id in self.task_ids:
+            self.task_ids.remove(task_id)
+        return 'delete_task', {'pathParameters': {'taskId': task_id}}
+
+    def observe(self, route, response):
+        if route == 'create' and response.get('statusCode') == 201:
+            self.task_ids.append(json.loads(response['body'])['task']['taskId'])
+
+
+def replay_events(path):
+    """
+    Yield (route, handler, event) triples from a JSONL file of recorded events.
+
+    Each line is {"handler": "get_task", "event": {...}} with an optional
+    "route" label; the handler name doubles as the label when it is absent.
+    """
+    with open(path) as source:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            handler = record['handler']
+            if handler not in HANDLERS:
+                raise ValueError(f'Unknown handler in replay file: {handler}')
+            yield record.get('route', handler), handler, record['event']
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    report = {}
+    for route, stats in sorted(samples.items()):
+        latencies = stats['latency_ms']
+        report[route] = {
+            'count': len(latencies),
+            'p50_ms': round(percentile(latencies, 0.50), 4),
+            'p95_ms': round(percentile(latencies, 0.95), 4),
+            'p99_ms': round(percentile(latencies, 0.99), 4),
+            'mean_ms': round(sum(latencies) / len(latencies), 4),
+            'cpu_mean_ms': round(sum(stats['cpu_ms']) / len(latencies), 4),
+            'status_codes': stats['status_codes'],
+        }
+        if stats['alloc_kb']:
+            report[route]['alloc_peak_p50_kb'] = round(percentile(stats['alloc_kb'], 0.50), 2)
+            report[route]['alloc_peak_p99_kb'] = round(percentile(stats['alloc_kb'], 0.99), 2)
+    return report
+
+
+def run(events, track_allocations, observe=None):
+    samples = {}
+    if track_allocations:
+        tracemalloc.start()
+
+    for route, handler_name, event in events:
+        handler = HANDLERS[handler_name].lambda_handler
+        if track_allocations:
+            tracemalloc.reset_peak()
+            baseline_memory = tracemalloc.get_traced_memory()[0]
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        response = handler(event, None)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        stats = samples.setdefault(route, {'latency_ms': [], 'cpu_ms': [], 'alloc_kb': [], 'status_codes': {}})
+        stats['latency_ms'].append(wall * 1000)
+        stats['cpu_ms'].append(cpu * 1000)
+        code = str(response.get('statusCode'))
+        stats['status_codes'][code] = stats['status_codes'].get(code, 0) + 1
+        if track_allocations:
+            stats['alloc_kb'].append((tracemalloc.get_traced_memory()[1] - baseline_memory) / 1024)
+        if observe:
+            observe(route, response)
+
+    if track_allocations:
+        tracemalloc.stop()
+    return summarize(samples)
+
+
+def compare(report, baseline, threshold):
+    """
+    Return human-readable regressions of p95/p99 latency against a baseline
+    """
+    regressions = []
+    for route, current in report.items():
+        previous = baseline.get('routes', {}).get(route)
+        if not previous:
+            continue
+        for metric in ('p95_ms', 'p99_ms', 'cpu_mean_ms'):
+            if previous.get(metric) and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f'{route} {metric}: {previous[metric]:.3f} -> {current[metric]:.3f} '
+                    f'(+{(current[metric] / previous[metric] - 1) * 100:.0f}%)'
+                )
+    return regressions
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        route, _, weight = part.partition('=')
+        if not hasattr(SyntheticWorkload, f'event_{route.strip()}'):
+            raise argparse.ArgumentTypeError(f'Unknown route in mix: {route}')
+        mix[route.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000, help='tasks to seed before the run')
+    parser.add_argument('--requests', type=int, default=2000, help='synthetic requests to issue')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help='route=weight,...')
+    parser.add_argument('--replay', help='JSONL file of recorded handler events to replay instead')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='artificial latency per table call')
+    parser.add_argument('--page-items', type=int, default=1000, help='items per Scan/Query page')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--track-allocations', action='store_true', help='record peak allocations (slower)')
+    parser.add_argument('--plain-items', action='store_true', help='store items verbatim instead of encoded')
+    parser.add_argument('--save', help='write the JSON report to this path')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    table = MemoryTable(latency=args.latency_ms / 1000, page_items=args.page_items)
+    tasks = synthetic_tasks(args.items, rng)
+    table.load(tasks if args.plain_items else (encode_item(task) for task in tasks))
+    handler_table = table if args.plain_items else EncodedTable(table)
+    for module in HANDLERS.values():
+        module.table = handler_table
+
+    if args.replay:
+        routes = run(replay_events(args.replay), args.track_allocations)
+    else:
+        workload = SyntheticWorkload(table, args.mix, rng)
+        events = (workload.next() for _ in range(args.requests))
+        routes = run(events, args.track_allocations, workload.observe)
+
+    requests = sum(stats['count'] for stats in routes.values()) or 1
+    storage = {
+        'encoding': 'plain' if args.plain_items else 'compact',
+        'avg_item_bytes': round(sum(item_size(item) for item in table._items.values()) / max(1, len(table)), 1),
+        'read_units_per_request': round(table.consumed['read'] / requests, 3),
+        'write_units_per_request': round(table.consumed['write'] / requests, 3),
+    }
+
+    report = {
+        'meta': {
+            'items': args.items,
+            'requests': args.requests,
+            'replay': args.replay,
+            'latency_ms': args.latency_ms,
+            'page_items': args.page_items,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'table_calls': table.calls,
+            'recorded_at': datetime.utcnow().isoformat(),
+        },
+        'routes': routes,
+        'storage': storage,
+    }
+
+    print(f"{'route':14} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'cpu ms':>9}")
+    for route, stats in routes.items():
+        print(f"{route:14} {stats['count']:>6} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+              f"{stats['p99_ms']:>9.3f} {stats['cpu_mean_ms']:>9.3f}")
+    print(f"{storage['encoding']} items: {storage['avg_item_bytes']} bytes on average, "
+          f"{storage['read_units_per_request']} RCU and {storage['write_units_per_request']} WCU per request")
+
+    if args.save:
+        with open(args.save, 'w') as target:
+            json.dump(report, target, indent=2, sort_keys=True)
+        print(f'Saved report to {args.save}')
+
+    if args.compare:
+        with open(args.compare) as source:
+            regressions = compare(routes, json.load(source), args.threshold)
+        if regressions:
+            print('Regressions:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print('No regressions against baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Cold storage for completed tasks that have expired from the TasksTable.
+
+Completed tasks carry an expiresAt TTL. When DynamoDB deletes one, the
+archiver receives its old image from the table stream and writes it to a
+gzip NDJSON object partitioned by creation date:
+
+    <ARCHIVE_TARGET>/created=YYYY-MM-DD/<batch digest>.ndjson.gz
+
+ARCHIVE_TARGET is an s3://bucket/prefix URL or a local directory. Archived
+tasks are read back with GET /tasks?archived=true, or from the command line:
+
+    ARCHIVE_TARGET=./archive python src/handlers/archive.py \\
+        --created-after 2025-01-01 --created-before 2025-01-31T23:59:59
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+import logging
+from codec import decode_item
+from instrumentation import instrumented
+from ndjson import chunk_lines, encode_lines
+from runtime import deserialize_item
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MAX_ARCHIVE_DAYS = 31
+TTL_PRINCIPAL = 'dynamodb.amazonaws.com'
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+class LocalArchive:
+    """
+    Archive objects as files under a local directory
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial object
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+
+    def keys(self, prefix):
+        directory = os.path.join(self.root, prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(prefix + name for name in os.listdir(directory) if name.endswith('.gz'))
+
+    def get(self, key):
+        with open(os.path.join(self.root, key), 'rb') as f:
+            return f.read()
+
+
+class S3Archive:
+    """
+    Archive objects in an S3 (or S3-compatible) bucket under a key prefix
+    """
+
+    def __init__(self, bucket, prefix='', client=None):
+        if client is None:
+            import boto3
+            client = boto3.client('s3', endpoint_url=os.environ.get('ARCHIVE_S3_ENDPOINT_URL'))
+        self.client = client
+        self.bucket = bucket
+        self.prefix = f"{prefix.strip('/')}/" if prefix.strip('/') else ''
+
+    def put(self, key, data):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=data,
+            ContentType='application/x-ndjson',
+            ContentEncoding='gzip'
+        )
+
+    def keys(self, prefix):
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            keys.extend(item['Key'][len(self.prefix):] for item in page.get('Contents', []))
+        return sorted(keys)
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+
+
+def open_archive(target):
+    """
+    Open the archive at an s3://bucket/prefix URL or a local directory
+    """
+    if target.startswith('s3://'):
+        bucket, _, prefix = target[len('s3://'):].partition('/')
+        if not bucket:
+            raise ValueError(f'Invalid S3 target: {target}')
+        return S3Archive(bucket, prefix)
+    return LocalArchive(target)
+
+
+def get_archive():
+    """
+    Return the archive named by ARCHIVE_TARGET, opening it on first use
+    """
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                target = os.environ.get('ARCHIVE_TARGET')
+                if not target:
+                    raise RuntimeError('ARCHIVE_TARGET is not configured')
+                _archive = open_archive(target)
+    return _archive
+
+
+def partition(created_at):
+    return f"created={(created_at or 'unknown')[:10]}/"
+
+
+def is_expiry(record):
+    """
+    True for a stream record of DynamoDB's TTL process deleting an item
+    """
+    identity = record.get('userIdentity') or {}
+    return (
+        record.get('eventName') == 'REMOVE'
+        and identity.get('type') == 'Service'
+        and identity.get('principalId') == TTL_PRINCIPAL
+    )
+
+
+def encode_tasks(tasks):
+    return b''.join(chunk_lines(encode_lines(tasks), compress=True))
+
+
+def archive_records(records, store):
+    """
+    Write the expired tasks in a batch of stream records to the archive.
+
+    Tasks are grouped into one object per creation date. Object names are
+    derived from the stream event ids, so a retried batch overwrites its
+    own objects instead of archiving tasks twice. Returns the task count.
+    """
+    groups = {}
+    for record in records:
+        if not is_expiry(record):
+            continue
+        images = record.get('dynamodb', {})
+        if 'OldImage' not in images:
+            continue
+        task = decode_item(deserialize_item(images['OldImage']))
+        if 'ApproximateCreationDateTime' in images:
+            task['archivedAt'] = datetime.utcfromtimestamp(float(images['ApproximateCreationDateTime'])).isoformat()
+        groups.setdefault(partition(task.get('createdAt')), []).append((record.get('eventID', ''), task))
+
+    for prefix, entries in groups.items():
+        digest = hashlib.blake2b(digest_size=16)
+        for event_id, _ in entries:
+            digest.update(event_id.encode('utf-8'))
+        store.put(f'{prefix}{digest.hexdigest()}.ndjson.gz', encode_tasks(task for _, task in entries))
+
+    return sum(len(entries) for entries in groups.values())
+
+
+def partition_days(bounds):
+    """
+    The creation-date partitions covering inclusive createdAfter/createdBefore bounds.
+
+    Both bounds are required and may span at most MAX_ARCHIVE_DAYS, so an
+    archive read touches a bounded number of partitions.
+    """
+    if 'createdAfter' not in bounds or 'createdBefore' not in bounds:
+        raise ValueError('Archived reads require both createdAfter and createdBefore')
+    first = date.fromisoformat(bounds['createdAfter'][:10])
+    last = date.fromisoformat(bounds['createdBefore'][:10])
+    if (last - first).days >= MAX_ARCHIVE_DAYS:
+        raise ValueError(f'Archived reads may span at most {MAX_ARCHIVE_DAYS} days')
+    return [(first + timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+
+
+def read_archived(store, days, after=None):
+    """
+    Yield (object key, line, task) for every archived task created on `days`.
+
+    Objects are read in key order, one at a time. `after` is an
+    {'object', 'line'} position to resume just past.
+    """
+    for day in days:
+        for key in store.keys(f'created={day}/'):
+            if after and key < after['object']:
+                continue
+            skip = after['line'] if after and key == after['object'] else 0
+            for line, raw in enumerate(gzip.decompress(store.get(key)).splitlines(), start=1):
+                if line > skip and raw:
+                    yield key, line, json.loads(raw)
+
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Archive tasks expired by TTL from the TasksTable stream
+    """
+    records = event.get('Records', [])
+    # Errors propagate so Lambda retries the batch from the stream
+    archived = archive_records(records, get_archive())
+    logger.info(f"Archived {archived} expired tasks from {len(records)} stream records")
+    return {'archived': archived}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--created-after', required=True, help='inclusive ISO 8601 lower bound')
+    parser.add_argument('--created-before', required=True, help='inclusive ISO 8601 upper bound')
+    args = parser.parse_args(argv)
+
+    bounds = {'createdAfter': args.created_after, 'createdBefore': args.created_before}
+    count = 0
+    for _, _, task in read_archived(get_archive(), partition_days(bounds)):
+        if bounds['createdAfter'] <= task.get('createdAt', '') <= bounds['createdBefore']:
+            sys.stdout.write(json.dumps(task) + '\n')
+            count += 1
+    print(f'Read {count} archived tasks', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import json
+import os
+from datetime import datetime
+from botocore.exceptions import ClientError
+import logging
+from batch_ops import batch_write
+from codec import EncodedTable
+from create_task import build_task, stored_item, validate_task
+from instrumentation import instrumented
+from runtime import Table, build_response, load_body
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
+
+MAX_BATCH_CREATE = 500
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Create many tasks in DynamoDB with BatchWriteItem
+    """
+    try:
+        body = load_body(event)
+        payloads = body.get('tasks') if isinstance(body, dict) else None
+
+        if not isinstance(payloads, list) or not payloads:
+            return build_response(400, {
+                'error': 'Request body must contain a non-empty tasks list'
+            })
+
+        if len(payloads) > MAX_BATCH_CREATE:
+            return build_response(400, {
+                'error': f'A batch may contain at most {MAX_BATCH_CREATE} tasks'
+            })
+
+        timestamp = datetime.utcnow().isoformat()
+        results = []
+        tasks = []
+
+        for index, payload in enumerate(payloads):
+            error = validate_task(payload)
+            if error:
+                results.append({'index': index, 'status': 'failed', 'error': error})
+                continue
+            task = build_task(payload, timestamp)
+            tasks.append(task)
+            results.append({'index': index, 'status': 'created', 'task': task})
+
+        failed_requests = batch_write(table, [{'PutRequest': {'Item': stored_item(task)}} for task in tasks])
+        failed_ids = {request['PutRequest']['Item']['taskId'] for request in failed_requests}
+
+        for result in results:
+            if result['status'] == 'created' and result['task']['taskId'] in failed_ids:
+                result['status'] = 'failed'
+                result['error'] = 'Failed to create task'
+                del result['task']
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        failed = len(results) - created
+
+        logger.info(f"Batch create finished: {created} created, {failed} failed")
+
+        return build_response(201 if failed == 0 else 207, {
+            'message': 'Batch create processed',
+            'created': created,
+            'failed': failed,
+            'results': results
+        })
+
+    except ClientError as e:
+        # Log full exception details for internal debugging, but do not expose them to clients
+        logger.error("DynamoDB error while creating tasks", exc_info=True)
+        return build_response(500, {
+            'error': 'Failed to create tasks'
+        })
+    except json.JSONDecodeError:
+        return build_response(400, {
+            'error': 'Invalid JSON in request body'
+        })
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return build_response(500, {
+            'error': 'Internal server error'
+        })
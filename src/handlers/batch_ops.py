@@ -0,0 +1,103 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+BATCH_GET_WORKERS = 4
+MAX_ATTEMPTS = 6
+BASE_DELAY = 0.05
+MAX_DELAY = 2.0
+
+
+def chunked(items, size):
+    """
+    Yield successive lists of at most `size` items
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def backoff(attempt, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """
+    Sleep for a full-jitter exponential backoff interval
+    """
+    time.sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+
+
+def batch_write(table, requests, max_attempts=MAX_ATTEMPTS):
+    """
+    Write PutRequest/DeleteRequest entries in 25-item BatchWriteItem chunks.
+
+    UnprocessedItems are retried with jittered backoff. Returns the requests
+    that could still not be written so callers can report them per item.
+    """
+    failed = []
+
+    for chunk in chunked(requests, BATCH_WRITE_SIZE):
+        pending = chunk
+        attempt = 0
+
+        while pending:
+            try:
+                pending = table.batch_write_item(pending)
+            except ClientError:
+                logger.error("BatchWriteItem failed for a chunk", exc_info=True)
+                failed.extend(pending)
+                break
+
+            if not pending:
+                break
+
+            attempt += 1
+            if attempt >= max_attempts:
+                logger.warning(f"Giving up on {len(pending)} unprocessed items")
+                failed.extend(pending)
+                break
+            backoff(attempt)
+
+    return failed
+
+
+def batch_get(table, key_name, ids, max_workers=BATCH_GET_WORKERS, max_attempts=MAX_ATTEMPTS, **get_kwargs):
+    """
+    Fetch items by primary key with concurrent 100-key BatchGetItem calls.
+
+    Duplicate ids are fetched once and UnprocessedKeys are retried with
+    jittered backoff. Extra keyword arguments such as ProjectionExpression are
+    passed to every call. Returns a dict of found items keyed by id, plus the
+    ids that were still unprocessed when retries ran out.
+    """
+    chunks = list(chunked(list(dict.fromkeys(ids)), BATCH_GET_SIZE))
+    found = {}
+    unprocessed = []
+    if not chunks:
+        return found, unprocessed
+
+    def get_chunk(chunk):
+        keys = [{key_name: value} for value in chunk]
+        items = []
+        attempt = 0
+
+        while True:
+            fetched, keys = table.batch_get_item(keys, **get_kwargs)
+            items.extend(fetched)
+            if not keys:
+                return items, []
+
+            attempt += 1
+            if attempt >= max_attempts:
+                return items, [key[key_name] for key in keys]
+            backoff(attempt)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        for items, missed in pool.map(get_chunk, chunks):
+            for item in items:
+                found[item[key_name]] = item
+            unprocessed.extend(missed)
+
+    return found, unprocessed
@@ -0,0 +1,376 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import boto3
+from botocore.exceptions import ClientError
+import logging
+from codec import EncodedTable
+from instrumentation import instrumented
+from query_planner import parse_created_range, parse_statuses, plan_list_query, projection_kwargs
+from runtime import Table
+from tag_index import INDEXED_ATTRIBUTES, find_tagged_ids, parse_tags
+from update_task import UPDATABLE_FIELDS, build_update
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
+jobs_table = Table(os.environ.get('JOBS_TABLE_NAME'))
+
+JOB_ACTIONS = ('update', 'delete')
+FILTER_FIELDS = ('status', 'priority', 'tag', 'tagMatch', 'createdAfter', 'createdBefore')
+PAGE_SIZE = 500
+UPDATE_WORKERS = int(os.environ.get('BULK_UPDATE_WORKERS', '16'))
+MAX_RECORDED_FAILURES = 100
+TIME_RESERVE_MS = 60 * 1000
+JOB_TTL_SECONDS = 30 * 24 * 3600
+
+_lambda_client = None
+_lambda_client_lock = threading.Lock()
+
+
+class JobLost(Exception):
+    """
+    Raised when another runner has checkpointed the job since it was read
+    """
+
+
+def get_lambda_client():
+    global _lambda_client
+    if _lambda_client is None:
+        with _lambda_client_lock:
+            if _lambda_client is None:
+                _lambda_client = boto3.client('lambda')
+    return _lambda_client
+
+
+def filter_params(job_filter):
+    """
+    Express a job filter as GET /tasks query parameters
+    """
+    params = {}
+    for name, value in job_filter.items():
+        params[name] = ','.join(value) if isinstance(value, (list, tuple)) else str(value)
+    return params
+
+
+def validate_filter(job_filter):
+    """
+    Return an error message if a job filter is invalid, otherwise None
+    """
+    if not isinstance(job_filter, dict) or not job_filter:
+        return 'filter must be a non-empty object'
+    unknown = [name for name in job_filter if name not in FILTER_FIELDS]
+    if unknown:
+        return f"Unknown filter fields: {', '.join(unknown)}"
+    if not any(job_filter.get(name) for name in ('status', 'priority', 'tag', 'createdAfter', 'createdBefore')):
+        return 'filter must name at least one of status, priority, tag, createdAfter or createdBefore'
+
+    params = filter_params(job_filter)
+    try:
+        parse_created_range(params)
+        if 'tag' in params:
+            parse_tags(params['tag'], params.get('tagMatch'))
+    except ValueError as e:
+        return str(e)
+    if 'tag' in params and ('createdAfter' in params or 'createdBefore' in params):
+        return 'tag filters cannot be combined with createdAfter/createdBefore'
+    return None
+
+
+def match_condition(job_filter):
+    """
+    Condition re-checking the filter at write time, so tasks that stopped
+    matching after they were listed are skipped rather than updated
+    """
+    params = filter_params(job_filter)
+    conditions = ['attribute_exists(taskId)']
+    names = {}
+    values = {}
+
+    if params.get('status'):
+        statuses = parse_statuses(params['status'])
+        placeholders = [f':f_status{index}' for index in range(len(statuses))]
+        conditions.append(f"#f_status IN ({', '.join(placeholders)})")
+        names['#f_status'] = 'status'
+        values.update(zip(placeholders, statuses))
+    if params.get('priority'):
+        conditions.append('#f_priority = :f_priority')
+        names['#f_priority'] = 'priority'
+        values[':f_priority'] = params['priority']
+    bounds = parse_created_range(params)
+    if bounds:
+        names['#f_createdAt'] = 'createdAt'
+        if 'createdAfter' in bounds:
+            conditions.append('#f_createdAt >= :f_createdAfter')
+            values[':f_createdAfter'] = bounds['createdAfter']
+        if 'createdBefore' in bounds:
+            conditions.append('#f_createdAt <= :f_createdBefore')
+            values[':f_createdBefore'] = bounds['createdBefore']
+    if params.get('tag'):
+        tags, match = parse_tags(params['tag'], params.get('tagMatch'))
+        names['#f_tags'] = 'tags'
+        tag_conditions = []
+        for index, tag in enumerate(tags):
+            tag_conditions.append(f'contains(#f_tags, :f_tag{index})')
+            values[f':f_tag{index}'] = tag
+        conditions.append('(' + (' AND ' if match == 'all' else ' OR ').join(tag_conditions) + ')')
+
+    return ' AND '.join(conditions), names, values
+
+
+def key_pages(job_filter, cursor=None):
+    """
+    Yield (task ids, cursor) pages of the tasks matching a filter.
+
+    Tag filters walk the tag index; everything else uses the same read plan
+    as GET /tasks (the status-index GSI when a status is given), reading
+    only taskId. The cursor after each page resumes right after it and is
+    None after the last page.
+    """
+    params = filter_params(job_filter)
+    cursor = cursor or {}
+
+    if params.get('tag'):
+        tags, match = parse_tags(params['tag'], params.get('tagMatch'))
+        filters = {name: params[name] for name in INDEXED_ATTRIBUTES if params.get(name)}
+        if 'status' in filters:
+            filters['status'] = parse_statuses(filters['status'])
+        after = cursor.get('after')
+        while True:
+            task_ids, more = find_tagged_ids(tags, match, filters, after=after, limit=PAGE_SIZE)
+            if task_ids:
+                after = task_ids[-1]
+            yield task_ids, ({'after': after} if more else None)
+            if not more:
+                return
+
+    operation, read_kwargs = plan_list_query(params)
+    reads = read_kwargs if operation == 'merge' else [read_kwargs]
+    read = table.scan if operation == 'scan' else table.query
+    start_key = cursor.get('key')
+
+    for position in range(cursor.get('read', 0), len(reads)):
+        kwargs = dict(reads[position], Limit=PAGE_SIZE, **projection_kwargs(
+            ('taskId',), expression_names=reads[position].get('ExpressionAttributeNames')
+        ))
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        while True:
+            response = read(**kwargs)
+            last_key = response.get('LastEvaluatedKey')
+            if last_key:
+                next_cursor = {'read': position, 'key': last_key}
+            elif position + 1 < len(reads):
+                next_cursor = {'read': position + 1}
+            else:
+                next_cursor = None
+            yield [item['taskId'] for item in response.get('Items', [])], next_cursor
+            if not last_key:
+                break
+            kwargs['ExclusiveStartKey'] = last_key
+        start_key = None
+
+
+def write_page(task_ids, write_one, workers=UPDATE_WORKERS):
+    """
+    Run a conditional write for each task on a bounded pool.
+
+    `write_one(task_id)` raises ClientError on failure. Returns counts of
+    succeeded/skipped/failed writes plus the failures.
+    """
+    def attempt(task_id):
+        try:
+            write_one(task_id)
+            return task_id, None
+        except ClientError as e:
+            return task_id, e.response['Error']['Code']
+
+    results = {'succeeded': 0, 'skipped': 0, 'failed': 0, 'failures': []}
+    if not task_ids:
+        return results
+    with ThreadPoolExecutor(max_workers=min(workers, len(task_ids))) as pool:
+        for task_id, error in pool.map(attempt, task_ids):
+            if error is None:
+                results['succeeded'] += 1
+            elif error == 'ConditionalCheckFailedException':
+                # Deleted or no longer matching since it was listed
+                results['skipped'] += 1
+            else:
+                results['failed'] += 1
+                results['failures'].append({'taskId': task_id, 'error': error})
+    return results
+
+
+def update_page(task_ids, patch, job_filter, workers=UPDATE_WORKERS):
+    """
+    Apply a patch to each task with a conditional UpdateItem
+    """
+    timestamp = datetime.utcnow().isoformat()
+    condition, condition_names, condition_values = match_condition(job_filter)
+
+    def update_one(task_id):
+        # Built per task since the due-index shard depends on the taskId
+        update_expression, names, values = build_update(patch, timestamp, task_id)
+        table.update_item(
+            Key={'taskId': task_id},
+            UpdateExpression=update_expression,
+            ConditionExpression=condition,
+            ExpressionAttributeNames=dict(names, **condition_names),
+            ExpressionAttributeValues=dict(values, **condition_values)
+        )
+
+    return write_page(task_ids, update_one, workers)
+
+
+def delete_page(task_ids, job_filter, workers=UPDATE_WORKERS):
+    """
+    Delete each task with a conditional DeleteItem.
+
+    Task ids come from eventually consistent indexes, so the filter is
+    re-checked at write time, as for updates, rather than batch deleting.
+    """
+    condition, names, values = match_condition(job_filter)
+
+    def delete_one(task_id):
+        delete_kwargs = {'Key': {'taskId': task_id}, 'ConditionExpression': condition}
+        if names:
+            delete_kwargs['ExpressionAttributeNames'] = names
+        if values:
+            delete_kwargs['ExpressionAttributeValues'] = values
+        table.delete_item(**delete_kwargs)
+
+    return write_page(task_ids, delete_one, workers)
+
+
+def new_job(action, job_filter, patch=None):
+    """
+    Build the job item for a bulk update or delete
+    """
+    timestamp = datetime.utcnow().isoformat()
+    return {
+        'jobId': str(uuid.uuid4()),
+        'action': action,
+        'filter': job_filter,
+        'patch': {field: patch[field] for field in UPDATABLE_FIELDS if field in patch} if patch else None,
+        'state': 'queued',
+        'cursor': None,
+        'version': 0,
+        'matched': 0,
+        'succeeded': 0,
+        'skipped': 0,
+        'failed': 0,
+        'failures': [],
+        'createdAt': timestamp,
+        'updatedAt': timestamp,
+        'expiresAt': int(time.time()) + JOB_TTL_SECONDS
+    }
+
+
+def start_runner(job_id, function_name=None):
+    """
+    Invoke the job runner asynchronously for a job
+    """
+    get_lambda_client().invoke(
+        FunctionName=function_name or os.environ.get('BULK_JOB_FUNCTION_NAME'),
+        InvocationType='Event',
+        Payload=json.dumps({'jobId': job_id}).encode('utf-8')
+    )
+
+
+def checkpoint(job, cursor, results, matched, state):
+    """
+    Record a finished page on the job item, guarded by its version number
+    """
+    recorded = int(job['failed'])
+    room = max(0, MAX_RECORDED_FAILURES - recorded)
+    failures = results['failures'][:room]
+
+    update = (
+        'SET #cursor = :cursor, #version = :next, #state = :state, #updatedAt = :updatedAt, '
+        '#failures = list_append(#failures, :failures) '
+        'ADD #matched :matched, #succeeded :succeeded, #skipped :skipped, #failed :failed'
+    )
+    names = {f'#{name}': name for name in (
+        'cursor', 'version', 'state', 'updatedAt', 'failures', 'matched', 'succeeded', 'skipped', 'failed'
+    )}
+    try:
+        response = jobs_table.update_item(
+            Key={'jobId': job['jobId']},
+            UpdateExpression=update,
+            ConditionExpression='#version = :version',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={
+                ':cursor': cursor,
+                ':version': job['version'],
+                ':next': job['version'] + 1,
+                ':state': state,
+                ':updatedAt': datetime.utcnow().isoformat(),
+                ':failures': failures,
+                ':matched': matched,
+                ':succeeded': results['succeeded'],
+                ':skipped': results['skipped'],
+                ':failed': results['failed']
+            },
+            ReturnValues='ALL_NEW'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        raise JobLost(job['jobId'])
+    return response['Attributes']
+
+
+def run_job(job_id, context=None):
+    """
+    Work through a job page by page from its last checkpoint.
+
+    Stops to hand over to a fresh invocation when the Lambda is close to its
+    timeout. Returns the job item as last written.
+    """
+    job = jobs_table.get_item(Key={'jobId': job_id}).get('Item')
+    if not job or job['state'] in ('completed', 'failed'):
+        return job
+
+    for task_ids, cursor in key_pages(job['filter'], job.get('cursor')):
+        if job['action'] == 'update':
+            results = update_page(task_ids, job['patch'], job['filter'])
+        else:
+            results = delete_page(task_ids, job['filter'])
+        job = checkpoint(job, cursor, results, len(task_ids), 'running' if cursor else 'completed')
+
+        if cursor is None:
+            break
+        if context is not None and context.get_remaining_time_in_millis() < TIME_RESERVE_MS:
+            start_runner(job_id, context.function_name)
+            logger.info(f"Job {job_id} handed over after {job['matched']} tasks")
+            return job
+
+    if job['state'] != 'completed':
+        # A filter that matched nothing never reaches a final page checkpoint
+        job = checkpoint(job, None, {'succeeded': 0, 'skipped': 0, 'failed': 0, 'failures': []}, 0, 'completed')
+    return job
+
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Run (or resume) a bulk update/delete job; invoked asynchronously with {"jobId": ...}
+    """
+    job_id = event.get('jobId')
+    try:
+        job = run_job(job_id, context)
+    except JobLost:
+        logger.warning(f"Job {job_id} is being run by another invocation; stopping")
+        return {'jobId': job_id, 'state': 'superseded'}
+
+    if job is None:
+        logger.warning(f"Job {job_id} not found")
+        return {'jobId': job_id, 'state': 'missing'}
+
+    logger.info(f"Job {job_id} is {job['state']}: {job['succeeded']} succeeded, {job['failed']} failed")
+    return {'jobId': job_id, 'state': job['state']}
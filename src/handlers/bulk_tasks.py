@@ -0,0 +1,98 @@
+import json
+from botocore.exceptions import ClientError
+import logging
+from bulk_jobs import jobs_table, new_job, start_runner, validate_filter
+from instrumentation import instrumented
+from runtime import build_response, load_body
+from update_task import UPDATABLE_FIELDS
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+JOB_FIELDS = (
+    'jobId', 'action', 'filter', 'patch', 'state', 'matched', 'succeeded',
+    'skipped', 'failed', 'failures', 'createdAt', 'updatedAt'
+)
+
+def job_summary(job):
+    return {field: job.get(field) for field in JOB_FIELDS}
+
+def create_job(event, action):
+    """
+    Validate a bulk request, record the job and start its runner
+    """
+    body = load_body(event)
+    if not isinstance(body, dict):
+        return build_response(400, {
+            'error': 'Request body must be a JSON object'
+        })
+
+    error = validate_filter(body.get('filter'))
+    if error:
+        return build_response(400, {
+            'error': error
+        })
+
+    patch = body.get('patch')
+    if action == 'update':
+        if not isinstance(patch, dict) or not any(field in patch for field in UPDATABLE_FIELDS):
+            return build_response(400, {
+                'error': f"patch must set at least one of: {', '.join(UPDATABLE_FIELDS)}"
+            })
+
+    job = new_job(action, body['filter'], patch if action == 'update' else None)
+    jobs_table.put_item(Item=job, ConditionExpression='attribute_not_exists(jobId)')
+    start_runner(job['jobId'])
+
+    logger.info(f"Started bulk {action} job {job['jobId']}")
+
+    return build_response(202, {
+        'message': f'Bulk {action} job started',
+        'job': job_summary(job)
+    }, {'Location': f"/tasks/jobs/{job['jobId']}"})
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Start bulk update/delete jobs and report their progress
+    """
+    try:
+        resource = event.get('resource')
+
+        if resource == '/tasks/bulk-update':
+            return create_job(event, 'update')
+        if resource == '/tasks/bulk-delete':
+            return create_job(event, 'delete')
+
+        path_parameters = event.get('pathParameters') or {}
+        job_id = path_parameters.get('jobId')
+        if not job_id:
+            return build_response(400, {
+                'error': 'Job ID is required'
+            })
+
+        job = jobs_table.get_item(Key={'jobId': job_id}).get('Item')
+        if not job:
+            return build_response(404, {
+                'error': 'Job not found'
+            })
+
+        return build_response(200, {
+            'job': job_summary(job)
+        })
+
+    except ClientError as e:
+        # Log full exception details for internal debugging, but do not expose them to clients
+        logger.error("AWS error while handling bulk job", exc_info=True)
+        return build_response(500, {
+            'error': 'Failed to process bulk job request'
+        })
+    except json.JSONDecodeError:
+        return build_response(400, {
+            'error': 'Invalid JSON in request body'
+        })
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return build_response(500, {
+            'error': 'Internal server error'
+        })
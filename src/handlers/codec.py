@@ -0,0 +1,223 @@
+"""
+Compact storage encoding for task items.
+
+DynamoDB bills by item size, attribute names included, so tasks are stored
+with short names for their bulkiest attributes, long descriptions as zlib
+compressed binary and updatedAt as integer microseconds. Handlers never
+see the stored form: EncodedTable wraps a table, encoding what is written
+and decoding what is read, so the API's JSON is unchanged.
+
+Keys and anything read by a key condition, filter or condition expression
+(taskId, status, createdAt, priority, tags, dueDate, expiresAt) keep their
+names and values. Items written before the encoding existed are decoded as
+they are and migrate attribute by attribute as they are written.
+
+Whole items also get their due-index attributes on write. Those, and the
+expiresAt TTL, are dropped again on read.
+"""
+import os
+import re
+import zlib
+from datetime import datetime, timedelta
+from decimal import Decimal
+from due_index import INDEX_ATTRIBUTES, index_attributes
+
+# Stored for DynamoDB's own use (TTL and the due-index) and never returned to clients
+INTERNAL_ATTRIBUTES = frozenset(INDEX_ATTRIBUTES + ('expiresAt',))
+
+SHORT_NAMES = {
+    'title': 't',
+    'description': 'd',
+    'updatedAt': 'u',
+}
+LONG_NAMES = {short: name for name, short in SHORT_NAMES.items()}
+
+COMPRESS_DESCRIPTION_BYTES = int(os.environ.get('COMPRESS_DESCRIPTION_BYTES', '256'))
+COMPRESSION_LEVEL = 6
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_PLACEHOLDER = re.compile(r'#\w+')
+_SET_ASSIGNMENT = re.compile(r'(#\w+)\s*=\s*(:\w+)')
+
+
+def compact_timestamp(value):
+    """
+    Encode a naive ISO 8601 timestamp as integer microseconds since the epoch.
+
+    Values that would not decode back to the identical string (offsets,
+    other formats) are kept as they are.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    if parsed.tzinfo is not None or parsed.isoformat() != value:
+        return value
+    return (parsed - _EPOCH) // _MICROSECOND
+
+
+def expand_timestamp(value):
+    if isinstance(value, (int, Decimal)):
+        return (_EPOCH + int(value) * _MICROSECOND).isoformat()
+    return value
+
+
+def encode_value(name, value):
+    """
+    Encode one attribute value for storage under its short name
+    """
+    if name == 'description' and isinstance(value, str):
+        raw = value.encode('utf-8')
+        if len(raw) >= COMPRESS_DESCRIPTION_BYTES:
+            compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+            if len(compressed) < len(raw):
+                return compressed
+        return value
+    if name == 'updatedAt':
+        return compact_timestamp(value)
+    return value
+
+
+def decode_value(name, value):
+    if name == 'description' and isinstance(value, (bytes, bytearray)):
+        return zlib.decompress(value).decode('utf-8')
+    if name == 'updatedAt':
+        return expand_timestamp(value)
+    return value
+
+
+def encode_item(task):
+    """
+    Convert a task to its stored form
+    """
+    stored = {}
+    for name, value in task.items():
+        short = SHORT_NAMES.get(name)
+        if short is None:
+            stored[name] = value
+        else:
+            stored[short] = encode_value(name, value)
+    if 'taskId' in task:
+        stored.update(index_attributes(task))
+    return stored
+
+
+def decode_item(item):
+    """
+    Convert a stored item, in either the compact or the original form, back to a task
+    """
+    if not any(short in item for short in LONG_NAMES) and INTERNAL_ATTRIBUTES.isdisjoint(item):
+        return item
+    task = {name: value for name, value in item.items() if name not in LONG_NAMES and name not in INTERNAL_ATTRIBUTES}
+    for short, name in LONG_NAMES.items():
+        if short in item:
+            task[name] = decode_value(name, item[short])
+    return task
+
+
+class EncodedTable:
+    """
+    Wrap a table so its items are stored compactly and read back as plain tasks.
+
+    Expressions keep using the long attribute names through
+    ExpressionAttributeNames placeholders; the wrapper points them at the
+    short names, encodes SET values and removes the original attribute on
+    write, and projects both names so older items are still read whole.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.name = table.name
+
+    def _names(self, request):
+        names = request.get('ExpressionAttributeNames')
+        renamed = {placeholder for placeholder, name in (names or {}).items() if name in SHORT_NAMES}
+        if not renamed:
+            return request
+
+        for field in ('KeyConditionExpression', 'FilterExpression', 'ConditionExpression'):
+            used = renamed.intersection(_PLACEHOLDER.findall(request.get(field) or ''))
+            if used:
+                raise ValueError(f'{names[used.pop()]} is stored encoded and cannot be used in a {field}')
+
+        request = dict(request)
+        names = dict(names)
+        projection = request.get('ProjectionExpression')
+        if projection:
+            legacy = []
+            for placeholder in _PLACEHOLDER.findall(projection):
+                if placeholder in renamed:
+                    names[f'{placeholder}_legacy'] = names[placeholder]
+                    legacy.append(f'{placeholder}_legacy')
+            request['ProjectionExpression'] = ', '.join([projection] + legacy)
+
+        update = request.get('UpdateExpression')
+        if update:
+            values = dict(request.get('ExpressionAttributeValues') or {})
+            removals = []
+            for placeholder, value_placeholder in _SET_ASSIGNMENT.findall(update):
+                if placeholder in renamed and value_placeholder in values:
+                    values[value_placeholder] = encode_value(names[placeholder], values[value_placeholder])
+                    names[f'{placeholder}_legacy'] = names[placeholder]
+                    removals.append(f'{placeholder}_legacy')
+            if removals:
+                # An expression may only have one REMOVE clause, so join an existing one
+                if re.search(r'\bREMOVE\b', update):
+                    update = re.sub(r'\bREMOVE\b', 'REMOVE ' + ', '.join(removals) + ',', update, count=1)
+                else:
+                    update += ' REMOVE ' + ', '.join(removals)
+                request['UpdateExpression'] = update
+            request['ExpressionAttributeValues'] = values
+
+        for placeholder in renamed:
+            names[placeholder] = SHORT_NAMES[names[placeholder]]
+        request['ExpressionAttributeNames'] = names
+        return request
+
+    def _decoded(self, result):
+        for field in ('Item', 'Attributes'):
+            if field in result:
+                result[field] = decode_item(result[field])
+        if 'Items' in result:
+            result['Items'] = [decode_item(item) for item in result['Items']]
+        return result
+
+    def get_item(self, **kwargs):
+        return self._decoded(self.table.get_item(**self._names(kwargs)))
+
+    def put_item(self, **kwargs):
+        request = self._names(kwargs)
+        return self._decoded(self.table.put_item(**dict(request, Item=encode_item(request['Item']))))
+
+    def update_item(self, **kwargs):
+        return self._decoded(self.table.update_item(**self._names(kwargs)))
+
+    def delete_item(self, **kwargs):
+        return self._decoded(self.table.delete_item(**self._names(kwargs)))
+
+    def query(self, **kwargs):
+        return self._decoded(self.table.query(**self._names(kwargs)))
+
+    def scan(self, **kwargs):
+        return self._decoded(self.table.scan(**self._names(kwargs)))
+
+    def batch_write_item(self, requests):
+        originals = {}
+        encoded = []
+        for request in requests:
+            if 'PutRequest' in request:
+                item = encode_item(request['PutRequest']['Item'])
+                originals[item['taskId']] = request
+                request = {'PutRequest': {'Item': item}}
+            encoded.append(request)
+        # Unprocessed puts are handed back as they were given, internal attributes
+        # included, so a retry encodes them again
+        return [
+            originals.get(request['PutRequest']['Item']['taskId'], request) if 'PutRequest' in request else request
+            for request in self.table.batch_write_item(encoded)
+        ]
+
+    def batch_get_item(self, keys, **kwargs):
+        items, unprocessed = self.table.batch_get_item(keys, **self._names(kwargs))
+        return [decode_item(item) for item in items], unprocessed
@@ -0,0 +1,111 @@
+import base64
+import functools
+import gzip
+import os
+import zlib
+import instrumentation
+from etags import CONTENT_CODINGS, coded_etag, matched_etag
+from runtime import get_header
+
+MIN_COMPRESS_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', '5'))
+
+# Preferred first when the client weights encodings equally
+SUPPORTED_ENCODINGS = CONTENT_CODINGS
+# Must match the API's BinaryMediaTypes: API Gateway only decodes a base64
+# body for requests whose first Accept type is listed there
+BINARY_MEDIA_TYPES = ('application/json',)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick a supported content coding from an Accept-Encoding header, or None
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for entry in accept_encoding.split(','):
+        coding, _, params = entry.strip().partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+
+    best = None
+    for coding in SUPPORTED_ENCODINGS:
+        quality = weights.get(coding, weights.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best[0] if best else None
+
+
+def accepts_binary(accept):
+    """
+    True when API Gateway will return a binary body for a request with this Accept header
+    """
+    first = (accept or '').split(',')[0].partition(';')[0].strip().lower()
+    return first in BINARY_MEDIA_TYPES
+
+
+def compress_response(response, accept_encoding, min_size=None, level=None, accept=None, if_none_match=None):
+    """
+    Compress a proxy response body when the client accepts it and it is large enough.
+
+    Compressed bodies are base64-encoded with isBase64Encoded so API Gateway
+    returns them as binary, which it only does for a binary Accept type.
+    A compressed representation gets its own ETag, and a 304 repeats the
+    tag the client sent, coded or not.
+    """
+    min_size = MIN_COMPRESS_BYTES if min_size is None else min_size
+    level = COMPRESSION_LEVEL if level is None else level
+
+    body = response.get('body')
+    etag = (response.get('headers') or {}).get('ETag')
+    if response.get('statusCode') == 304 and etag:
+        matched = matched_etag(if_none_match, etag)
+        if matched and matched != etag:
+            return dict(response, headers=dict(response['headers'], ETag=matched))
+    if not body or response.get('isBase64Encoded'):
+        return response
+
+    headers = dict(response.get('headers') or {})
+    headers['Vary'] = 'Accept, Accept-Encoding'
+    response = dict(response, headers=headers)
+
+    encoding = negotiate_encoding(accept_encoding)
+    raw = body.encode('utf-8')
+    if encoding is None or len(raw) < min_size or not accepts_binary(accept):
+        return response
+
+    if encoding == 'gzip':
+        compressed = gzip.compress(raw, compresslevel=level, mtime=0)
+    else:
+        compressed = zlib.compress(raw, level)
+
+    headers['Content-Encoding'] = encoding
+    if etag:
+        headers['ETag'] = coded_etag(etag, encoding)
+    response['body'] = base64.b64encode(compressed).decode('ascii')
+    response['isBase64Encoded'] = True
+    return response
+
+
+def compressible(handler):
+    """
+    Decorate a lambda_handler so its responses honour Accept-Encoding
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        response = handler(event, context)
+        with instrumentation.timed('compress'):
+            return compress_response(
+                response, get_header(event, 'Accept-Encoding'),
+                accept=get_header(event, 'Accept'), if_none_match=get_header(event, 'If-None-Match')
+            )
+    return wrapper
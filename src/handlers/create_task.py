@@ -2,100 +2,158 @@ import json
 import os
 import uuid
 from datetime import datetime
-import boto3
 from botocore.exceptions import ClientError
 import logging
+from codec import EncodedTable
+import idempotency
+from instrumentation import instrumented
+from retention import expires_at
+from runtime import Table, build_response, get_header, load_body
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
-table_name = os.environ.get('TASKS_TABLE_NAME')
-table = dynamodb.Table(table_name)
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
 
+def validate_task(body):
+    """
+    Return an error message if a task payload is invalid, otherwise None
+    """
+    if not isinstance(body, dict):
+        return 'Task must be a JSON object'
+    if not body.get('title'):
+        return 'Missing required field: title'
+    return None
+
+def build_task(body, timestamp=None):
+    """
+    Apply defaults and assign a new taskId and timestamps to a validated payload
+    """
+    timestamp = timestamp or datetime.utcnow().isoformat()
+
+    task = {
+        'taskId': str(uuid.uuid4()),
+        'title': body['title'],
+        'description': body.get('description', ''),
+        'status': body.get('status', 'pending'),
+        'priority': body.get('priority', 'medium'),
+        'createdAt': timestamp,
+        'updatedAt': timestamp,
+        'dueDate': body.get('dueDate'),
+        'tags': body.get('tags', [])
+    }
+    return task
+
+def stored_item(task):
+    """
+    The item written for a new task: the task plus its expiresAt TTL when it starts completed.
+
+    expiresAt is internal, so it is kept out of the task returned to clients.
+    """
+    expiry = expires_at(task.get('status'))
+    return dict(task, expiresAt=expiry) if expiry is not None else task
+
+def created_body(task):
+    return {
+        'message': 'Task created successfully',
+        'task': task
+    }
+
+def replay(record):
+    return build_response(record['statusCode'], record['body'], {'Idempotent-Replayed': 'true'})
+
+def create_idempotent(body, idempotency_key):
+    """
+    Create a task at most once per Idempotency-Key.
+
+    Repeats seen by this warm container are answered from memory. Otherwise
+    the key is claimed IN_PROGRESS before the task is written and only
+    marked complete, and so replayable, once the write has succeeded. A
+    request holding a live claim makes duplicates wait with a 409; a claim
+    abandoned by a crashed request is taken over and its task written
+    with the same taskId.
+    """
+    error = idempotency.validate_key(idempotency_key)
+    if error:
+        return build_response(400, {
+            'error': error
+        })
+
+    key = idempotency.scoped_key('create_task', idempotency_key.strip())
+    request_fingerprint = idempotency.fingerprint(body)
+    record = idempotency.lookup(key, request_fingerprint)
+    if record is not None:
+        return replay(record)
+
+    owned, record = idempotency.claim(key, request_fingerprint, 201, created_body(build_task(body)))
+    if not owned:
+        logger.info(f"Replaying task creation for idempotency key {idempotency_key}")
+        return replay(record)
+
+    task = record['body']['task']
+    try:
+        # A taken-over claim may find its task already written by the request that died
+        table.put_item(Item=stored_item(task), ConditionExpression='attribute_not_exists(taskId)')
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            idempotency.release(key)
+            raise
+    except Exception:
+        idempotency.release(key)
+        raise
+    idempotency.complete(record)
+
+    logger.info(f"Successfully created task: {task['taskId']}")
+
+    return build_response(201, record['body'])
+
+@instrumented
 def lambda_handler(event, context):
     """
     Create a new task in DynamoDB
     """
     try:
-        body = json.loads(event.get('body', '{}'))
-
-        if not body.get('title'):
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Missing required field: title'
-                })
-            }
+        body = load_body(event)
+
+        error = validate_task(body)
+        if error:
+            return build_response(400, {
+                'error': error
+            })
         
-        task_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().isoformat()
-
-        task = {
-            'taskId': task_id,
-            'title': body['title'],
-            'description': body.get('description', ''),
-            'status': body.get('status', 'pending'),
-            'priority': body.get('priority', 'medium'),
-            'createdAt': timestamp,
-            'updatedAt': timestamp,
-            'dueDate': body.get('dueDate'),
-            'tags': body.get('tags', [])
-        }
-
-        table.put_item(Item=task)
+        idempotency_key = get_header(event, idempotency.IDEMPOTENCY_HEADER)
+        if idempotency_key is not None:
+            return create_idempotent(body, idempotency_key)
+
+        task = build_task(body)
+        task_id = task['taskId']
+
+        table.put_item(Item=stored_item(task))
         
         logger.info(f"Successfully created task: {task_id}")
         
-        return {
-            'statusCode': 201,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'message': 'Task created successfully',
-                'task': task
-            })
-        }
+        return build_response(201, created_body(task))
         
+    except idempotency.RequestInProgress:
+        return build_response(409, {
+            'error': f'A request with this {idempotency.IDEMPOTENCY_HEADER} is still in progress; retry shortly'
+        }, {'Retry-After': '1'})
+    except idempotency.KeyReused:
+        return build_response(422, {
+            'error': f'{idempotency.IDEMPOTENCY_HEADER} was already used with a different request body'
+        })
     except ClientError as e:
         # Log full exception details for internal debugging, but do not expose them to clients
         logger.error("DynamoDB error while creating task", exc_info=True)
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Failed to create task'
-            })
-        }
+        return build_response(500, {
+            'error': 'Failed to create task'
+        })
     except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Invalid JSON in request body'
-            })
-        }
+        return build_response(400, {
+            'error': 'Invalid JSON in request body'
+        })
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Internal server error'
-            })
-        }
+        return build_response(500, {
+            'error': 'Internal server error'
+        })
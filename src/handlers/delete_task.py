@@ -1,16 +1,16 @@
-import json
 import os
-import boto3
 from botocore.exceptions import ClientError
 import logging
+from codec import EncodedTable
+from instrumentation import instrumented
+from runtime import Table, build_response
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
-table_name = os.environ.get('TASKS_TABLE_NAME')
-table = dynamodb.Table(table_name)
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
 
+@instrumented
 def lambda_handler(event, context):
     """
     Delete a task from DynamoDB
@@ -20,69 +20,39 @@ def lambda_handler(event, context):
         task_id = path_parameters.get('taskId') if path_parameters else None
         
         if not task_id:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Task ID is required'
-                })
-            }
-        
-        response = table.get_item(Key={'taskId': task_id})
+            return build_response(400, {
+                'error': 'Task ID is required'
+            })
         
-        if 'Item' not in response:
-            return {
-                'statusCode': 404,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Task not found'
-                })
-            }
-
-        table.delete_item(Key={'taskId': task_id})
+        try:
+            response = table.delete_item(
+                Key={'taskId': task_id},
+                ConditionExpression='attribute_exists(taskId)',
+                ReturnValues='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return build_response(404, {
+                'error': 'Task not found'
+            })
         
         logger.info(f"Successfully deleted task: {task_id}")
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'message': 'Task deleted successfully',
-                'taskId': task_id
-            })
-        }
+        return build_response(200, {
+            'message': 'Task deleted successfully',
+            'taskId': task_id,
+            'task': response.get('Attributes')
+        })
         
     except ClientError as e:
         # Log full exception details for internal debugging, but do not expose them to clients
         logger.error("DynamoDB error while deleting task", exc_info=True)
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Failed to delete task'
-            })
-        }
+        return build_response(500, {
+            'error': 'Failed to delete task'
+        })
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Internal server error'
-            })
-        }
+        return build_response(500, {
+            'error': 'Internal server error'
+        })
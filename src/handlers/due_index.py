@@ -0,0 +1,236 @@
+"""
+Sparse due-index GSI for finding overdue and upcoming tasks.
+
+Open tasks with a due date carry two index attributes: dueBucket, one of
+DUE_SHARDS `open#N` partitions picked from the taskId, and dueKey, a copy
+of the dueDate string. Completing a task removes dueBucket, so only open
+tasks with a due date are in the index and reminder queries read nothing
+else. dueKey is a copy because dueDate is often stored as null, which an
+index key attribute may not be.
+
+To add the index attributes to tasks written before the index existed, run:
+
+    TASKS_TABLE_NAME=... python src/handlers/due_index.py --backfill
+"""
+import os
+import sys
+import zlib
+from datetime import datetime
+from botocore.exceptions import ClientError
+import logging
+from parallel_scan import DEFAULT_SEGMENTS, parallel_scan
+from query_planner import created_condition, parse_created_range, parse_statuses
+from runtime import Table
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DUE_INDEX = 'due-index'
+DUE_SHARDS = 4
+CLOSED_STATUSES = ('completed',)
+INDEX_ATTRIBUTES = ('dueBucket', 'dueKey')
+
+
+def due_bucket(task_id):
+    return f'open#{zlib.crc32(task_id.encode("utf-8")) % DUE_SHARDS}'
+
+
+def due_key(due_date):
+    """
+    The dueKey for a dueDate value, or None when it cannot be indexed
+    """
+    return due_date if isinstance(due_date, str) and due_date else None
+
+
+def index_attributes(task):
+    """
+    Index attributes for a whole task item
+    """
+    attributes = {}
+    key = due_key(task.get('dueDate'))
+    if key is not None:
+        attributes['dueKey'] = key
+    if task.get('status') not in CLOSED_STATUSES and 'taskId' in task:
+        attributes['dueBucket'] = due_bucket(task['taskId'])
+    return attributes
+
+
+def index_update(task_id, patch):
+    """
+    Index attribute changes for a patch, as (values to SET, names to REMOVE).
+
+    dueKey follows dueDate and dueBucket follows the status, each on its
+    own, so the changes are known without reading the task: an open task
+    with no dueKey, or a closed task with a stale one, is simply not indexed.
+    """
+    updates = {}
+    removals = []
+    if 'dueDate' in patch:
+        key = due_key(patch['dueDate'])
+        if key is None:
+            removals.append('dueKey')
+        else:
+            updates['dueKey'] = key
+    if 'status' in patch:
+        if patch['status'] in CLOSED_STATUSES:
+            removals.append('dueBucket')
+        else:
+            updates['dueBucket'] = due_bucket(task_id)
+    return updates, removals
+
+
+def parse_due_range(query_params):
+    """
+    Validate the `dueAfter`/`dueBefore` bounds, both inclusive ISO 8601 dates or timestamps
+    """
+    bounds = {}
+    for name in ('dueAfter', 'dueBefore'):
+        value = query_params.get(name)
+        if value:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f'{name} must be an ISO 8601 date or timestamp')
+            bounds[name] = value
+    if len(bounds) == 2 and bounds['dueAfter'] > bounds['dueBefore']:
+        raise ValueError('dueAfter must not be later than dueBefore')
+    return bounds
+
+
+def plan_due_query(query_params):
+    """
+    One Query per due-index shard for a dueAfter/dueBefore window.
+
+    Returns {bucket: kwargs}, each read yielding open tasks in dueKey order
+    for the caller to merge. status, priority and createdAt bounds become
+    a FilterExpression. Raises ValueError for malformed bounds.
+    """
+    bounds = parse_due_range(query_params)
+    if not bounds:
+        raise ValueError('dueAfter or dueBefore is required')
+
+    if len(bounds) == 2:
+        key_condition = '#dueKey BETWEEN :dueAfter AND :dueBefore'
+    elif 'dueAfter' in bounds:
+        key_condition = '#dueKey >= :dueAfter'
+    else:
+        key_condition = '#dueKey <= :dueBefore'
+
+    names = {'#dueBucket': 'dueBucket', '#dueKey': 'dueKey'}
+    values = {f':{name}': value for name, value in bounds.items()}
+    filters = []
+
+    if query_params.get('status'):
+        statuses = parse_statuses(query_params['status'])
+        placeholders = [f':status{index}' for index in range(len(statuses))]
+        filters.append(f"#status IN ({', '.join(placeholders)})")
+        names['#status'] = 'status'
+        values.update(zip(placeholders, statuses))
+    if 'priority' in query_params:
+        filters.append('priority = :priority')
+        values[':priority'] = query_params['priority']
+    created = parse_created_range(query_params)
+    if created:
+        filters.append(created_condition(created))
+        names['#createdAt'] = 'createdAt'
+        values.update({f':{name}': value for name, value in created.items()})
+
+    reads = {}
+    for shard in range(DUE_SHARDS):
+        bucket = f'open#{shard}'
+        read_kwargs = {
+            'IndexName': DUE_INDEX,
+            'KeyConditionExpression': f'#dueBucket = :dueBucket AND {key_condition}',
+            'ExpressionAttributeNames': dict(names),
+            'ExpressionAttributeValues': dict(values, **{':dueBucket': bucket})
+        }
+        if filters:
+            read_kwargs['FilterExpression'] = ' AND '.join(filters)
+        reads[bucket] = read_kwargs
+    return reads
+
+
+def start_key(task):
+    """
+    The due-index ExclusiveStartKey just past a task returned from it
+    """
+    return {'taskId': task['taskId'], 'dueBucket': due_bucket(task['taskId']), 'dueKey': task['dueDate']}
+
+
+def backfill(tasks_table, total_segments=DEFAULT_SEGMENTS):
+    """
+    Set the index attributes on every task missing them, returning the number updated.
+
+    Reads the stored items directly, since the codec hides the index
+    attributes. Each write is conditional on the status and dueDate it was
+    derived from, so tasks updated meanwhile are left to the handlers.
+    """
+    updated = 0
+    projection = {
+        'ProjectionExpression': '#taskId, #status, #dueDate, #dueBucket, #dueKey',
+        'ExpressionAttributeNames': {
+            '#taskId': 'taskId', '#status': 'status', '#dueDate': 'dueDate',
+            '#dueBucket': 'dueBucket', '#dueKey': 'dueKey'
+        }
+    }
+    for item in parallel_scan(tasks_table, total_segments, **projection):
+        desired = index_attributes(item)
+        current = {name: item[name] for name in INDEX_ATTRIBUTES if name in item}
+        if desired == current:
+            continue
+
+        names = {'#status': 'status', '#dueDate': 'dueDate'}
+        values = {':status': item.get('status')}
+        if item.get('dueDate') is None:
+            due_condition = '(attribute_not_exists(#dueDate) OR attribute_type(#dueDate, :null))'
+            values[':null'] = 'NULL'
+        else:
+            due_condition = '#dueDate = :dueDate'
+            values[':dueDate'] = item['dueDate']
+        assignments = []
+        removals = []
+        for name in INDEX_ATTRIBUTES:
+            names[f'#{name}'] = name
+            if name in desired:
+                assignments.append(f'#{name} = :{name}')
+                values[f':{name}'] = desired[name]
+            else:
+                removals.append(f'#{name}')
+        expression = ' '.join(filter(None, (
+            'SET ' + ', '.join(assignments) if assignments else '',
+            'REMOVE ' + ', '.join(removals) if removals else ''
+        )))
+        try:
+            tasks_table.update_item(
+                Key={'taskId': item['taskId']},
+                UpdateExpression=expression,
+                ConditionExpression=f'#status = :status AND {due_condition}',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            updated += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    return updated
+
+
+def main(argv=None):
+    # Imported here: every write handler loads this module through codec
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backfill', action='store_true', help='index every task in TASKS_TABLE_NAME')
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    args = parser.parse_args(argv)
+
+    if not args.backfill:
+        parser.print_help()
+        return 1
+    updated = backfill(Table(os.environ.get('TASKS_TABLE_NAME')), args.segments)
+    print(f'Updated {updated} tasks', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import hashlib
+
+# Content codings a representation may be compressed with; each gets its own ETag
+CONTENT_CODINGS = ('gzip', 'deflate')
+
+
+def _digest(parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return f'"{digest.hexdigest()}"'
+
+
+def task_etag(item, fields=None):
+    """
+    Strong ETag for a single task representation.
+
+    Derived from the task's identity and updatedAt, which every write bumps,
+    plus the requested projection so different field sets never collide.
+    """
+    return _digest((item.get('taskId'), item.get('updatedAt'), ','.join(fields or ())))
+
+
+def collection_etag(items, *extra):
+    """
+    Strong ETag for a list of tasks and anything else that shapes the response
+    """
+    parts = []
+    for item in items:
+        parts.append(item.get('taskId'))
+        parts.append(item.get('updatedAt'))
+    parts.extend(extra)
+    return _digest(parts)
+
+
+def coded_etag(etag, coding):
+    """
+    ETag of a representation in a content coding, distinct from the identity one's
+    """
+    return f'{etag[:-1]}-{coding}"' if coding else etag
+
+
+def _identity_etag(candidate):
+    for coding in CONTENT_CODINGS:
+        suffix = f'-{coding}"'
+        if candidate.endswith(suffix):
+            return candidate[:-len(suffix)] + '"'
+    return candidate
+
+
+def matched_etag(if_none_match, etag):
+    """
+    The If-None-Match entry matching `etag` under weak comparison, or None.
+
+    The tags of its compressed representations match too, since they carry
+    the same content.
+    """
+    for candidate in (if_none_match or '').split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if _identity_etag(candidate) == etag:
+            return candidate
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Evaluate an If-None-Match header against an ETag using weak comparison
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return matched_etag(if_none_match, etag) is not None
+
+
+def etag_headers(etag):
+    """
+    Response headers that publish an ETag to browsers as well as other clients
+    """
+    return {'ETag': etag, 'Access-Control-Expose-Headers': 'ETag'}
@@ -0,0 +1,207 @@
+"""
+Export tasks as newline-delimited JSON.
+
+Runs as a Lambda function writing to the EXPORT_BUCKET, or from the command
+line over the same pipeline:
+
+    python src/handlers/export_tasks.py --output tasks.ndjson.gz --gzip --status pending
+    python src/handlers/export_tasks.py --output s3://bucket/exports/tasks.ndjson
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from itertools import chain
+import logging
+from codec import EncodedTable
+from instrumentation import instrumented
+from ndjson import chunk_lines, encode_lines
+from pagination import iter_items
+from parallel_scan import DEFAULT_SEGMENTS, parallel_scan
+from query_planner import plan_list_query
+from runtime import Table
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
+scan_segments = int(os.environ.get('SCAN_SEGMENTS', DEFAULT_SEGMENTS))
+
+S3_PART_BYTES = 8 * 1024 * 1024
+
+
+def read_tasks(status=None, priority=None):
+    """
+    Yield the tasks matching the filters without materializing them.
+
+    A status is answered by paging a Query on the status-index GSI, and
+    several comma-separated statuses by one Query each, in turn; the whole
+    table is read with a parallel segmented scan. A priority is applied as a
+    filter on any read.
+    """
+    query_params = {}
+    if status:
+        query_params['status'] = status
+    if priority:
+        query_params['priority'] = priority
+
+    operation, read_kwargs = plan_list_query(query_params)
+    if operation == 'query':
+        return iter_items(table.query, read_kwargs)
+    if operation == 'merge':
+        return chain.from_iterable(iter_items(table.query, kwargs) for kwargs in read_kwargs)
+    return parallel_scan(table, scan_segments, **read_kwargs)
+
+
+class FileSink:
+    """
+    Write chunks to a local file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.path)
+
+
+class S3Sink:
+    """
+    Stream chunks to an S3 (or S3-compatible) object with a multipart upload.
+
+    Chunks are buffered only up to one part, so memory stays flat however
+    large the export grows.
+    """
+
+    def __init__(self, bucket, key, client=None, part_bytes=S3_PART_BYTES):
+        if client is None:
+            import boto3
+            client = boto3.client('s3', endpoint_url=os.environ.get('EXPORT_S3_ENDPOINT_URL'))
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_bytes = part_bytes
+        self.buffer = bytearray()
+        self.parts = []
+        self.upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId']
+
+    def _upload_part(self):
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=bytes(self.buffer)
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer.clear()
+
+    def write(self, chunk):
+        self.buffer.extend(chunk)
+        if len(self.buffer) >= self.part_bytes:
+            self._upload_part()
+
+    def close(self):
+        # Every part but the last must be at least 5 MiB, so the remainder
+        # (possibly empty, for an empty export) always goes out last
+        if self.buffer or not self.parts:
+            self._upload_part()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
+
+    def abort(self):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+def open_sink(target):
+    """
+    Open a sink for a local path or an s3://bucket/key URL
+    """
+    if target.startswith('s3://'):
+        bucket, _, key = target[len('s3://'):].partition('/')
+        if not bucket or not key:
+            raise ValueError(f'Invalid S3 target: {target}')
+        return S3Sink(bucket, key)
+    return FileSink(target)
+
+
+def export_tasks(sink, status=None, priority=None, compress=False):
+    """
+    Stream matching tasks into `sink` as NDJSON, returning the task and byte counts
+    """
+    stats = {'count': 0, 'bytes': 0}
+
+    def counted(items):
+        for item in items:
+            stats['count'] += 1
+            yield item
+
+    try:
+        for chunk in chunk_lines(encode_lines(counted(read_tasks(status, priority))), compress=compress):
+            sink.write(chunk)
+            stats['bytes'] += len(chunk)
+    except BaseException:
+        sink.abort()
+        raise
+    sink.close()
+    return stats
+
+
+def default_key(compress):
+    timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    return f"exports/tasks-{timestamp}.ndjson{'.gz' if compress else ''}"
+
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Export tasks to the EXPORT_BUCKET.
+
+    The event may carry `status` and `priority` filters, `gzip` and the
+    object `key`; it returns where the export was written and its size.
+    """
+    event = event or {}
+    compress = bool(event.get('gzip', True))
+    bucket = os.environ.get('EXPORT_BUCKET')
+    key = event.get('key') or default_key(compress)
+
+    stats = export_tasks(
+        S3Sink(bucket, key),
+        status=event.get('status'),
+        priority=event.get('priority'),
+        compress=compress
+    )
+
+    logger.info(f"Exported {stats['count']} tasks to s3://{bucket}/{key}")
+
+    return dict(stats, bucket=bucket, key=key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', required=True, help='local path or s3://bucket/key')
+    parser.add_argument('--status', help='only export tasks with this status')
+    parser.add_argument('--priority', help='only export tasks with this priority')
+    parser.add_argument('--gzip', action='store_true', help='gzip-compress the output')
+    args = parser.parse_args(argv)
+
+    stats = export_tasks(open_sink(args.output), args.status, args.priority, compress=args.gzip)
+    print(f"Exported {stats['count']} tasks ({stats['bytes']} bytes) to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
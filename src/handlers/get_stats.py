@@ -0,0 +1,57 @@
+import os
+from botocore.exceptions import ClientError
+import logging
+from instrumentation import instrumented
+from runtime import Table, build_response
+from stream_processor import SUMMARY_ID
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+stats_table = Table(os.environ.get('STATS_TABLE_NAME'))
+
+def summarize(item):
+    """
+    Reshape the flat counter attributes of the summary item for the API
+    """
+    stats = {'total': 0, 'byStatus': {}, 'byPriority': {}, 'byStatusPriority': {}}
+
+    for key, value in item.items():
+        parts = key.split('#')
+        if key == 'total':
+            stats['total'] = value
+        elif parts[0] == 'status' and len(parts) == 2:
+            stats['byStatus'][parts[1]] = value
+        elif parts[0] == 'priority' and len(parts) == 2:
+            stats['byPriority'][parts[1]] = value
+        elif parts[0] == 'statusPriority' and len(parts) == 3:
+            stats['byStatusPriority'].setdefault(parts[1], {})[parts[2]] = value
+
+    return stats
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Return task counts per status and priority from the stream-maintained summary
+    """
+    try:
+        response = stats_table.get_item(Key={'statsId': SUMMARY_ID})
+        stats = summarize(response.get('Item', {}))
+
+        logger.info("Successfully retrieved task stats")
+
+        return build_response(200, {
+            'stats': stats
+        })
+
+    except ClientError as e:
+        # Log full exception details for internal debugging, but do not expose them to clients
+        logger.error("DynamoDB error while retrieving task stats", exc_info=True)
+        return build_response(500, {
+            'error': 'Failed to retrieve task stats'
+        })
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return build_response(500, {
+            'error': 'Internal server error'
+        })
@@ -1,16 +1,300 @@
-import json
 import os
-import boto3
+from itertools import chain
 from botocore.exceptions import ClientError
 import logging
+from archive import get_archive, partition_days, read_archived
+from batch_ops import batch_get
+from codec import EncodedTable
+from compression import compressible
+from due_index import DUE_INDEX, plan_due_query, start_key as due_start_key
+from etags import collection_etag, etag_headers, etag_matches, task_etag
+from instrumentation import instrumented
+from merge_query import merged_query
+from pagination import (
+    KEY_ATTRIBUTES, MAX_PAGE_SIZE, decode_cursors, decode_token, encode_cursors, encode_token,
+    iter_items, parse_limit, read_pages
+)
+from parallel_scan import DEFAULT_SEGMENTS, parallel_scan
+from query_planner import (
+    STATUS_INDEX, parse_created_range, parse_fields, parse_statuses, plan_list_query, projection_kwargs,
+    select_fields
+)
+from runtime import Table, build_empty_response, build_response, get_header
+from sorting import index_direction, parse_sort, top_k
+from tag_index import INDEXED_ATTRIBUTES, find_tagged_ids, parse_tags, task_matches
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
-table_name = os.environ.get('TASKS_TABLE_NAME')
-table = dynamodb.Table(table_name)
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
 
+scan_segments = int(os.environ.get('SCAN_SEGMENTS', DEFAULT_SEGMENTS))
+
+MAX_BATCH_GET = 500
+
+def get_tasks_by_ids(ids_param, fields=None, if_none_match=None):
+    """
+    Fetch a comma-separated list of tasks with BatchGetItem, in request order
+    """
+    task_ids = list(dict.fromkeys(task_id.strip() for task_id in ids_param.split(',') if task_id.strip()))
+
+    if not task_ids or len(task_ids) > MAX_BATCH_GET:
+        return build_response(400, {
+            'error': f'ids must list between 1 and {MAX_BATCH_GET} task IDs'
+        })
+
+    get_kwargs = projection_kwargs(fields, required=('taskId', 'updatedAt')) if fields else {}
+    found, unprocessed = batch_get(table, 'taskId', task_ids, **get_kwargs)
+    tasks = [found.get(task_id) for task_id in task_ids]
+    etag = collection_etag([task or {'taskId': task_id} for task_id, task in zip(task_ids, tasks)],
+                           ','.join(fields or ()), ','.join(unprocessed))
+
+    if etag_matches(if_none_match, etag):
+        return build_empty_response(304, etag_headers(etag))
+
+    if fields:
+        tasks = [task and select_fields(task, fields) for task in tasks]
+    unprocessed_ids = set(unprocessed)
+    not_found = [task_id for task_id in task_ids if task_id not in found and task_id not in unprocessed_ids]
+
+    logger.info(f"Successfully retrieved {len(found)} of {len(task_ids)} requested tasks")
+
+    return build_response(200, {
+        'tasks': tasks,
+        'count': len(found),
+        'notFound': not_found,
+        'unprocessed': unprocessed
+    }, etag_headers(etag))
+
+def list_response(tasks, fields, next_token, if_none_match, extra=None):
+    """
+    Build a 200 (or 304) task listing with a collection ETag
+    """
+    etag = collection_etag(tasks, ','.join(fields or ()), next_token, *(extra or {}).values())
+
+    if etag_matches(if_none_match, etag):
+        return build_empty_response(304, etag_headers(etag))
+
+    if fields:
+        tasks = [select_fields(task, fields) for task in tasks]
+
+    logger.info(f"Successfully retrieved {len(tasks)} tasks")
+
+    return build_response(200, dict({
+        'tasks': tasks,
+        'count': len(tasks),
+        'nextToken': next_token
+    }, **(extra or {})), etag_headers(etag))
+
+def get_tasks_by_tags(query_params, fields=None, if_none_match=None):
+    """
+    List tasks carrying all (or any) of the requested tags via the tag index.
+
+    Matching ids come from merging the tags' sorted posting lists, so only
+    matching tasks are read from the tasks table. Results are ordered by
+    taskId and `nextToken` resumes after the last one returned.
+    """
+    try:
+        if query_params.get('sort'):
+            raise ValueError('sort is not supported with tag filters')
+        if query_params.get('createdAfter') or query_params.get('createdBefore'):
+            # The tag index holds no createdAt, the same restriction bulk jobs apply
+            raise ValueError('tag filters cannot be combined with createdAfter/createdBefore')
+        tags, match = parse_tags(query_params['tag'], query_params.get('tagMatch'))
+        limit = parse_limit(query_params.get('limit')) or MAX_PAGE_SIZE
+        start_key = decode_token(query_params.get('nextToken'), 'tags')
+    except ValueError as e:
+        return build_response(400, {
+            'error': str(e)
+        })
+
+    filters = {name: query_params[name] for name in INDEXED_ATTRIBUTES if query_params.get(name)}
+    if 'status' in filters:
+        filters['status'] = parse_statuses(filters['status'])
+    task_ids, more = find_tagged_ids(
+        tags, match, filters, after=start_key and start_key['taskId'], limit=limit
+    )
+
+    required = ('taskId', 'updatedAt', 'tags') + INDEXED_ATTRIBUTES
+    get_kwargs = projection_kwargs(fields, required=required) if fields else {}
+    found, unprocessed = batch_get(table, 'taskId', task_ids, **get_kwargs)
+    # Ids whose task vanished, or no longer matches, since it was indexed are skipped
+    tasks = [
+        found[task_id] for task_id in task_ids
+        if task_id in found and task_matches(found[task_id], tags, match, filters)
+    ]
+
+    next_token = encode_token({'taskId': task_ids[-1]}, 'tags') if more else None
+    return list_response(tasks, fields, next_token, if_none_match, {'unprocessed': unprocessed} if unprocessed else None)
+
+def get_tasks_by_statuses(reads, fields, query_params, if_none_match=None, sorted_by_index=False):
+    """
+    List tasks in several statuses, oldest first (newest first with `sort=-createdAt`).
+
+    Each status is a concurrent Query on the status-index GSI and the
+    createdAt-ordered results are k-way merged, stopping at `limit`.
+    """
+    statuses = [read_kwargs['ExpressionAttributeValues'][':status'] for read_kwargs in reads]
+    try:
+        limit = parse_limit(query_params.get('limit')) or MAX_PAGE_SIZE
+        cursors = decode_cursors(query_params.get('nextToken'), STATUS_INDEX, statuses)
+    except ValueError as e:
+        return build_response(400, {
+            'error': str(e)
+        })
+
+    if fields:
+        reads = [dict(read_kwargs, **projection_kwargs(
+            fields,
+            required=KEY_ATTRIBUTES[STATUS_INDEX] + ('updatedAt',),
+            expression_names=read_kwargs.get('ExpressionAttributeNames')
+        )) for read_kwargs in reads]
+
+    reverse = reads[0].get('ScanIndexForward') is False
+    tasks, cursors = merged_query(
+        table.query, dict(zip(statuses, reads)), 'createdAt', limit=limit, cursors=cursors, reverse=reverse
+    )
+    next_token = encode_cursors(cursors, STATUS_INDEX) if cursors else None
+    return list_response(tasks, fields, next_token, if_none_match, {'sortSource': 'index'} if sorted_by_index else None)
+
+def get_top_tasks(operation, read_kwargs, sort, fields, query_params, if_none_match=None):
+    """
+    List the first `limit` tasks in an order no index provides.
+
+    Every matching item is streamed through a bounded heap, so only `limit`
+    tasks (default and at most 1000) are held at once however many are
+    read. The result is a single page without a nextToken.
+    """
+    try:
+        limit = parse_limit(query_params.get('limit')) or MAX_PAGE_SIZE
+        if query_params.get('nextToken'):
+            raise ValueError('nextToken is not supported for this sort')
+    except ValueError as e:
+        return build_response(400, {
+            'error': str(e)
+        })
+
+    reads = read_kwargs if operation == 'merge' else [read_kwargs]
+    if fields:
+        # Sort fields are read even when not returned so the heap can order by them
+        reads = [dict(kwargs, **projection_kwargs(
+            fields,
+            required=tuple(field for field, _ in sort) + ('taskId', 'updatedAt'),
+            expression_names=kwargs.get('ExpressionAttributeNames')
+        )) for kwargs in reads]
+
+    if operation == 'scan':
+        items = parallel_scan(table, scan_segments, **reads[0])
+    else:
+        items = chain.from_iterable(iter_items(table.query, kwargs) for kwargs in reads)
+
+    tasks = top_k(items, sort, limit)
+    return list_response(tasks, fields, None, if_none_match, {'sortSource': 'topK'})
+
+def archived_filter(query_params):
+    """
+    Predicate applying the list filters to archived tasks, which have no indexes
+    """
+    bounds = parse_created_range(query_params)
+    statuses = set(parse_statuses(query_params['status'])) if query_params.get('status') else None
+    priority = query_params.get('priority')
+    ids = {task_id.strip() for task_id in query_params['ids'].split(',')} if query_params.get('ids') else None
+    tags, match = (None, None)
+    if query_params.get('tag'):
+        tags, match = parse_tags(query_params['tag'], query_params.get('tagMatch'))
+
+    def matches(task):
+        if not bounds['createdAfter'] <= task.get('createdAt', '') <= bounds['createdBefore']:
+            return False
+        if statuses is not None and task.get('status') not in statuses:
+            return False
+        if priority and task.get('priority') != priority:
+            return False
+        if ids is not None and task.get('taskId') not in ids:
+            return False
+        if tags:
+            present = [tag in (task.get('tags') or ()) for tag in tags]
+            return all(present) if match == 'all' else any(present)
+        return True
+    return matches
+
+def get_archived_tasks(query_params, fields=None, if_none_match=None):
+    """
+    List archived tasks created within a createdAfter/createdBefore window.
+
+    The archive is partitioned by creation date, so only the window's
+    partitions are read, one object at a time; the other list filters are
+    applied as tasks stream past. `nextToken` resumes after the last task.
+    """
+    try:
+        if query_params.get('sort'):
+            raise ValueError('sort is not supported for archived tasks')
+        days = partition_days(parse_created_range(query_params))
+        matches = archived_filter(query_params)
+        limit = parse_limit(query_params.get('limit')) or MAX_PAGE_SIZE
+        after = decode_token(query_params.get('nextToken'), 'archive')
+    except ValueError as e:
+        return build_response(400, {
+            'error': str(e)
+        })
+
+    tasks = []
+    position = None
+    more = False
+    for key, line, task in read_archived(get_archive(), days, after):
+        if not matches(task):
+            continue
+        if len(tasks) == limit:
+            more = True
+            break
+        tasks.append(task)
+        position = {'object': key, 'line': line}
+
+    next_token = encode_token(position, 'archive') if more else None
+    return list_response(tasks, fields, next_token, if_none_match, {'source': 'archive'})
+
+def get_due_tasks(query_params, fields=None, if_none_match=None):
+    """
+    List open tasks due within a dueAfter/dueBefore window, soonest first.
+
+    Reads the sparse due-index, which holds only open tasks with a due
+    date, one Query per shard merged on dueDate, so a reminder sweep reads
+    only the tasks it returns. `sort=-dueDate` lists the latest first.
+    """
+    try:
+        if 'tag' in query_params or 'ids' in query_params:
+            raise ValueError('dueBefore/dueAfter cannot be combined with tag or ids')
+        sort = parse_sort(query_params.get('sort'))
+        if sort and [field for field, _ in sort] != ['dueDate']:
+            raise ValueError('Tasks filtered by due date can only be sorted by dueDate')
+        reads = plan_due_query(query_params)
+        limit = parse_limit(query_params.get('limit')) or MAX_PAGE_SIZE
+        cursors = decode_cursors(query_params.get('nextToken'), DUE_INDEX, reads)
+    except ValueError as e:
+        return build_response(400, {
+            'error': str(e)
+        })
+
+    reverse = bool(sort) and sort[0][1]
+    for read_kwargs in reads.values():
+        if reverse:
+            read_kwargs['ScanIndexForward'] = False
+        if fields:
+            read_kwargs.update(projection_kwargs(
+                fields,
+                required=('taskId', 'dueDate', 'updatedAt'),
+                expression_names=read_kwargs.get('ExpressionAttributeNames')
+            ))
+
+    # The index attributes are not returned with items, so cursors are rebuilt from taskId and dueDate
+    tasks, cursors = merged_query(
+        table.query, reads, 'dueDate', limit=limit, cursors=cursors, reverse=reverse, cursor_key=due_start_key
+    )
+    next_token = encode_cursors(cursors, DUE_INDEX) if cursors else None
+    return list_response(tasks, fields, next_token, if_none_match, {'sortSource': 'index'} if sort else None)
+
+@instrumented
+@compressible
 def lambda_handler(event, context):
     """
     Get a single task or list all tasks
@@ -18,94 +302,110 @@ def lambda_handler(event, context):
     try:
         path_parameters = event.get('pathParameters', {})
         task_id = path_parameters.get('taskId') if path_parameters else None
+        query_params = event.get('queryStringParameters') or {}
+        if_none_match = get_header(event, 'If-None-Match')
+
+        try:
+            fields = parse_fields(query_params.get('fields'))
+        except ValueError as e:
+            return build_response(400, {
+                'error': str(e)
+            })
 
         if task_id:
-            response = table.get_item(Key={'taskId': task_id})
+            if if_none_match:
+                # Answer the freshness check from the version attributes alone
+                # before paying to transfer and encode the whole item
+                probe = table.get_item(Key={'taskId': task_id}, **projection_kwargs(('taskId', 'updatedAt')))
+                if 'Item' in probe:
+                    etag = task_etag(probe['Item'], fields)
+                    if etag_matches(if_none_match, etag):
+                        return build_empty_response(304, etag_headers(etag))
+
+            get_kwargs = projection_kwargs(fields, required=('taskId', 'updatedAt')) if fields else {}
+            response = table.get_item(Key={'taskId': task_id}, **get_kwargs)
             
             if 'Item' not in response:
-                return {
-                    'statusCode': 404,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'Task not found'
-                    })
-                }
+                return build_response(404, {
+                    'error': 'Task not found'
+                })
             
+            etag = task_etag(response['Item'], fields)
+            task = select_fields(response['Item'], fields) if fields else response['Item']
+
             logger.info(f"Successfully retrieved task: {task_id}")
             
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'task': response['Item']
-                }, default=str)
-            }
+            return build_response(200, {
+                'task': task
+            }, etag_headers(etag))
         else:
-            query_params = event.get('queryStringParameters', {})
-            scan_kwargs = {}
-
-            if query_params:
-                filter_expressions = []
-                expression_values = {}
-                
-                if 'status' in query_params:
-                    filter_expressions.append('#status = :status')
-                    expression_values[':status'] = query_params['status']
-                
-                if 'priority' in query_params:
-                    filter_expressions.append('priority = :priority')
-                    expression_values[':priority'] = query_params['priority']
-                
-                if filter_expressions:
-                    scan_kwargs['FilterExpression'] = ' AND '.join(filter_expressions)
-                    scan_kwargs['ExpressionAttributeValues'] = expression_values
-                    scan_kwargs['ExpressionAttributeNames'] = {'#status': 'status'}
-            
-            response = table.scan(**scan_kwargs)
-            tasks = response.get('Items', [])
-            
-            logger.info(f"Successfully retrieved {len(tasks)} tasks")
+            if query_params.get('archived') == 'true':
+                return get_archived_tasks(query_params, fields, if_none_match)
+            if query_params.get('dueBefore') or query_params.get('dueAfter'):
+                return get_due_tasks(query_params, fields, if_none_match)
+            if 'ids' in query_params:
+                if query_params.get('sort'):
+                    # Tasks fetched by id come back in the requested order
+                    return build_response(400, {
+                        'error': 'sort is not supported with ids'
+                    })
+                return get_tasks_by_ids(query_params['ids'], fields, if_none_match)
+            if 'tag' in query_params:
+                return get_tasks_by_tags(query_params, fields, if_none_match)
+
+            try:
+                operation, read_kwargs = plan_list_query(query_params)
+                sort = parse_sort(query_params.get('sort'))
+            except ValueError as e:
+                return build_response(400, {
+                    'error': str(e)
+                })
+
+            if sort:
+                forward = index_direction(sort)
+                if forward is None or operation == 'scan':
+                    return get_top_tasks(operation, read_kwargs, sort, fields, query_params, if_none_match)
+                # The status-index range key is createdAt, so read it in the requested direction
+                for kwargs in (read_kwargs if operation == 'merge' else [read_kwargs]):
+                    kwargs['ScanIndexForward'] = forward
+
+            if operation == 'merge':
+                return get_tasks_by_statuses(read_kwargs, fields, query_params, if_none_match, bool(sort))
+
+            index_name = read_kwargs.get('IndexName')
+
+            if fields:
+                # Key attributes are always read so a page can be resumed from its last item
+                read_kwargs.update(projection_kwargs(
+                    fields,
+                    required=KEY_ATTRIBUTES[index_name] + ('updatedAt',),
+                    expression_names=read_kwargs.get('ExpressionAttributeNames')
+                ))
+
+            try:
+                limit = parse_limit(query_params.get('limit')) or MAX_PAGE_SIZE
+                start_key = decode_token(query_params.get('nextToken'), index_name)
+            except ValueError as e:
+                return build_response(400, {
+                    'error': str(e)
+                })
+
+            read = table.query if operation == 'query' else table.scan
+            tasks, last_key = read_pages(read, read_kwargs, limit=limit, start_key=start_key)
             
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'tasks': tasks,
-                    'count': len(tasks)
-                }, default=str)
-            }
+            return list_response(
+                tasks, fields, encode_token(last_key, index_name), if_none_match,
+                {'sortSource': 'index'} if sort else None
+            )
             
     except ClientError as e:
         # Log full exception details for internal debugging, but do not expose them to clients
         logger.error("DynamoDB error while retrieving task(s)", exc_info=True)
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Failed to retrieve tasks'
-            })
-        }
+        return build_response(500, {
+            'error': 'Failed to retrieve tasks'
+        })
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Internal server error'
-            })
-        }
+        return build_response(500, {
+            'error': 'Internal server error'
+        })
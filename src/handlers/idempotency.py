@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from runtime import Table
+
+idempotency_table = Table(os.environ.get('IDEMPOTENCY_TABLE_NAME'))
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '1024'))
+# Longer than the function timeout, so a live owner never loses its claim
+LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '60'))
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+
+
+class KeyReused(Exception):
+    """
+    Raised when an idempotency key is replayed with a different request body
+    """
+
+
+class RequestInProgress(Exception):
+    """
+    Raised when another request holds a live claim on an idempotency key
+    """
+
+
+class ResponseCache:
+    """
+    Bounded LRU of recorded responses kept for the life of a warm container.
+
+    Entries expire with their DynamoDB record, so a key is never replayed
+    from memory after the table would have forgotten it.
+    """
+
+    def __init__(self, capacity=CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            record = self._entries.get(key)
+            if record is None:
+                return None
+            if record['expiresAt'] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return record
+
+    def put(self, key, record):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = record
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = ResponseCache()
+
+
+def scoped_key(scope, key):
+    """
+    Namespace a client key by operation so one key cannot replay another route
+    """
+    return f'{scope}#{key}'
+
+
+def fingerprint(body):
+    """
+    Hash of the parsed request body, independent of key order and whitespace
+    """
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def validate_key(key):
+    """
+    Return an error message if an Idempotency-Key header is unusable, otherwise None
+    """
+    if not key or not key.strip():
+        return f'{IDEMPOTENCY_HEADER} must not be empty'
+    if len(key) > MAX_KEY_LENGTH:
+        return f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+    return None
+
+
+def _checked(record, request_fingerprint):
+    if record['fingerprint'] != request_fingerprint:
+        raise KeyReused(record['idempotencyKey'])
+    return record
+
+
+def lookup(key, request_fingerprint):
+    """
+    Return the completed response recorded in this container for a key, or None.
+
+    Raises KeyReused when the key was recorded for a different body.
+    """
+    record = cache.get(key)
+    if record is None:
+        return None
+    return _checked(record, request_fingerprint)
+
+
+def _normalized(record):
+    for name in ('expiresAt', 'statusCode', 'leaseExpiresAt'):
+        if name in record:
+            record[name] = int(record[name])
+    # Records written before claims had states were only ever stored complete
+    record.setdefault('state', COMPLETED)
+    return record
+
+
+def claim(key, request_fingerprint, status_code, body):
+    """
+    Atomically claim a key before the operation it guards runs.
+
+    The claim is stored IN_PROGRESS with the response the operation will
+    return, and is only replayed once `complete` marks it COMPLETED.
+    Returns (owned, record): when `owned` the caller must run the operation
+    for `record['body']`, which is the abandoned claim's response when a
+    claim whose owner died was taken over; otherwise `record` is the
+    completed response to replay.
+
+    Raises KeyReused for a different body and RequestInProgress while
+    another request holds a live claim. Expired records still awaiting TTL
+    deletion count as absent.
+    """
+    now = int(time.time())
+    record = {
+        'idempotencyKey': key,
+        'fingerprint': request_fingerprint,
+        'state': IN_PROGRESS,
+        'statusCode': status_code,
+        'body': body,
+        'leaseExpiresAt': now + LEASE_SECONDS,
+        'expiresAt': now + IDEMPOTENCY_TTL_SECONDS
+    }
+    try:
+        idempotency_table.put_item(
+            Item=record,
+            ConditionExpression='attribute_not_exists(idempotencyKey) OR expiresAt <= :now',
+            ExpressionAttributeValues={':now': now}
+        )
+        return True, record
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+    stored = idempotency_table.get_item(Key={'idempotencyKey': key}, ConsistentRead=True).get('Item')
+    if stored is None:
+        # Released by a failed request in between; claim it again
+        return claim(key, request_fingerprint, status_code, body)
+    stored = _checked(_normalized(stored), request_fingerprint)
+    if stored['state'] == COMPLETED:
+        cache.put(key, stored)
+        return False, stored
+    if stored['leaseExpiresAt'] > now:
+        raise RequestInProgress(key)
+
+    # The owner stopped before completing; take over its claim, and its response,
+    # unless another retry already has
+    lease = now + LEASE_SECONDS
+    try:
+        idempotency_table.update_item(
+            Key={'idempotencyKey': key},
+            UpdateExpression='SET leaseExpiresAt = :lease',
+            ConditionExpression='#state = :inProgress AND leaseExpiresAt = :previous',
+            ExpressionAttributeNames={'#state': 'state'},
+            ExpressionAttributeValues={
+                ':lease': lease, ':inProgress': IN_PROGRESS, ':previous': stored['leaseExpiresAt']
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        raise RequestInProgress(key)
+    stored['leaseExpiresAt'] = lease
+    return True, stored
+
+
+def complete(record):
+    """
+    Mark an owned claim COMPLETED once its operation has succeeded, so it is replayed from then on
+    """
+    try:
+        idempotency_table.update_item(
+            Key={'idempotencyKey': record['idempotencyKey']},
+            UpdateExpression='SET #state = :completed REMOVE leaseExpiresAt',
+            ConditionExpression='#state = :inProgress AND fingerprint = :fingerprint',
+            ExpressionAttributeNames={'#state': 'state'},
+            ExpressionAttributeValues={
+                ':completed': COMPLETED, ':inProgress': IN_PROGRESS, ':fingerprint': record['fingerprint']
+            }
+        )
+    except ClientError as e:
+        # A retry that took over the claim has completed it already
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    completed = {name: value for name, value in record.items() if name != 'leaseExpiresAt'}
+    completed['state'] = COMPLETED
+    cache.put(record['idempotencyKey'], completed)
+    return completed
+
+
+def release(key):
+    """
+    Forget a claimed key after the operation it guarded failed, so a retry can run it
+    """
+    cache.discard(key)
+    idempotency_table.delete_item(Key={'idempotencyKey': key})
@@ -0,0 +1,334 @@
+"""
+Bulk-import tasks from an NDJSON or CSV file.
+
+    python src/handlers/import_tasks.py tasks.ndjson --checkpoint tasks.ckpt --rejects rejects.ndjson
+    python src/handlers/import_tasks.py tasks.csv.gz --workers 16
+
+Rows are validated and defaulted exactly like POST /tasks and written by a
+bounded pool of BatchWriteItem workers. Progress is checkpointed so an
+interrupted import can be re-run with the same --checkpoint to resume.
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from botocore.exceptions import ClientError
+import logging
+from batch_ops import BATCH_WRITE_SIZE, MAX_ATTEMPTS
+from codec import EncodedTable
+from create_task import build_task, stored_item, validate_task
+from runtime import Table
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
+
+DEFAULT_WORKERS = 8
+CHECKPOINT_INTERVAL = 5.0
+THROTTLING_ERRORS = frozenset((
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+))
+# createdAt must start with an extended-format date, so it sorts and partitions as text
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def open_source(path):
+    """
+    Open a text file for reading, transparently decompressing .gz files
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def source_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'csv' if name.lower().endswith('.csv') else 'ndjson'
+
+
+def parse_csv_row(row):
+    """
+    Turn a CSV row into a task payload; empty cells are omitted and tags are `;`-separated
+    """
+    payload = {key: value for key, value in row.items() if key and value not in (None, '')}
+    if 'tags' in payload:
+        payload['tags'] = [tag.strip() for tag in payload['tags'].split(';') if tag.strip()]
+    return payload
+
+
+def read_rows(source, fmt='ndjson'):
+    """
+    Yield (line number, payload or None, error or None) for every data row
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, parse_csv_row(row), None
+        return
+
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except json.JSONDecodeError:
+            yield line_number, None, 'Invalid JSON'
+
+
+def validate_row(payload):
+    """
+    Return an error message if a row cannot be imported, otherwise None.
+
+    On top of the POST /tasks checks, a createdAt kept from the row must be
+    an extended-format ISO 8601 string: it is the status-index range key,
+    where any other type fails the whole batch the row is written in, and
+    createdAt windows and archive partitions compare it as text.
+    """
+    error = validate_task(payload)
+    if error:
+        return error
+    created_at = payload.get('createdAt')
+    if created_at in (None, ''):
+        return None
+    if not isinstance(created_at, str) or not _ISO_DATE.match(created_at):
+        return 'createdAt must be an ISO 8601 timestamp'
+    try:
+        datetime.fromisoformat(created_at)
+    except ValueError:
+        return 'createdAt must be an ISO 8601 timestamp'
+    return None
+
+
+def import_task(payload, import_id, line_number):
+    """
+    Build the stored item for a row.
+
+    The taskId is derived from the import and line number, so rows replayed
+    after a resume overwrite the item they wrote before instead of
+    duplicating it. A createdAt in the row is kept, as a historical backlog
+    has its own timestamps.
+    """
+    task = build_task(payload, payload.get('createdAt') or datetime.utcnow().isoformat())
+    task['taskId'] = str(uuid.uuid5(uuid.UUID(import_id), str(line_number)))
+    return stored_item(task)
+
+
+class AdaptiveThrottle:
+    """
+    Shared pacing delay for the writer pool.
+
+    Unprocessed items or throttling errors grow the delay multiplicatively;
+    clean writes shrink it again, so the pool settles just under the
+    table's available write capacity.
+    """
+
+    def __init__(self, min_delay=0.0, max_delay=2.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        delay = self.delay
+        if delay:
+            time.sleep(random.uniform(delay / 2, delay))
+
+    def penalize(self):
+        with self._lock:
+            self.throttled += 1
+            self.delay = min(self.max_delay, max(0.05, self.delay * 2))
+
+    def reward(self):
+        with self._lock:
+            delay = self.delay * 0.9
+            self.delay = delay if delay > 0.01 else self.min_delay
+
+
+def write_batch(table, requests, throttle, max_attempts=MAX_ATTEMPTS):
+    """
+    Write one BatchWriteItem chunk, retrying unprocessed items and throttling errors.
+
+    Returns (written count, failed requests).
+    """
+    pending = requests
+    for attempt in range(max_attempts):
+        throttle.wait()
+        try:
+            unprocessed = table.batch_write_item(pending)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERRORS:
+                logger.error("BatchWriteItem failed during import", exc_info=True)
+                return len(requests) - len(pending), pending
+            throttle.penalize()
+            continue
+
+        if not unprocessed:
+            throttle.reward()
+            return len(requests), []
+        throttle.penalize()
+        pending = unprocessed
+
+    return len(requests) - len(pending), pending
+
+
+class Checkpoint:
+    """
+    Persist import progress as a small JSON file, replaced atomically.
+
+    `line` is a low watermark: every row up to and including it has been
+    written or rejected, even though batches finish out of order.
+    """
+
+    def __init__(self, path=None, source=None):
+        self.path = path
+        self.state = {'source': source, 'importId': str(uuid.uuid4()), 'line': 0, 'written': 0, 'rejected': 0}
+        if path and os.path.exists(path):
+            with open(path) as handle:
+                self.state = json.load(handle)
+            if source and self.state.get('source') != source:
+                raise ValueError(f"Checkpoint {path} belongs to {self.state.get('source')}, not {source}")
+
+    def save(self):
+        if not self.path:
+            return
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(self.state, handle)
+        os.replace(temporary, self.path)
+
+
+def import_tasks(rows, checkpoint, workers=DEFAULT_WORKERS, rejects=None, max_in_flight=None):
+    """
+    Validate rows and write them with a bounded pool of BatchWriteItem workers.
+
+    Reading pauses whenever `max_in_flight` batches are outstanding, so a fast
+    reader cannot queue up the whole file in memory. Rejected rows are written
+    to `rejects` as NDJSON. Returns the checkpoint state plus throughput.
+    """
+    state = checkpoint.state
+    resume_after = state['line']
+    throttle = AdaptiveThrottle()
+    max_in_flight = max_in_flight or workers * 2
+
+    in_flight = {}
+    batch_last_line = {}
+    finished = set()
+    next_batch = 0
+    committed_batch = 0
+    batch = []
+    last_saved = time.monotonic()
+    started = time.monotonic()
+    written_this_run = 0
+    last_line = resume_after
+
+    def reject(line_number, error, payload=None):
+        state['rejected'] += 1
+        if rejects is not None:
+            rejects.write(json.dumps({'line': line_number, 'error': error, 'row': payload}, default=str) + '\n')
+
+    def collect(done):
+        nonlocal committed_batch, last_saved, written_this_run
+        for future in done:
+            sequence, lines = in_flight.pop(future)
+            written, failed = future.result()
+            state['written'] += written
+            written_this_run += written
+            for request in failed:
+                task = request['PutRequest']['Item']
+                reject(lines[task['taskId']], 'Failed to write task', task)
+            finished.add(sequence)
+
+        while committed_batch in finished:
+            finished.discard(committed_batch)
+            state['line'] = max(state['line'], batch_last_line.pop(committed_batch))
+            committed_batch += 1
+
+        if time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+            checkpoint.save()
+            last_saved = time.monotonic()
+
+    def submit(pool):
+        nonlocal next_batch, batch
+        if len(in_flight) >= max_in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        lines = {task['taskId']: line_number for line_number, task in batch}
+        requests = [{'PutRequest': {'Item': task}} for _, task in batch]
+        batch_last_line[next_batch] = batch[-1][0]
+        in_flight[pool.submit(write_batch, table, requests, throttle)] = (next_batch, lines)
+        next_batch += 1
+        batch = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for line_number, payload, error in rows:
+            if line_number <= resume_after:
+                continue
+            last_line = line_number
+            error = error or validate_row(payload)
+            if error:
+                reject(line_number, error, payload)
+                if not in_flight and not batch:
+                    state['line'] = line_number
+                continue
+            batch.append((line_number, import_task(payload, state['importId'], line_number)))
+            if len(batch) == BATCH_WRITE_SIZE:
+                submit(pool)
+
+        if batch:
+            submit(pool)
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    # Everything read has now been written or rejected
+    state['line'] = max(state['line'], last_line)
+    checkpoint.save()
+    elapsed = time.monotonic() - started
+    return dict(
+        state,
+        elapsed=round(elapsed, 3),
+        itemsPerSecond=round(written_this_run / elapsed, 1) if elapsed else None,
+        throttled=throttle.throttled
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='NDJSON or CSV file, optionally gzipped')
+    parser.add_argument('--format', choices=('ndjson', 'csv'), help='defaults to the file extension')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='concurrent BatchWriteItem calls')
+    parser.add_argument('--checkpoint', help='progress file; re-run with the same file to resume')
+    parser.add_argument('--rejects', help='append rejected rows to this NDJSON file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    checkpoint = Checkpoint(args.checkpoint, source=os.path.abspath(args.source))
+    rejects = open(args.rejects, 'a', encoding='utf-8') if args.rejects else None
+    try:
+        with open_source(args.source) as source:
+            rows = read_rows(source, args.format or source_format(args.source))
+            result = import_tasks(rows, checkpoint, workers=args.workers, rejects=rejects)
+    finally:
+        checkpoint.save()
+        if rejects:
+            rejects.close()
+
+    print(json.dumps(result), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
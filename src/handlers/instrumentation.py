@@ -0,0 +1,190 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TaskManagementAPI')
+
+# Per-call detail kept for the first calls only; totals per operation cover the rest,
+# so heavy invocations still fit one CloudWatch Logs event
+MAX_CALL_DETAILS = 10
+READ_OPERATIONS = frozenset(('get_item', 'query', 'scan', 'batch_get_item'))
+PHASE_METRICS = {
+    'parse': 'ParseTime',
+    'dynamodb': 'DynamoDBTime',
+    'encode': 'EncodeTime',
+    'compress': 'CompressTime'
+}
+
+_active = None
+_cold_start = True
+
+
+class _NullTimer:
+    """
+    Shared do-nothing timer handed out while no invocation is being recorded
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _PhaseTimer:
+    def __init__(self, invocation, name):
+        self.invocation = invocation
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.invocation.add_phase(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Invocation:
+    """
+    Collect timings and consumed capacity for one handler invocation.
+
+    Use it as a context manager around the handler body; on exit the
+    collected values are written to stdout as a single CloudWatch Embedded
+    Metric Format line. Only one invocation is active at a time (a Lambda
+    container serves one request at a time), but worker threads started by
+    the handler record into it too.
+    """
+
+    def __init__(self, handler_name, namespace=None):
+        self.handler_name = handler_name
+        self.namespace = namespace or METRICS_NAMESPACE
+        self.phases = {}
+        self.calls = []
+        self.call_count = 0
+        self.operations = {}
+        self.read_capacity = 0.0
+        self.write_capacity = 0.0
+        self.status_code = None
+        self.cold_start = False
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        global _active, _cold_start
+        self.cold_start, _cold_start = _cold_start, False
+        self.start = time.perf_counter()
+        _active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        duration = (time.perf_counter() - self.start) * 1000
+        _active = None
+        sys.stdout.write(json.dumps(self.to_emf(duration)) + '\n')
+        return False
+
+    def add_phase(self, name, elapsed_ms):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed_ms
+
+    def add_call(self, operation, elapsed_ms, consumed_capacity):
+        """
+        Record one DynamoDB round trip and the capacity it reported.
+
+        Round trips are folded into per-operation totals, so memory and the
+        EMF line stay bounded however many calls an invocation makes.
+        """
+        if isinstance(consumed_capacity, dict):
+            consumed_capacity = [consumed_capacity]
+        units = sum(entry.get('CapacityUnits', 0) for entry in consumed_capacity or ())
+        with self._lock:
+            self.call_count += 1
+            if len(self.calls) < MAX_CALL_DETAILS:
+                self.calls.append({'operation': operation, 'ms': round(elapsed_ms, 3), 'capacityUnits': units})
+            totals = self.operations.setdefault(operation, {'count': 0, 'ms': 0.0, 'capacityUnits': 0})
+            totals['count'] += 1
+            totals['ms'] += elapsed_ms
+            totals['capacityUnits'] += units
+            self.phases['dynamodb'] = self.phases.get('dynamodb', 0.0) + elapsed_ms
+            if operation in READ_OPERATIONS:
+                self.read_capacity += units
+            else:
+                self.write_capacity += units
+
+    def to_emf(self, duration_ms):
+        metrics = {
+            'Duration': (duration_ms, 'Milliseconds'),
+            'ColdStart': (1 if self.cold_start else 0, 'Count'),
+            'DynamoDBCalls': (self.call_count, 'Count'),
+            'ConsumedReadCapacity': (self.read_capacity, 'None'),
+            'ConsumedWriteCapacity': (self.write_capacity, 'None'),
+        }
+        for phase, elapsed in self.phases.items():
+            metrics[PHASE_METRICS.get(phase, f'{phase.capitalize()}Time')] = (elapsed, 'Milliseconds')
+
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [['Handler']],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()]
+                }]
+            },
+            'Handler': self.handler_name,
+            'statusCode': self.status_code,
+            'coldStart': self.cold_start,
+            'dynamodbOperations': {
+                operation: dict(totals, ms=round(totals['ms'], 3)) for operation, totals in self.operations.items()
+            },
+            'dynamodbCalls': self.calls
+        }
+        for name, (value, _) in metrics.items():
+            document[name] = round(value, 3) if isinstance(value, float) else value
+        return document
+
+
+def current():
+    """
+    Return the invocation being recorded, or None when instrumentation is idle
+    """
+    return _active
+
+
+def timed(phase):
+    """
+    Time a block as a named phase of the current invocation.
+
+    Returns a shared no-op context manager when nothing is being recorded,
+    so instrumented code paths cost a global lookup when metrics are off.
+    """
+    invocation = _active
+    if invocation is None:
+        return _NULL_TIMER
+    return _PhaseTimer(invocation, phase)
+
+
+def instrumented(handler):
+    """
+    Decorate a lambda_handler to emit EMF metrics when METRICS_ENABLED is set
+    """
+    if not METRICS_ENABLED:
+        return handler
+
+    handler_name = handler.__module__
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        with Invocation(handler_name) as invocation:
+            response = handler(event, context)
+            if isinstance(response, dict):
+                invocation.status_code = response.get('statusCode')
+            return response
+    return wrapper
@@ -0,0 +1,88 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pagination import KEY_ATTRIBUTES
+
+
+def query_stream(pool, read, read_kwargs, start_key=None, page_limit=None):
+    """
+    Yield the items of one Query in index order, prefetching the next page.
+
+    The first page is requested as soon as the stream is created, and each
+    following page while the current one is being consumed, so several
+    streams read from DynamoDB concurrently.
+    """
+    kwargs = dict(read_kwargs)
+    if start_key:
+        kwargs['ExclusiveStartKey'] = start_key
+    if page_limit is not None and 'FilterExpression' not in kwargs:
+        kwargs['Limit'] = page_limit
+
+    future = pool.submit(read, **kwargs)
+
+    def pages():
+        nonlocal future
+        while future is not None:
+            response = future.result()
+            last_key = response.get('LastEvaluatedKey')
+            if last_key:
+                kwargs['ExclusiveStartKey'] = last_key
+                future = pool.submit(read, **kwargs)
+            else:
+                future = None
+            yield from response.get('Items', [])
+
+    return pages()
+
+
+def tag_stream(stream, sort_attribute, items):
+    """
+    Pair each item with its sort value and stream so cursors can be advanced after the merge
+    """
+    for item in items:
+        yield item[sort_attribute], stream, item
+
+
+def merged_query(read, reads, sort_attribute, limit=None, cursors=None, max_workers=None, reverse=False,
+                 cursor_key=None):
+    """
+    Run one Query per stream concurrently and k-way merge them on `sort_attribute`.
+
+    `reads` maps a stream name (e.g. a status) to its Query kwargs; every
+    Query must return items ordered by `sort_attribute`, as a GSI range key
+    does, descending when `reverse` is set. The heap-based merge stops at
+    `limit`, so at most one page per stream is read beyond what is returned.
+
+    Returns the merged items plus, when more remain, the per-stream keys to
+    resume from: the last item taken from each stream. Streams that have
+    not contributed an item yet keep their previous cursor and otherwise
+    start again from their beginning. `cursor_key` builds a stream's key
+    from an item when the index keys are not all returned with it.
+    """
+    cursors = dict(cursors or {})
+    pool = ThreadPoolExecutor(max_workers=max_workers or len(reads))
+    try:
+        tagged = [
+            tag_stream(stream, sort_attribute, query_stream(pool, read, read_kwargs, cursors.get(stream), limit))
+            for stream, read_kwargs in reads.items()
+        ]
+        merged = heapq.merge(*tagged, key=lambda entry: entry[0], reverse=reverse)
+        entries = list(islice(merged, limit + 1 if limit is not None else None))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    more = limit is not None and len(entries) > limit
+    entries = entries[:limit] if more else entries
+
+    if not more:
+        return [item for _, _, item in entries], None
+
+    if cursor_key is None:
+        key_attributes = KEY_ATTRIBUTES[next(iter(reads.values())).get('IndexName')]
+
+        def cursor_key(item):
+            return {name: item[name] for name in key_attributes}
+
+    for _, stream, item in entries:
+        cursors[stream] = cursor_key(item)
+    return [item for _, _, item in entries], cursors
@@ -0,0 +1,45 @@
+"""
+NDJSON encoding shared by the export and archive handlers.
+"""
+import zlib
+from serialization import dumps
+
+CHUNK_BYTES = 1024 * 1024
+GZIP_LEVEL = 6
+
+
+def encode_lines(items):
+    """
+    Encode each item as one NDJSON line
+    """
+    for item in items:
+        yield dumps(item).encode('utf-8') + b'\n'
+
+
+def chunk_lines(lines, chunk_bytes=CHUNK_BYTES, compress=False):
+    """
+    Group encoded lines into chunks of roughly `chunk_bytes`, gzip-compressing them on the fly
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+
+    def flush():
+        data = b''.join(buffer)
+        buffer.clear()
+        return compressor.compress(data) if compressor else data
+
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            size = 0
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+
+MAX_PAGE_SIZE = 1000
+
+# Attributes that make up the ExclusiveStartKey for the table and each index
+KEY_ATTRIBUTES = {
+    None: ('taskId',),
+    'status-index': ('taskId', 'status', 'createdAt'),
+    # Tag listings resume after the last taskId returned
+    'tags': ('taskId',),
+    # Archived listings resume after a line of an archive object
+    'archive': ('object', 'line'),
+    'due-index': ('taskId', 'dueBucket', 'dueKey'),
+}
+
+
+def parse_limit(value):
+    """
+    Validate the `limit` query parameter, returning None when it is absent.
+    """
+    if value in (None, ''):
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+
+def encode_token(last_key, index_name=None):
+    """
+    Turn a LastEvaluatedKey into an opaque continuation token.
+
+    The token records which index it was issued for so it cannot be replayed
+    against a different read path.
+    """
+    if not last_key:
+        return None
+    payload = json.dumps({'i': index_name, 'k': last_key}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_token(token, index_name=None):
+    """
+    Turn a continuation token back into an ExclusiveStartKey.
+
+    Raises ValueError when the token is malformed or was issued for another
+    read path.
+    """
+    if not token:
+        return None
+    token_index, last_key = _unpack_token(token)
+
+    expected = KEY_ATTRIBUTES.get(index_name, KEY_ATTRIBUTES[None])
+    if token_index != index_name or not isinstance(last_key, dict) or set(last_key) != set(expected):
+        raise ValueError('Invalid nextToken')
+    return last_key
+
+
+def _unpack_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return payload['i'], payload['k']
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise ValueError('Invalid nextToken')
+
+
+def encode_cursors(cursors, index_name):
+    """
+    Turn the per-stream resume keys of a merged read into one token.
+
+    `cursors` maps each stream (e.g. a status) to the key of the last item
+    returned from it; streams that returned nothing yet are left out.
+    """
+    return encode_token(cursors, f'{index_name}+merge')
+
+
+def decode_cursors(token, index_name, streams):
+    """
+    Turn a merged-read token back into per-stream ExclusiveStartKeys
+    """
+    if not token:
+        return {}
+    token_index, cursors = _unpack_token(token)
+
+    expected = set(KEY_ATTRIBUTES[index_name])
+    if token_index != f'{index_name}+merge' or not isinstance(cursors, dict) or not cursors:
+        raise ValueError('Invalid nextToken')
+    for stream, last_key in cursors.items():
+        if stream not in streams or not isinstance(last_key, dict) or set(last_key) != expected:
+            raise ValueError('Invalid nextToken')
+    return cursors
+
+
+def read_pages(read, read_kwargs, limit=None, start_key=None):
+    """
+    Follow LastEvaluatedKey across Query/Scan pages.
+
+    Stops as soon as `limit` items have been collected. Returns the items and
+    the key to resume from, or None when the result set is exhausted.
+    """
+    kwargs = dict(read_kwargs)
+    if start_key:
+        kwargs['ExclusiveStartKey'] = start_key
+    key_attributes = KEY_ATTRIBUTES.get(kwargs.get('IndexName'), KEY_ATTRIBUTES[None])
+    items = []
+
+    while True:
+        if limit is not None and 'FilterExpression' not in kwargs:
+            # Without a filter every evaluated item is returned, so DynamoDB
+            # can stop exactly at the page boundary
+            kwargs['Limit'] = limit - len(items)
+
+        response = read(**kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+
+        if limit is not None and len(items) >= limit:
+            if len(items) > limit:
+                # Resume right after the last item handed back to the client
+                items = items[:limit]
+                last_key = {name: items[-1][name] for name in key_attributes}
+            return items, last_key
+
+        if not last_key:
+            return items, None
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def iter_items(read, read_kwargs):
+    """
+    Yield every item of a Query/Scan one page at a time.
+
+    Unlike read_pages nothing is accumulated, so memory stays bounded by a
+    single page however large the result set is.
+    """
+    kwargs = dict(read_kwargs)
+    while True:
+        response = read(**kwargs)
+        yield from response.get('Items', [])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
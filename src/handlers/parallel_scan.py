@@ -0,0 +1,65 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SEGMENTS = 4
+
+_SEGMENT_DONE = object()
+
+
+def parallel_scan(table, total_segments=DEFAULT_SEGMENTS, max_workers=None, **scan_kwargs):
+    """
+    Yield every item of a table using a Segment/TotalSegments parallel Scan.
+
+    Each segment is read page by page on its own worker thread and the pages
+    are merged into a single generator, so callers see one stream of items in
+    no particular order. A bounded queue between the workers and the consumer
+    keeps memory flat when the consumer is slower than DynamoDB. `table` must
+    be safe to share between threads, as runtime.Table is. Any error raised by
+    a worker is re-raised from the generator.
+    """
+    total_segments = max(1, int(total_segments))
+    pages = queue.Queue(maxsize=total_segments * 2)
+    stop = threading.Event()
+
+    def put(entry):
+        # Give up as soon as the consumer has gone away so workers can exit
+        while not stop.is_set():
+            try:
+                pages.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan_segment(segment):
+        kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+        try:
+            while not stop.is_set():
+                response = table.scan(**kwargs)
+                put(response.get('Items', []))
+                last_key = response.get('LastEvaluatedKey')
+                if not last_key:
+                    break
+                kwargs['ExclusiveStartKey'] = last_key
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or total_segments)
+    for segment in range(total_segments):
+        executor.submit(scan_segment, segment)
+
+    finished = 0
+    try:
+        while finished < total_segments:
+            entry = pages.get()
+            if entry is _SEGMENT_DONE:
+                finished += 1
+            elif isinstance(entry, Exception):
+                raise entry
+            else:
+                yield from entry
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
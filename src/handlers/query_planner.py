@@ -0,0 +1,153 @@
+from datetime import datetime
+
+STATUS_INDEX = 'status-index'
+
+TASK_FIELDS = (
+    'taskId', 'title', 'description', 'status', 'priority',
+    'createdAt', 'updatedAt', 'dueDate', 'tags'
+)
+
+
+def parse_statuses(status_param):
+    """
+    Split a comma-separated `status` parameter into distinct values, in order
+    """
+    return list(dict.fromkeys(status.strip() for status in status_param.split(',') if status.strip()))
+
+
+def parse_created_range(query_params):
+    """
+    Validate the `createdAfter`/`createdBefore` bounds, both inclusive ISO 8601 timestamps
+    """
+    bounds = {}
+    for name in ('createdAfter', 'createdBefore'):
+        value = query_params.get(name)
+        if value:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f'{name} must be an ISO 8601 timestamp')
+            bounds[name] = value
+    if len(bounds) == 2 and bounds['createdAfter'] > bounds['createdBefore']:
+        raise ValueError('createdAfter must not be later than createdBefore')
+    return bounds
+
+
+def created_condition(bounds):
+    """
+    Build the createdAt range condition for the given bounds, or None
+    """
+    if 'createdAfter' in bounds and 'createdBefore' in bounds:
+        return '#createdAt BETWEEN :createdAfter AND :createdBefore'
+    if 'createdAfter' in bounds:
+        return '#createdAt >= :createdAfter'
+    if 'createdBefore' in bounds:
+        return '#createdAt <= :createdBefore'
+    return None
+
+
+def plan_list_query(query_params):
+    """
+    Pick the cheapest DynamoDB read for a GET /tasks request.
+
+    Requests that name a status are answered by a Query on the status-index
+    GSI, with a createdAt window in the key condition and any remaining
+    filters applied as a residual FilterExpression. Several statuses become
+    one Query each, to be merged on createdAt by the caller. A Scan is only
+    used when no indexed attribute is given.
+
+    Returns an (operation, kwargs) tuple where operation is 'query' or 'scan',
+    or ('merge', [kwargs, ...]) with one Query per status. Raises ValueError
+    for malformed date bounds.
+    """
+    query_params = query_params or {}
+    bounds = parse_created_range(query_params)
+    date_condition = created_condition(bounds)
+    statuses = parse_statuses(query_params['status']) if query_params.get('status') else []
+
+    operation = 'scan'
+    read_kwargs = {}
+    filter_expressions = []
+    expression_values = {}
+    expression_names = {}
+
+    if statuses:
+        operation = 'query'
+        read_kwargs['IndexName'] = STATUS_INDEX
+        key_conditions = ['#status = :status']
+        if date_condition:
+            key_conditions.append(date_condition)
+        read_kwargs['KeyConditionExpression'] = ' AND '.join(key_conditions)
+        expression_names['#status'] = 'status'
+        expression_values[':status'] = statuses[0]
+    else:
+        if 'status' in query_params:
+            filter_expressions.append('#status = :status')
+            expression_names['#status'] = 'status'
+            expression_values[':status'] = query_params['status']
+        if date_condition:
+            filter_expressions.append(date_condition)
+
+    if date_condition:
+        expression_names['#createdAt'] = 'createdAt'
+        expression_values.update({f':{name}': value for name, value in bounds.items()})
+
+    if 'priority' in query_params:
+        filter_expressions.append('priority = :priority')
+        expression_values[':priority'] = query_params['priority']
+
+    if filter_expressions:
+        read_kwargs['FilterExpression'] = ' AND '.join(filter_expressions)
+    if expression_values:
+        read_kwargs['ExpressionAttributeValues'] = expression_values
+    if expression_names:
+        read_kwargs['ExpressionAttributeNames'] = expression_names
+
+    if len(statuses) > 1:
+        return 'merge', [
+            dict(read_kwargs, ExpressionAttributeValues=dict(expression_values, **{':status': status}))
+            for status in statuses
+        ]
+    return operation, read_kwargs
+
+
+def parse_fields(fields_param):
+    """
+    Parse the comma-separated `fields` query parameter.
+
+    Returns None when no projection was requested. Raises ValueError for
+    attributes that are not part of a task.
+    """
+    if not fields_param:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in fields_param.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or None
+
+
+def projection_kwargs(fields, required=(), expression_names=None):
+    """
+    Build a ProjectionExpression for `fields` plus any `required` attributes.
+
+    Every attribute is aliased through ExpressionAttributeNames so reserved
+    words such as `status` are safe; existing aliases are preserved.
+    """
+    expression_names = dict(expression_names or {})
+    placeholders = []
+    for field in dict.fromkeys(list(fields) + list(required)):
+        placeholder = f'#p_{field}'
+        expression_names[placeholder] = field
+        placeholders.append(placeholder)
+    return {
+        'ProjectionExpression': ', '.join(placeholders),
+        'ExpressionAttributeNames': expression_names
+    }
+
+
+def select_fields(item, fields):
+    """
+    Trim an item down to the requested fields
+    """
+    return {field: item[field] for field in fields if field in item}
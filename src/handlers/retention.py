@@ -0,0 +1,21 @@
+"""
+Retention policy for completed tasks.
+
+Completed tasks get an expiresAt TTL; DynamoDB deletes them once it passes
+and the archiver moves them to cold storage. Kept apart from the archiver so
+the write handlers can stamp the TTL without loading it.
+"""
+import os
+import time
+
+# Completed tasks expire this long after completion; 0 keeps them forever
+RETENTION_DAYS = int(os.environ.get('COMPLETED_RETENTION_DAYS', '30'))
+
+
+def expires_at(status, now=None):
+    """
+    TTL epoch seconds for a task entering `status`, or None when it should be kept
+    """
+    if status != 'completed' or RETENTION_DAYS <= 0:
+        return None
+    return int(now if now is not None else time.time()) + RETENTION_DAYS * 24 * 3600
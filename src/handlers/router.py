@@ -0,0 +1,56 @@
+import logging
+import batch_create_task
+import bulk_tasks
+import create_task
+import delete_task
+import get_stats
+import get_task
+import update_task
+from runtime import build_response
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# (httpMethod, resource) -> handler; resources are API Gateway's route templates
+ROUTES = {
+    ('POST', '/tasks'): create_task.lambda_handler,
+    ('POST', '/tasks/batch'): batch_create_task.lambda_handler,
+    ('GET', '/tasks'): get_task.lambda_handler,
+    ('GET', '/tasks/{taskId}'): get_task.lambda_handler,
+    ('GET', '/tasks/stats'): get_stats.lambda_handler,
+    ('PUT', '/tasks/{taskId}'): update_task.lambda_handler,
+    ('DELETE', '/tasks/{taskId}'): delete_task.lambda_handler,
+    ('POST', '/tasks/bulk-update'): bulk_tasks.lambda_handler,
+    ('POST', '/tasks/bulk-delete'): bulk_tasks.lambda_handler,
+    ('GET', '/tasks/jobs/{jobId}'): bulk_tasks.lambda_handler,
+}
+
+
+def allowed_methods(resource):
+    return sorted(method for method, route in ROUTES if route == resource)
+
+
+def lambda_handler(event, context):
+    """
+    Dispatch an API Gateway request to the handler for its method and resource.
+
+    Used when the API is deployed as a single function so every route shares
+    one warm container pool and one DynamoDB client.
+    """
+    method = event.get('httpMethod')
+    resource = event.get('resource')
+
+    handler = ROUTES.get((method, resource))
+    if handler is not None:
+        return handler(event, context)
+
+    methods = allowed_methods(resource)
+    if methods:
+        return build_response(405, {
+            'error': f'Method {method} not allowed'
+        }, {'Allow': ', '.join(methods)})
+
+    logger.info(f"No route for {method} {resource}")
+    return build_response(404, {
+        'error': 'Route not found'
+    })
@@ -0,0 +1,261 @@
+import base64
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+import boto3
+from botocore.config import Config
+import instrumentation
+from serialization import dumps
+
+DEFAULT_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+CLIENT_CONFIG = Config(
+    connect_timeout=float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', '1')),
+    read_timeout=float(os.environ.get('DYNAMODB_READ_TIMEOUT', '5')),
+    max_pool_connections=int(os.environ.get('DYNAMODB_MAX_POOL_CONNECTIONS', '16')),
+    tcp_keepalive=True,
+    retries={
+        'mode': 'adaptive',
+        'max_attempts': int(os.environ.get('DYNAMODB_MAX_ATTEMPTS', '5'))
+    }
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide low-level DynamoDB client, creating it on first use
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client('dynamodb', config=CLIENT_CONFIG)
+    return _client
+
+
+def call_dynamodb(operation, request):
+    """
+    Invoke a low-level client operation, recording it when metrics are on.
+
+    While an instrumented invocation is active the request asks for
+    ReturnConsumedCapacity=TOTAL and the round trip is timed.
+    """
+    invocation = instrumentation.current()
+    if invocation is None:
+        return getattr(get_client(), operation)(**request)
+
+    request.setdefault('ReturnConsumedCapacity', 'TOTAL')
+    result = {}
+    start = time.perf_counter()
+    try:
+        result = getattr(get_client(), operation)(**request)
+        return result
+    finally:
+        invocation.add_call(operation, (time.perf_counter() - start) * 1000, result.get('ConsumedCapacity'))
+
+
+def build_response(status_code, body, headers=None):
+    """
+    Build an API Gateway proxy response with the standard JSON/CORS headers
+    """
+    with instrumentation.timed('encode'):
+        return {
+            'statusCode': status_code,
+            'headers': dict(DEFAULT_HEADERS, **headers) if headers else DEFAULT_HEADERS.copy(),
+            'body': dumps(body)
+        }
+
+
+def build_empty_response(status_code, headers=None):
+    """
+    Build a bodiless API Gateway proxy response, e.g. 304 Not Modified
+    """
+    return {
+        'statusCode': status_code,
+        'headers': dict(DEFAULT_HEADERS, **headers) if headers else DEFAULT_HEADERS.copy(),
+        'body': ''
+    }
+
+
+def get_body(event):
+    """
+    Return the raw request body, decoding it when API Gateway base64-encoded it
+    """
+    body = event.get('body', '{}')
+    if body and event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+    return body
+
+
+def load_body(event):
+    """
+    Parse the JSON request body, timing it as the invocation's parse phase
+    """
+    with instrumentation.timed('parse'):
+        return json.loads(get_body(event))
+
+
+def get_header(event, name):
+    """
+    Look up a request header case-insensitively, returning None when absent
+    """
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def serialize(value):
+    """
+    Convert a Python value to a DynamoDB attribute value
+    """
+    value_type = type(value)
+    if value_type is str:
+        return {'S': value}
+    if value_type is bool:
+        return {'BOOL': value}
+    if value is None:
+        return {'NULL': True}
+    if value_type is int or value_type is Decimal:
+        return {'N': str(value)}
+    if value_type is float:
+        return {'N': str(Decimal(str(value)))}
+    if isinstance(value, dict):
+        return {'M': {key: serialize(item) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(item) for item in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, (set, frozenset)):
+        if all(type(item) is str for item in value):
+            return {'SS': list(value)}
+        if all(isinstance(item, (bytes, bytearray)) for item in value):
+            return {'BS': [bytes(item) for item in value]}
+        return {'NS': [str(item) for item in value]}
+    raise TypeError(f'Unsupported type for DynamoDB: {value_type.__name__}')
+
+
+def deserialize(attribute):
+    """
+    Convert a DynamoDB attribute value to a Python value
+    """
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return Decimal(value)
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'M':
+        return {key: deserialize(item) for key, item in value.items()}
+    if kind == 'L':
+        return [deserialize(item) for item in value]
+    if kind == 'SS':
+        return set(value)
+    if kind == 'NS':
+        return {Decimal(item) for item in value}
+    if kind == 'B':
+        return value
+    if kind == 'BS':
+        return set(value)
+    raise TypeError(f'Unsupported DynamoDB type: {kind}')
+
+
+def serialize_item(item):
+    return {key: serialize(value) for key, value in item.items()}
+
+
+def deserialize_item(item):
+    return {key: deserialize(value) for key, value in item.items()}
+
+
+class Table:
+    """
+    Thin stand-in for boto3's Table resource built on the shared low-level client.
+
+    It accepts and returns plain Python values like the resource does, but
+    skips the resource model loading and per-call transformation machinery.
+    Unlike a resource it is safe to share between threads.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _call(self, operation, kwargs):
+        request = dict(kwargs, TableName=self.name)
+        for field in ('Key', 'Item', 'ExclusiveStartKey'):
+            if field in request:
+                request[field] = serialize_item(request[field])
+        if 'ExpressionAttributeValues' in request:
+            request['ExpressionAttributeValues'] = serialize_item(request['ExpressionAttributeValues'])
+
+        result = call_dynamodb(operation, request)
+
+        for field in ('Item', 'Attributes', 'LastEvaluatedKey'):
+            if field in result:
+                result[field] = deserialize_item(result[field])
+        if 'Items' in result:
+            result['Items'] = [deserialize_item(item) for item in result['Items']]
+        return result
+
+    def get_item(self, **kwargs):
+        return self._call('get_item', kwargs)
+
+    def put_item(self, **kwargs):
+        return self._call('put_item', kwargs)
+
+    def update_item(self, **kwargs):
+        return self._call('update_item', kwargs)
+
+    def delete_item(self, **kwargs):
+        return self._call('delete_item', kwargs)
+
+    def query(self, **kwargs):
+        return self._call('query', kwargs)
+
+    def scan(self, **kwargs):
+        return self._call('scan', kwargs)
+
+    def batch_write_item(self, requests):
+        """
+        Send PutRequest/DeleteRequest entries for this table, returning the unprocessed ones
+        """
+        encoded = []
+        for request in requests:
+            if 'PutRequest' in request:
+                encoded.append({'PutRequest': {'Item': serialize_item(request['PutRequest']['Item'])}})
+            else:
+                encoded.append({'DeleteRequest': {'Key': serialize_item(request['DeleteRequest']['Key'])}})
+
+        result = call_dynamodb('batch_write_item', {'RequestItems': {self.name: encoded}})
+
+        unprocessed = []
+        for request in result.get('UnprocessedItems', {}).get(self.name, []):
+            if 'PutRequest' in request:
+                unprocessed.append({'PutRequest': {'Item': deserialize_item(request['PutRequest']['Item'])}})
+            else:
+                unprocessed.append({'DeleteRequest': {'Key': deserialize_item(request['DeleteRequest']['Key'])}})
+        return unprocessed
+
+    def batch_get_item(self, keys, **kwargs):
+        """
+        Fetch up to 100 keys from this table, returning (items, unprocessed keys)
+        """
+        request = dict(kwargs, Keys=[serialize_item(key) for key in keys])
+        result = call_dynamodb('batch_get_item', {'RequestItems': {self.name: request}})
+
+        items = [deserialize_item(item) for item in result.get('Responses', {}).get(self.name, [])]
+        pending = result.get('UnprocessedKeys', {}).get(self.name, {}).get('Keys', [])
+        return items, [deserialize_item(key) for key in pending]
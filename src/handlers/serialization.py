@@ -0,0 +1,39 @@
+import json
+import logging
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment package
+    orjson = None
+    # src/handlers/requirements.txt ships orjson; without it every response takes the slower path
+    logging.getLogger().warning('orjson is not installed; responses use the stdlib JSON encoder')
+
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _default(value):
+    """
+    Encode values the JSON encoders do not handle natively.
+
+    DynamoDB numbers arrive as Decimal and are emitted as JSON numbers:
+    integral values as ints and everything else as floats.
+    """
+    if isinstance(value, Decimal):
+        if value == value.to_integral_value() and abs(value) <= _INT64_MAX:
+            return int(value)
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value) if all(isinstance(item, str) for item in value) else list(value)
+    return str(value)
+
+
+def dumps(obj):
+    """
+    Serialize a response body to a JSON string in a single pass.
+
+    Uses orjson when it is installed and falls back to the stdlib encoder.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode('utf-8')
+    return json.dumps(obj, default=_default, separators=(',', ':'))
@@ -0,0 +1,81 @@
+import heapq
+from functools import cmp_to_key
+
+SORTABLE_FIELDS = ('priority', 'dueDate', 'createdAt', 'updatedAt', 'title', 'status', 'taskId')
+MAX_SORT_FIELDS = 3
+
+# `sort=priority` lists the most urgent tasks first
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+
+def parse_sort(sort_param):
+    """
+    Parse `sort=field,-field` into (field, descending) pairs.
+
+    Returns None when no sort was requested. Raises ValueError for fields
+    that cannot be sorted on.
+    """
+    if not sort_param:
+        return None
+    sort = []
+    for part in sort_param.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        descending = part.startswith('-')
+        field = part.lstrip('-+')
+        if field not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by {field}; sortable fields: {', '.join(SORTABLE_FIELDS)}")
+        if field not in (name for name, _ in sort):
+            sort.append((field, descending))
+    if not sort or len(sort) > MAX_SORT_FIELDS:
+        raise ValueError(f'sort must name between 1 and {MAX_SORT_FIELDS} fields')
+    return sort
+
+
+def index_direction(sort):
+    """
+    Return the ScanIndexForward value when the status-index range key already
+    yields this order, or None when the sort needs top-K selection
+    """
+    if len(sort) == 1 and sort[0][0] == 'createdAt':
+        return not sort[0][1]
+    return None
+
+
+def _sort_value(task, field):
+    value = task.get(field)
+    if field == 'priority' and value is not None:
+        return PRIORITY_RANK.get(value, len(PRIORITY_RANK))
+    return value
+
+
+def task_comparator(sort):
+    """
+    Compare tasks by the sort fields; missing values always sort last and taskId breaks ties
+    """
+    def compare(left, right):
+        for field, descending in sort:
+            a = _sort_value(left, field)
+            b = _sort_value(right, field)
+            if a == b:
+                continue
+            if a is None:
+                return 1
+            if b is None:
+                return -1
+            result = -1 if a < b else 1
+            return -result if descending else result
+        a, b = left.get('taskId', ''), right.get('taskId', '')
+        return (a > b) - (a < b)
+    return compare
+
+
+def top_k(items, sort, k):
+    """
+    Select the first `k` items in sort order from a stream.
+
+    heapq.nsmallest keeps a heap of at most `k` items, so memory is bounded
+    by the page size rather than by the number of items read.
+    """
+    return heapq.nsmallest(k, items, key=cmp_to_key(task_comparator(sort)))
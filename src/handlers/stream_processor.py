@@ -0,0 +1,135 @@
+"""
+Maintain the task counters and the tag index from the TasksTable stream.
+
+The counters only see changes made after the stream processor is deployed.
+To seed them from the tasks already in the table, run:
+
+    TASKS_TABLE_NAME=... STATS_TABLE_NAME=... python src/handlers/stream_processor.py --backfill
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+import logging
+from instrumentation import instrumented
+from parallel_scan import DEFAULT_SEGMENTS, parallel_scan
+from runtime import Table, deserialize_item
+from tag_index import apply_changes, index_changes
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+stats_table = Table(os.environ.get('STATS_TABLE_NAME'))
+
+SUMMARY_ID = 'summary'
+
+def counter_keys(task):
+    """
+    Counters a task contributes to: overall, per status, per priority and per status x priority
+    """
+    status = task.get('status')
+    priority = task.get('priority')
+    return [
+        'total',
+        f'status#{status}',
+        f'priority#{priority}',
+        f'statusPriority#{status}#{priority}'
+    ]
+
+def stats_deltas(records):
+    """
+    Fold a batch of stream records into net counter deltas.
+
+    The old image is subtracted and the new image added, so an update that
+    only touches the title cancels out and is never written.
+    """
+    deltas = Counter()
+    for record in records:
+        images = record.get('dynamodb', {})
+        if 'OldImage' in images:
+            deltas.subtract(counter_keys(deserialize_item(images['OldImage'])))
+        if 'NewImage' in images:
+            deltas.update(counter_keys(deserialize_item(images['NewImage'])))
+    return {key: delta for key, delta in deltas.items() if delta}
+
+def apply_deltas(deltas):
+    """
+    Apply counter deltas to the summary item with one atomic ADD update
+    """
+    add_expressions = []
+    expression_names = {}
+    expression_values = {}
+
+    for index, (key, delta) in enumerate(sorted(deltas.items())):
+        add_expressions.append(f'#c{index} :c{index}')
+        expression_names[f'#c{index}'] = key
+        expression_values[f':c{index}'] = delta
+
+    stats_table.update_item(
+        Key={'statsId': SUMMARY_ID},
+        UpdateExpression='ADD ' + ', '.join(add_expressions),
+        ExpressionAttributeNames=expression_names,
+        ExpressionAttributeValues=expression_values
+    )
+
+def count_tasks(tasks_table, total_segments=DEFAULT_SEGMENTS):
+    """
+    Count every task in the table into the summary counters with a parallel scan
+    """
+    counts = Counter()
+    for task in parallel_scan(
+        tasks_table, total_segments,
+        ProjectionExpression='#status, #priority',
+        ExpressionAttributeNames={'#status': 'status', '#priority': 'priority'}
+    ):
+        counts.update(counter_keys(task))
+    return counts
+
+def backfill(tasks_table, total_segments=DEFAULT_SEGMENTS):
+    """
+    Replace the summary item with counts taken from the whole table, returning the task total.
+
+    Stream updates landing while the scan runs may be counted twice or not
+    at all, so run it while writes are quiet, or again afterwards.
+    """
+    counts = count_tasks(tasks_table, total_segments)
+    stats_table.put_item(Item=dict(counts, statsId=SUMMARY_ID))
+    return counts['total']
+
+@instrumented
+def lambda_handler(event, context):
+    """
+    Maintain aggregate task counters and the tag index from the TasksTable stream
+    """
+    records = event.get('Records', [])
+    deltas = stats_deltas(records)
+    tag_changes = index_changes(records)
+
+    # Errors propagate so Lambda retries the batch from the stream. Index
+    # writes are idempotent but counter ADDs are not, so the index goes first
+    # and a failure there leaves the retried batch uncounted
+    if tag_changes:
+        apply_changes(tag_changes)
+    if deltas:
+        apply_deltas(deltas)
+
+    logger.info(
+        f"Processed {len(records)} stream records into {len(deltas)} counter updates "
+        f"and {len(tag_changes)} tag index changes"
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backfill', action='store_true', help='recount every task in TASKS_TABLE_NAME')
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    args = parser.parse_args(argv)
+
+    if not args.backfill:
+        parser.print_help()
+        return 1
+    total = backfill(Table(os.environ.get('TASKS_TABLE_NAME')), args.segments)
+    print(f'Counted {total} tasks', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
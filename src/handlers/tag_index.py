@@ -0,0 +1,230 @@
+"""
+Inverted tag index kept in the TaskTagsTable.
+
+Every (tag, taskId) pair is one item, with the task's status and priority
+copied alongside so tag lookups can be narrowed without touching the tasks
+table. The stream processor keeps it in sync; to index tasks written before
+the index existed, run:
+
+    TASKS_TABLE_NAME=... TAGS_TABLE_NAME=... python src/handlers/tag_index.py --backfill
+"""
+import argparse
+import heapq
+import os
+import sys
+import logging
+from batch_ops import batch_write
+from pagination import iter_items
+from parallel_scan import DEFAULT_SEGMENTS, parallel_scan
+from runtime import Table, deserialize_item
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+tag_table = Table(os.environ.get('TAGS_TABLE_NAME'))
+
+MAX_TAGS = 10
+TAG_MATCH_MODES = ('all', 'any')
+INDEXED_ATTRIBUTES = ('status', 'priority')
+
+
+def tag_entries(task):
+    """
+    Index items for a task, keyed by tag
+    """
+    tags = task.get('tags') if task else None
+    if not isinstance(tags, (list, set, tuple)):
+        return {}
+    entries = {}
+    for tag in tags:
+        if isinstance(tag, str) and tag:
+            entry = {'tag': tag, 'taskId': task['taskId']}
+            entry.update({name: task[name] for name in INDEXED_ATTRIBUTES if name in task})
+            entries[tag] = entry
+    return entries
+
+
+def index_changes(records):
+    """
+    Turn a batch of TasksTable stream records into index writes.
+
+    Tags that disappeared are deleted; new tags, and tags whose task changed
+    status or priority, are (re)written. Changes are collapsed per
+    (tag, taskId) so the last record for a task wins and a BatchWriteItem
+    never sees the same key twice.
+    """
+    changes = {}
+    for record in records:
+        images = record.get('dynamodb', {})
+        old = tag_entries(deserialize_item(images['OldImage'])) if 'OldImage' in images else {}
+        new = tag_entries(deserialize_item(images['NewImage'])) if 'NewImage' in images else {}
+
+        for tag, entry in old.items():
+            if tag not in new:
+                key = {'tag': tag, 'taskId': entry['taskId']}
+                changes[(tag, entry['taskId'])] = {'DeleteRequest': {'Key': key}}
+        for tag, entry in new.items():
+            if old.get(tag) != entry:
+                changes[(tag, entry['taskId'])] = {'PutRequest': {'Item': entry}}
+
+    return list(changes.values())
+
+
+def apply_changes(requests):
+    """
+    Write index changes, raising if any could not be applied so the batch is retried
+    """
+    failed = batch_write(tag_table, requests)
+    if failed:
+        raise RuntimeError(f'Failed to apply {len(failed)} tag index changes')
+
+
+def parse_tags(tag_param, match=None):
+    """
+    Parse the comma-separated `tag` and `tagMatch` query parameters
+    """
+    tags = sorted(set(tag.strip() for tag in tag_param.split(',') if tag.strip()))
+    if not tags or len(tags) > MAX_TAGS:
+        raise ValueError(f'tag must list between 1 and {MAX_TAGS} tags')
+    match = match or 'all'
+    if match not in TAG_MATCH_MODES:
+        raise ValueError(f"tagMatch must be one of: {', '.join(TAG_MATCH_MODES)}")
+    return tags, match
+
+
+def posting_list(tag, filters=None, after=None):
+    """
+    Yield the ids of tasks carrying `tag` in ascending order, page by page
+    """
+    read_kwargs = {
+        'KeyConditionExpression': '#tag = :tag',
+        'ProjectionExpression': '#taskId',
+        'ExpressionAttributeNames': {'#tag': 'tag', '#taskId': 'taskId'},
+        'ExpressionAttributeValues': {':tag': tag}
+    }
+    if after:
+        read_kwargs['KeyConditionExpression'] += ' AND #taskId > :after'
+        read_kwargs['ExpressionAttributeValues'][':after'] = after
+
+    # A list or tuple of values matches any of them
+    conditions = []
+    for name, value in sorted((filters or {}).items()):
+        read_kwargs['ExpressionAttributeNames'][f'#{name}'] = name
+        if isinstance(value, (list, tuple)) and len(value) == 1:
+            value = value[0]
+        if isinstance(value, (list, tuple)):
+            placeholders = [f':{name}{index}' for index in range(len(value))]
+            conditions.append(f"#{name} IN ({', '.join(placeholders)})")
+            read_kwargs['ExpressionAttributeValues'].update(zip(placeholders, value))
+        else:
+            conditions.append(f'#{name} = :{name}')
+            read_kwargs['ExpressionAttributeValues'][f':{name}'] = value
+    if conditions:
+        read_kwargs['FilterExpression'] = ' AND '.join(conditions)
+
+    for item in iter_items(tag_table.query, read_kwargs):
+        yield item['taskId']
+
+
+def intersect_sorted(iterators):
+    """
+    Yield values present in every ascending iterator.
+
+    Each iterator leapfrogs to the current candidate, so the work is bounded
+    by the shortest list's matches rather than the product of the lists.
+    """
+    iterators = [iter(iterator) for iterator in iterators]
+    try:
+        heads = [next(iterator) for iterator in iterators]
+        while True:
+            candidate = max(heads)
+            for index, iterator in enumerate(iterators):
+                while heads[index] < candidate:
+                    heads[index] = next(iterator)
+            if all(head == candidate for head in heads):
+                yield candidate
+                heads = [next(iterator) for iterator in iterators]
+    except StopIteration:
+        return
+
+
+def union_sorted(iterators):
+    """
+    Yield values present in any ascending iterator, once each
+    """
+    previous = None
+    for value in heapq.merge(*iterators):
+        if value != previous:
+            yield value
+            previous = value
+
+
+def find_tagged_ids(tags, match='all', filters=None, after=None, limit=None):
+    """
+    Return ascending task ids matching the tags and whether more remain.
+
+    Stops reading the posting lists as soon as `limit` ids are known, so the
+    cost follows the number of matches returned.
+    """
+    lists = [posting_list(tag, filters, after) for tag in tags]
+    matches = intersect_sorted(lists) if match == 'all' else union_sorted(lists)
+
+    task_ids = []
+    for task_id in matches:
+        if limit is not None and len(task_ids) == limit:
+            return task_ids, True
+        task_ids.append(task_id)
+    return task_ids, False
+
+
+def task_matches(task, tags, match='all', filters=None):
+    """
+    Check a task read from the tasks table still matches a tag lookup.
+
+    Index entries trail the stream, so a task can be listed under tags,
+    a status or a priority it no longer has.
+    """
+    task_tags = task.get('tags')
+    task_tags = set(task_tags) if isinstance(task_tags, (list, set, tuple)) else set()
+    if not (task_tags.issuperset(tags) if match == 'all' else task_tags.intersection(tags)):
+        return False
+    for name, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple)) else (value,)
+        if task.get(name) not in values:
+            return False
+    return True
+
+def backfill(tasks_table, total_segments=DEFAULT_SEGMENTS):
+    """
+    Index every existing task, returning the number of index items written
+    """
+    entries = []
+    written = 0
+    for task in parallel_scan(tasks_table, total_segments):
+        entries.extend({'PutRequest': {'Item': entry}} for entry in tag_entries(task).values())
+        if len(entries) >= 1000:
+            apply_changes(entries)
+            written += len(entries)
+            entries = []
+    if entries:
+        apply_changes(entries)
+        written += len(entries)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backfill', action='store_true', help='index every task in TASKS_TABLE_NAME')
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    args = parser.parse_args(argv)
+
+    if not args.backfill:
+        parser.print_help()
+        return 1
+    written = backfill(Table(os.environ.get('TASKS_TABLE_NAME')), args.segments)
+    print(f'Wrote {written} tag index items', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,67 @@
 import json
 import os
 from datetime import datetime
-import boto3
 from botocore.exceptions import ClientError
 import logging
+from codec import EncodedTable
+from due_index import index_update
+from instrumentation import instrumented
+from retention import expires_at
+from runtime import Table, build_response, load_body
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
-table_name = os.environ.get('TASKS_TABLE_NAME')
-table = dynamodb.Table(table_name)
+table = EncodedTable(Table(os.environ.get('TASKS_TABLE_NAME')))
 
+UPDATABLE_FIELDS = ('title', 'description', 'status', 'priority', 'dueDate', 'tags')
+
+def build_update(patch, timestamp=None, task_id=None):
+    """
+    Build the update expression for the whitelisted fields of a patch, bumping updatedAt.
+
+    A move to `completed` stamps the expiresAt TTL attribute; any other
+    status change clears it, so reopened tasks are kept. Status and dueDate
+    changes also maintain the due-index attributes when a task_id is given,
+    since the index shard is derived from it.
+    """
+    update_expressions = []
+    expression_values = {}
+    expression_names = {}
+
+    for field in UPDATABLE_FIELDS:
+        if field in patch:
+            update_expressions.append(f'#{field} = :{field}')
+            expression_names[f'#{field}'] = field
+            expression_values[f':{field}'] = patch[field]
+
+    update_expressions.append('#updatedAt = :updatedAt')
+    expression_names['#updatedAt'] = 'updatedAt'
+    expression_values[':updatedAt'] = timestamp or datetime.utcnow().isoformat()
+
+    removals = []
+    if 'status' in patch:
+        expiry = expires_at(patch['status'])
+        expression_names['#expiresAt'] = 'expiresAt'
+        if expiry is not None:
+            update_expressions.append('#expiresAt = :expiresAt')
+            expression_values[':expiresAt'] = expiry
+        else:
+            removals.append('#expiresAt')
+
+    index_updates, index_removals = index_update(task_id, patch) if task_id else ({}, [])
+    for name, value in index_updates.items():
+        update_expressions.append(f'#{name} = :{name}')
+        expression_names[f'#{name}'] = name
+        expression_values[f':{name}'] = value
+    for name in index_removals:
+        removals.append(f'#{name}')
+        expression_names[f'#{name}'] = name
+
+    remove_expression = ' REMOVE ' + ', '.join(removals) if removals else ''
+    return 'SET ' + ', '.join(update_expressions) + remove_expression, expression_names, expression_values
+
+@instrumented
 def lambda_handler(event, context):
     """
     Update an existing task in DynamoDB
@@ -21,119 +71,58 @@ def lambda_handler(event, context):
         task_id = path_parameters.get('taskId') if path_parameters else None
         
         if not task_id:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Task ID is required'
-                })
-            }
+            return build_response(400, {
+                'error': 'Task ID is required'
+            })
         
-        body = json.loads(event.get('body', '{}'))
+        body = load_body(event)
         
         if not body:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Request body cannot be empty'
-                })
-            }
-        
-        response = table.get_item(Key={'taskId': task_id})
-        if 'Item' not in response:
-            return {
-                'statusCode': 404,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Task not found'
-                })
-            }
-        
-        update_expressions = []
-        expression_values = {}
-        expression_names = {}
-        
-        updatable_fields = ['title', 'description', 'status', 'priority', 'dueDate', 'tags']
+            return build_response(400, {
+                'error': 'Request body cannot be empty'
+            })
         
-        for field in updatable_fields:
-            if field in body:
-                if field == 'status':
-                    update_expressions.append(f'#{field} = :{field}')
-                    expression_names[f'#{field}'] = field
-                else:
-                    update_expressions.append(f'{field} = :{field}')
-                expression_values[f':{field}'] = body[field]
+        update_expression, expression_names, expression_values = build_update(body, task_id=task_id)
 
-        update_expressions.append('updatedAt = :updatedAt')
-        expression_values[':updatedAt'] = datetime.utcnow().isoformat()
-
-        update_response = table.update_item(
-            Key={'taskId': task_id},
-            UpdateExpression='SET ' + ', '.join(update_expressions),
-            ExpressionAttributeValues=expression_values,
-            ExpressionAttributeNames=expression_names if expression_names else None,
-            ReturnValues='ALL_NEW'
-        )
+        try:
+            # The existence check rides on the write itself, so there is no
+            # separate read and no window for the task to vanish in between
+            update_response = table.update_item(
+                Key={'taskId': task_id},
+                UpdateExpression=update_expression,
+                ConditionExpression='attribute_exists(taskId)',
+                ExpressionAttributeValues=expression_values,
+                ExpressionAttributeNames=expression_names,
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return build_response(404, {
+                'error': 'Task not found'
+            })
         
         updated_task = update_response['Attributes']
         
         logger.info(f"Successfully updated task: {task_id}")
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'message': 'Task updated successfully',
-                'task': updated_task
-            }, default=str)
-        }
+        return build_response(200, {
+            'message': 'Task updated successfully',
+            'task': updated_task
+        })
         
     except ClientError as e:
         # Log full exception details for internal debugging, but do not expose them to clients
         logger.error("DynamoDB error while updating task", exc_info=True)
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Failed to update task'
-            })
-        }
+        return build_response(500, {
+            'error': 'Failed to update task'
+        })
     except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Invalid JSON in request body'
-            })
-        }
+        return build_response(400, {
+            'error': 'Invalid JSON in request body'
+        })
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Internal server error'
-            })
-        }
+        return build_response(500, {
+            'error': 'Internal server error'
+        })
@@ -1,9 +1,12 @@
+import base64
+import gzip
 import json
 import pytest
 import os
 import sys
 from unittest.mock import MagicMock, patch
 from datetime import datetime
+from botocore.exceptions import ClientError
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'handlers'))
@@ -12,6 +15,14 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'handler
 os.environ['TASKS_TABLE_NAME'] = 'test-tasks-table'
 os.environ['ENVIRONMENT'] = 'test'
 
+
+def conditional_check_failed(operation):
+    """Build the ClientError DynamoDB raises when a ConditionExpression fails"""
+    return ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        operation
+    )
+
 class TestCreateTask:
     """Test cases for create_task Lambda function"""
     
@@ -76,6 +87,214 @@ class TestCreateTask:
         assert 'Invalid JSON' in body['error']
 
 
+    @patch('create_task.table')
+    def test_create_task_base64_body(self, mock_table):
+        """Test bodies API Gateway base64-encoded as binary are decoded"""
+        from create_task import lambda_handler
+
+        event = {
+            'body': base64.b64encode(json.dumps({'title': 'Encoded Task'}).encode()).decode(),
+            'isBase64Encoded': True
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 201
+        assert json.loads(response['body'])['task']['title'] == 'Encoded Task'
+
+
+class TestIdempotency:
+    """Test cases for Idempotency-Key handling on task creation"""
+
+    def setup_method(self):
+        from idempotency import cache
+        cache.clear()
+
+    @patch('idempotency.idempotency_table')
+    @patch('create_task.table')
+    def test_repeat_is_served_from_memory(self, mock_table, mock_idempotency_table):
+        """Test a retried request replays the first response without touching DynamoDB"""
+        from create_task import lambda_handler
+
+        event = {
+            'headers': {'idempotency-key': 'retry-1'},
+            'body': json.dumps({'title': 'Once', 'priority': 'high'})
+        }
+
+        first = lambda_handler(event, {})
+        retry = lambda_handler(dict(event, body=json.dumps({'priority': 'high', 'title': 'Once'})), {})
+
+        record = mock_idempotency_table.put_item.call_args.kwargs
+        assert first['statusCode'] == 201
+        assert record['Item']['idempotencyKey'] == 'create_task#retry-1'
+        assert 'attribute_not_exists(idempotencyKey)' in record['ConditionExpression']
+        assert retry['statusCode'] == 201
+        assert retry['headers']['Idempotent-Replayed'] == 'true'
+        assert json.loads(retry['body']) == json.loads(first['body'])
+        assert mock_table.put_item.call_count == 1
+        assert mock_idempotency_table.put_item.call_count == 1
+
+    @patch('idempotency.idempotency_table')
+    @patch('create_task.table')
+    def test_lost_claim_replays_stored_response(self, mock_table, mock_idempotency_table):
+        """Test a key claimed by another container replays its stored response"""
+        from create_task import lambda_handler
+        from idempotency import fingerprint
+
+        body = {'title': 'Elsewhere'}
+        stored = {'message': 'Task created successfully', 'task': {'taskId': 'task-1', 'title': 'Elsewhere'}}
+        mock_idempotency_table.put_item = MagicMock(side_effect=conditional_check_failed('PutItem'))
+        mock_idempotency_table.get_item = MagicMock(return_value={'Item': {
+            'idempotencyKey': 'create_task#retry-2',
+            'fingerprint': fingerprint(body),
+            'statusCode': 201,
+            'body': stored,
+            'expiresAt': 4102444800
+        }})
+
+        response = lambda_handler({'headers': {'Idempotency-Key': 'retry-2'}, 'body': json.dumps(body)}, {})
+
+        assert response['statusCode'] == 201
+        assert json.loads(response['body'])['task']['taskId'] == 'task-1'
+        mock_table.put_item.assert_not_called()
+
+    @patch('idempotency.idempotency_table')
+    @patch('create_task.table')
+    def test_key_reused_with_different_body(self, mock_table, mock_idempotency_table):
+        """Test reusing a key for a different request is rejected"""
+        from create_task import lambda_handler
+
+        headers = {'Idempotency-Key': 'retry-3'}
+        lambda_handler({'headers': headers, 'body': json.dumps({'title': 'First'})}, {})
+        response = lambda_handler({'headers': headers, 'body': json.dumps({'title': 'Second'})}, {})
+
+        assert response['statusCode'] == 422
+        assert mock_table.put_item.call_count == 1
+
+    @patch('idempotency.idempotency_table')
+    @patch('create_task.table')
+    def test_failed_write_releases_key(self, mock_table, mock_idempotency_table):
+        """Test a failed task write frees the key so the retry can create the task"""
+        from create_task import lambda_handler
+
+        mock_table.put_item = MagicMock(side_effect=[
+            ClientError({'Error': {'Code': 'InternalServerError', 'Message': 'boom'}}, 'PutItem'),
+            {}
+        ])
+        event = {'headers': {'Idempotency-Key': 'retry-4'}, 'body': json.dumps({'title': 'Flaky'})}
+
+        failed = lambda_handler(event, {})
+        retried = lambda_handler(event, {})
+
+        assert failed['statusCode'] == 500
+        mock_idempotency_table.delete_item.assert_called_once_with(Key={'idempotencyKey': 'create_task#retry-4'})
+        assert retried['statusCode'] == 201
+        assert mock_table.put_item.call_count == 2
+
+    @staticmethod
+    def claim_record(body, lease_expires_at):
+        from idempotency import fingerprint
+        return {
+            'idempotencyKey': 'create_task#retry-5',
+            'fingerprint': fingerprint(body),
+            'state': 'IN_PROGRESS',
+            'statusCode': 201,
+            'body': {'message': 'Task created successfully', 'task': {'taskId': 'task-5', 'title': body['title']}},
+            'leaseExpiresAt': lease_expires_at,
+            'expiresAt': 4102444800
+        }
+
+    @patch('idempotency.idempotency_table')
+    @patch('create_task.table')
+    def test_live_claim_is_not_replayed(self, mock_table, mock_idempotency_table):
+        """Test a duplicate of a request still creating its task gets a 409 rather than an early 201"""
+        from create_task import lambda_handler
+
+        body = {'title': 'Slow'}
+        mock_idempotency_table.put_item = MagicMock(side_effect=conditional_check_failed('PutItem'))
+        mock_idempotency_table.get_item = MagicMock(return_value={
+            'Item': self.claim_record(body, int(datetime.utcnow().timestamp()) + 3600)
+        })
+
+        response = lambda_handler({'headers': {'Idempotency-Key': 'retry-5'}, 'body': json.dumps(body)}, {})
+
+        assert response['statusCode'] == 409
+        assert response['headers']['Retry-After'] == '1'
+        mock_table.put_item.assert_not_called()
+
+    @patch('idempotency.idempotency_table')
+    @patch('create_task.table')
+    def test_abandoned_claim_is_taken_over(self, mock_table, mock_idempotency_table):
+        """Test a retry after the owner died writes the claimed task, then completes the claim"""
+        from create_task import lambda_handler
+
+        body = {'title': 'Crashed'}
+        mock_idempotency_table.put_item = MagicMock(side_effect=conditional_check_failed('PutItem'))
+        mock_idempotency_table.get_item = MagicMock(return_value={'Item': self.claim_record(body, 1)})
+
+        response = lambda_handler({'headers': {'Idempotency-Key': 'retry-5'}, 'body': json.dumps(body)}, {})
+
+        assert response['statusCode'] == 201
+        assert 'Idempotent-Replayed' not in response['headers']
+        assert json.loads(response['body'])['task']['taskId'] == 'task-5'
+        put = mock_table.put_item.call_args.kwargs
+        assert put['Item']['taskId'] == 'task-5'
+        assert put['ConditionExpression'] == 'attribute_not_exists(taskId)'
+        takeover, completion = [call.kwargs for call in mock_idempotency_table.update_item.call_args_list]
+        assert takeover['ExpressionAttributeValues'][':previous'] == 1
+        assert completion['ExpressionAttributeValues'][':completed'] == 'COMPLETED'
+
+
+class TestBatchCreateTask:
+    """Test cases for batch_create_task Lambda function"""
+
+    @patch('batch_ops.time.sleep')
+    @patch('batch_create_task.table')
+    def test_batch_create_retries_unprocessed_items(self, mock_table, mock_sleep):
+        """Test unprocessed items are retried and every item gets a result"""
+        from batch_create_task import lambda_handler
+
+        def batch_write_item(requests):
+            if mock_table.batch_write_item.call_count == 1:
+                return requests[-1:]
+            return []
+
+        mock_table.batch_write_item = MagicMock(side_effect=batch_write_item)
+
+        event = {
+            'body': json.dumps({
+                'tasks': [{'title': f'Task {i}'} for i in range(30)] + [{'description': 'No title'}]
+            })
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 207
+        body = json.loads(response['body'])
+        assert body['created'] == 30
+        assert body['failed'] == 1
+        assert body['results'][30]['error'] == 'Missing required field: title'
+        # Two 25-item chunks plus one retry of the unprocessed item
+        assert mock_table.batch_write_item.call_count == 3
+        assert mock_sleep.call_count == 1
+
+    @patch('batch_create_task.table')
+    def test_batch_create_rejects_oversized_batch(self, mock_table):
+        """Test batches above the size cap are rejected before writing"""
+        from batch_create_task import lambda_handler, MAX_BATCH_CREATE
+
+        event = {
+            'body': json.dumps({
+                'tasks': [{'title': 'Task'}] * (MAX_BATCH_CREATE + 1)
+            })
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 400
+        mock_table.batch_write_item.assert_not_called()
+
+
 class TestGetTask:
     """Test cases for get_task Lambda function"""
     
@@ -126,12 +345,11 @@ class TestGetTask:
         """Test listing all tasks"""
         from get_task import lambda_handler
         
-        mock_table.scan = MagicMock(return_value={
-            'Items': [
-                {'taskId': '1', 'title': 'Task 1'},
-                {'taskId': '2', 'title': 'Task 2'}
-            ]
-        })
+        items = [
+            {'taskId': '1', 'title': 'Task 1'},
+            {'taskId': '2', 'title': 'Task 2'}
+        ]
+        mock_table.scan = MagicMock(return_value={'Items': items})
         
         event = {}
         
@@ -142,96 +360,1290 @@ class TestGetTask:
         assert 'tasks' in body
         assert body['count'] == 2
 
+    @patch('get_task.table')
+    def test_list_tasks_by_status_uses_index(self, mock_table):
+        """Test status-filtered listing queries the status-index GSI"""
+        from get_task import lambda_handler
 
-class TestUpdateTask:
-    """Test cases for update_task Lambda function"""
-    
-    @patch('update_task.table')
-    def test_update_task_success(self, mock_table):
-        """Test successful task update"""
-        from update_task import lambda_handler
-        
-        # Mock get_item to show task exists
-        mock_table.get_item = MagicMock(return_value={
-            'Item': {'taskId': 'test-123', 'title': 'Old Title'}
+        mock_table.query = MagicMock(return_value={
+            'Items': [{'taskId': '1', 'status': 'pending', 'priority': 'high'}]
         })
-        
-        # Mock update_item
-        mock_table.update_item = MagicMock(return_value={
-            'Attributes': {
-                'taskId': 'test-123',
-                'title': 'Updated Title',
-                'status': 'completed'
-            }
+
+        event = {
+            'queryStringParameters': {'status': 'pending', 'priority': 'high'}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 200
+        mock_table.scan.assert_not_called()
+        kwargs = mock_table.query.call_args.kwargs
+        assert kwargs['IndexName'] == 'status-index'
+        assert kwargs['KeyConditionExpression'] == '#status = :status'
+        assert kwargs['FilterExpression'] == 'priority = :priority'
+        assert json.loads(response['body'])['count'] == 1
+
+    @patch('get_task.table')
+    def test_list_tasks_by_priority_scans(self, mock_table):
+        """Test listing without an indexed attribute falls back to Scan"""
+        from get_task import lambda_handler
+
+        mock_table.scan = MagicMock(return_value={'Items': []})
+
+        event = {
+            'queryStringParameters': {'priority': 'low', 'limit': '50'}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 200
+        mock_table.query.assert_not_called()
+        kwargs = mock_table.scan.call_args.kwargs
+        assert kwargs['FilterExpression'] == 'priority = :priority'
+        assert 'ExpressionAttributeNames' not in kwargs
+
+    @patch('get_task.table')
+    def test_list_tasks_defaults_to_one_page(self, mock_table):
+        """Test a listing without limit stops at MAX_PAGE_SIZE and returns a nextToken"""
+        from get_task import lambda_handler
+        from pagination import MAX_PAGE_SIZE
+
+        mock_table.scan = MagicMock(return_value={
+            'Items': [{'taskId': f'{index:04d}'} for index in range(MAX_PAGE_SIZE)],
+            'LastEvaluatedKey': {'taskId': f'{MAX_PAGE_SIZE - 1:04d}'}
         })
-        
+
+        body = json.loads(lambda_handler({}, {})['body'])
+
+        assert body['count'] == MAX_PAGE_SIZE
+        assert body['nextToken'] is not None
+        mock_table.scan.assert_called_once()
+        assert mock_table.scan.call_args.kwargs['Limit'] == MAX_PAGE_SIZE
+        assert 'Segment' not in mock_table.scan.call_args.kwargs
+
+    @patch('get_task.table')
+    def test_list_tasks_paginates_with_limit(self, mock_table):
+        """Test limit stops reading and returns a token that resumes the query"""
+        from get_task import lambda_handler
+
+        mock_table.query = MagicMock(return_value={
+            'Items': [
+                {'taskId': '1', 'status': 'pending', 'createdAt': '2025-01-01', 'priority': 'high'},
+                {'taskId': '2', 'status': 'pending', 'createdAt': '2025-01-02', 'priority': 'high'},
+                {'taskId': '3', 'status': 'pending', 'createdAt': '2025-01-03', 'priority': 'high'}
+            ],
+            'LastEvaluatedKey': {'taskId': '3', 'status': 'pending', 'createdAt': '2025-01-03'}
+        })
+
         event = {
-            'pathParameters': {'taskId': 'test-123'},
-            'body': json.dumps({
-                'title': 'Updated Title',
-                'status': 'completed'
-            })
+            'queryStringParameters': {'status': 'pending', 'priority': 'high', 'limit': '2'}
         }
-        
+
         response = lambda_handler(event, {})
-        
+
+        body = json.loads(response['body'])
+        assert [task['taskId'] for task in body['tasks']] == ['1', '2']
+        assert mock_table.query.call_count == 1
+
+        event['queryStringParameters']['nextToken'] = body['nextToken']
+        lambda_handler(event, {})
+
+        assert mock_table.query.call_args.kwargs['ExclusiveStartKey'] == {
+            'taskId': '2', 'status': 'pending', 'createdAt': '2025-01-02'
+        }
+
+    @patch('get_task.table')
+    def test_list_tasks_rejects_invalid_token(self, mock_table):
+        """Test malformed or mismatched continuation tokens are rejected"""
+        from get_task import lambda_handler
+        from pagination import encode_token
+
+        scan_token = encode_token({'taskId': '1'})
+
+        for params in ({'nextToken': 'not-a-token'},
+                       {'status': 'pending', 'nextToken': scan_token},
+                       {'limit': '0'}):
+            response = lambda_handler({'queryStringParameters': params}, {})
+            assert response['statusCode'] == 400
+
+        mock_table.scan.assert_not_called()
+        mock_table.query.assert_not_called()
+
+
+    @patch('get_task.table')
+    def test_get_tasks_by_ids(self, mock_table):
+        """Test fetching several tasks by ID keeps request order and marks misses"""
+        from get_task import lambda_handler
+
+        mock_table.batch_get_item = MagicMock(return_value=(
+            [
+                {'taskId': 'b', 'title': 'Task B'},
+                {'taskId': 'a', 'title': 'Task A'}
+            ],
+            []
+        ))
+
+        event = {
+            'queryStringParameters': {'ids': 'a,missing,b,a'}
+        }
+
+        response = lambda_handler(event, {})
+
         assert response['statusCode'] == 200
         body = json.loads(response['body'])
-        assert body['message'] == 'Task updated successfully'
-    
-    @patch('update_task.table')
-    def test_update_nonexistent_task(self, mock_table):
-        """Test updating non-existent task"""
-        from update_task import lambda_handler
-        
-        mock_table.get_item = MagicMock(return_value={})
-        
+        assert [task and task['taskId'] for task in body['tasks']] == ['a', None, 'b']
+        assert body['notFound'] == ['missing']
+        keys = mock_table.batch_get_item.call_args.args[0]
+        assert keys == [{'taskId': 'a'}, {'taskId': 'missing'}, {'taskId': 'b'}]
+
+    @patch('batch_ops.time.sleep')
+    @patch('get_task.table')
+    def test_get_tasks_by_ids_chunks_and_retries(self, mock_table, mock_sleep):
+        """Test IDs are split into 100-key chunks and unprocessed keys retried"""
+        from get_task import lambda_handler
+
+        retried = []
+
+        def batch_get_item(keys):
+            if keys[0]['taskId'] == 'task-100' and not retried:
+                retried.append(True)
+                return [], keys
+            return [dict(key) for key in keys], []
+
+        mock_table.batch_get_item = MagicMock(side_effect=batch_get_item)
+
         event = {
-            'pathParameters': {'taskId': 'nonexistent'},
-            'body': json.dumps({'title': 'New Title'})
+            'queryStringParameters': {'ids': ','.join(f'task-{i}' for i in range(150))}
         }
-        
+
         response = lambda_handler(event, {})
-        
-        assert response['statusCode'] == 404
 
+        body = json.loads(response['body'])
+        assert body['count'] == 150
+        assert body['notFound'] == []
+        assert mock_table.batch_get_item.call_count == 3
+
+
+    @patch('get_task.table')
+    def test_get_single_task_with_fields(self, mock_table):
+        """Test ?fields= is sent as an aliased ProjectionExpression on GetItem"""
+        from get_task import lambda_handler
 
-class TestDeleteTask:
-    """Test cases for delete_task Lambda function"""
-    
-    @patch('delete_task.table')
-    def test_delete_task_success(self, mock_table):
-        """Test successful task deletion"""
-        from delete_task import lambda_handler
-        
         mock_table.get_item = MagicMock(return_value={
-            'Item': {'taskId': 'test-123'}
+            'Item': {'taskId': 'test-123', 'status': 'pending'}
         })
-        mock_table.delete_item = MagicMock(return_value={})
-        
+
         event = {
-            'pathParameters': {'taskId': 'test-123'}
+            'pathParameters': {'taskId': 'test-123'},
+            'queryStringParameters': {'fields': 'status'}
         }
-        
+
         response = lambda_handler(event, {})
-        
-        assert response['statusCode'] == 200
-        body = json.loads(response['body'])
-        assert 'deleted successfully' in body['message']
-    
-    @patch('delete_task.table')
-    def test_delete_nonexistent_task(self, mock_table):
-        """Test deleting non-existent task"""
-        from delete_task import lambda_handler
-        
-        mock_table.get_item = MagicMock(return_value={})
-        
+
+        assert json.loads(response['body'])['task'] == {'status': 'pending'}
+        kwargs = mock_table.get_item.call_args.kwargs
+        assert kwargs['ProjectionExpression'] == '#p_status, #p_taskId, #p_updatedAt'
+        assert kwargs['ExpressionAttributeNames'] == {
+            '#p_status': 'status', '#p_taskId': 'taskId', '#p_updatedAt': 'updatedAt'
+        }
+
+    @patch('get_task.table')
+    def test_list_tasks_with_fields_keeps_pagination_keys(self, mock_table):
+        """Test list projections read the index keys but only return requested fields"""
+        from get_task import lambda_handler
+
+        mock_table.query = MagicMock(return_value={
+            'Items': [{'taskId': '1', 'title': 'Task 1', 'status': 'pending', 'createdAt': '2025-01-01'}]
+        })
+
         event = {
-            'pathParameters': {'taskId': 'nonexistent'}
+            'queryStringParameters': {'status': 'pending', 'fields': 'title', 'limit': '10'}
         }
-        
+
         response = lambda_handler(event, {})
-        
+
+        assert json.loads(response['body'])['tasks'] == [{'title': 'Task 1'}]
+        kwargs = mock_table.query.call_args.kwargs
+        assert kwargs['ProjectionExpression'] == '#p_title, #p_taskId, #p_status, #p_createdAt, #p_updatedAt'
+        assert kwargs['ExpressionAttributeNames']['#status'] == 'status'
+
+    @patch('get_task.table')
+    def test_get_task_rejects_unknown_fields(self, mock_table):
+        """Test projections are limited to task attributes"""
+        from get_task import lambda_handler
+
+        event = {
+            'queryStringParameters': {'fields': 'title,secret'}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 400
+        mock_table.scan.assert_not_called()
+
+
+    @patch('get_task.table')
+    def test_get_single_task_not_modified(self, mock_table):
+        """Test a matching If-None-Match is answered with 304 from a key-only read"""
+        from get_task import lambda_handler
+
+        item = {'taskId': 'test-123', 'title': 'Test Task', 'updatedAt': '2025-01-01T00:00:00'}
+        mock_table.get_item = MagicMock(return_value={'Item': item})
+
+        first = lambda_handler({'pathParameters': {'taskId': 'test-123'}}, {})
+        etag = first['headers']['ETag']
+
+        mock_table.get_item = MagicMock(return_value={
+            'Item': {'taskId': 'test-123', 'updatedAt': '2025-01-01T00:00:00'}
+        })
+        event = {
+            'pathParameters': {'taskId': 'test-123'},
+            'headers': {'if-none-match': etag}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 304
+        assert response['body'] == ''
+        assert response['headers']['ETag'] == etag
+        assert mock_table.get_item.call_count == 1
+        assert mock_table.get_item.call_args.kwargs['ProjectionExpression'] == '#p_taskId, #p_updatedAt'
+
+    @patch('get_task.table')
+    def test_get_single_task_modified_returns_body(self, mock_table):
+        """Test a stale If-None-Match gets the full task and a new ETag"""
+        from get_task import lambda_handler
+
+        mock_table.get_item = MagicMock(return_value={
+            'Item': {'taskId': 'test-123', 'title': 'Test Task', 'updatedAt': '2025-02-01T00:00:00'}
+        })
+
+        event = {
+            'pathParameters': {'taskId': 'test-123'},
+            'headers': {'If-None-Match': '"stale"'}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 200
+        assert response['headers']['ETag'] != '"stale"'
+        assert json.loads(response['body'])['task']['title'] == 'Test Task'
+
+    @patch('get_task.table')
+    def test_list_tasks_not_modified(self, mock_table):
+        """Test list responses carry a collection ETag that honours If-None-Match"""
+        from get_task import lambda_handler
+
+        mock_table.query = MagicMock(return_value={
+            'Items': [{'taskId': '1', 'status': 'pending', 'updatedAt': '2025-01-01'}]
+        })
+        event = {'queryStringParameters': {'status': 'pending'}}
+
+        etag = lambda_handler(event, {})['headers']['ETag']
+        event['headers'] = {'If-None-Match': f'W/{etag}'}
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 304
+        assert response['body'] == ''
+
+
+    @patch('get_task.table')
+    def test_list_tasks_gzip_compressed(self, mock_table):
+        """Test large list bodies are gzip-compressed when the client accepts it"""
+        from get_task import lambda_handler
+
+        items = [{'taskId': f'{i:04d}', 'status': 'pending', 'title': 'Task ' * 20} for i in range(50)]
+        mock_table.query = MagicMock(return_value={'Items': items})
+
+        event = {
+            'queryStringParameters': {'status': 'pending'},
+            'headers': {'Accept-Encoding': 'deflate;q=0.5, gzip', 'Accept': 'application/json'}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['isBase64Encoded'] is True
+        assert response['headers']['Content-Encoding'] == 'gzip'
+        assert response['headers']['Vary'] == 'Accept, Accept-Encoding'
+        body = json.loads(gzip.decompress(base64.b64decode(response['body'])))
+        assert body['count'] == 50
+
+        # The gzip representation has its own ETag, and revalidating with it gets a 304 echoing it
+        etag = response['headers']['ETag']
+        assert etag.endswith('-gzip"')
+        revalidated = lambda_handler(dict(event, headers=dict(event['headers'], **{'If-None-Match': etag})), {})
+        assert revalidated['statusCode'] == 304
+        assert revalidated['headers']['ETag'] == etag
+
+        # Without a binary Accept type API Gateway would pass the base64 text through, so nothing is compressed
+        plain = lambda_handler(dict(event, headers={'Accept-Encoding': 'gzip', 'Accept': '*/*'}), {})
+        assert 'Content-Encoding' not in plain['headers']
+        assert plain['headers']['ETag'] == etag[:-len('-gzip"')] + '"'
+
+    @patch('get_task.table')
+    def test_small_or_unaccepted_responses_are_not_compressed(self, mock_table):
+        """Test small bodies and clients without gzip support get plain JSON"""
+        from get_task import lambda_handler
+
+        mock_table.get_item = MagicMock(return_value={'Item': {'taskId': 'test-123'}})
+        event = {
+            'pathParameters': {'taskId': 'test-123'},
+            'headers': {'Accept-Encoding': 'gzip'}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert 'Content-Encoding' not in response['headers']
+        assert json.loads(response['body'])['task']['taskId'] == 'test-123'
+
+        from compression import negotiate_encoding
+        assert negotiate_encoding('gzip;q=0, br') is None
+        assert negotiate_encoding('*') == 'gzip'
+
+
+    @patch('get_task.table')
+    def test_list_tasks_multiple_statuses_merges_on_created_at(self, mock_table):
+        """Test several statuses are queried separately and merged oldest first across pages"""
+        from get_task import lambda_handler
+
+        tasks = {
+            'pending': [('p1', '2025-01-01'), ('p2', '2025-01-04'), ('p3', '2025-01-06')],
+            'in-progress': [('i1', '2025-01-02'), ('i2', '2025-01-03'), ('i3', '2025-01-05')]
+        }
+
+        def query(**kwargs):
+            status = kwargs['ExpressionAttributeValues'][':status']
+            items = [{'taskId': task_id, 'status': status, 'createdAt': created}
+                     for task_id, created in tasks[status]]
+            if 'ExclusiveStartKey' in kwargs:
+                start = kwargs['ExclusiveStartKey']['createdAt']
+                items = [item for item in items if item['createdAt'] > start]
+            page = items[:kwargs.get('Limit', len(items))]
+            response = {'Items': page}
+            if len(page) < len(items):
+                response['LastEvaluatedKey'] = {name: page[-1][name] for name in ('taskId', 'status', 'createdAt')}
+            return response
+
+        mock_table.query = MagicMock(side_effect=query)
+        params = {'status': 'pending,in-progress', 'limit': '4'}
+
+        body = json.loads(lambda_handler({'queryStringParameters': params}, {})['body'])
+
+        assert [task['taskId'] for task in body['tasks']] == ['p1', 'i1', 'i2', 'p2']
+        assert body['nextToken']
+        assert {call.kwargs['ExpressionAttributeValues'][':status'] for call in mock_table.query.call_args_list} == {
+            'pending', 'in-progress'
+        }
+        mock_table.scan.assert_not_called()
+
+        params['nextToken'] = body['nextToken']
+        body = json.loads(lambda_handler({'queryStringParameters': params}, {})['body'])
+
+        assert [task['taskId'] for task in body['tasks']] == ['i3', 'p3']
+        assert body['nextToken'] is None
+
+    @patch('get_task.table')
+    def test_list_tasks_created_window_uses_key_condition(self, mock_table):
+        """Test createdAfter/createdBefore narrow the status-index Query itself"""
+        from get_task import lambda_handler
+
+        mock_table.query = MagicMock(return_value={'Items': []})
+        params = {'status': 'pending', 'createdAfter': '2025-01-01', 'createdBefore': '2025-02-01'}
+
+        response = lambda_handler({'queryStringParameters': params}, {})
+
+        kwargs = mock_table.query.call_args.kwargs
+        assert response['statusCode'] == 200
+        assert kwargs['KeyConditionExpression'] == '#status = :status AND #createdAt BETWEEN :createdAfter AND :createdBefore'
+        assert kwargs['ExpressionAttributeValues'][':createdAfter'] == '2025-01-01'
+        assert 'FilterExpression' not in kwargs
+
+    def test_list_tasks_invalid_created_bound(self):
+        """Test malformed date bounds are rejected"""
+        from get_task import lambda_handler
+
+        response = lambda_handler({'queryStringParameters': {'createdAfter': 'yesterday'}}, {})
+
+        assert response['statusCode'] == 400
+        assert 'createdAfter' in json.loads(response['body'])['error']
+
+    @patch('get_task.scan_segments', 1)
+    @patch('get_task.table')
+    def test_list_tasks_sorted_top_k(self, mock_table):
+        """Test sorts no index covers are answered with a bounded top-K over the scan"""
+        from get_task import lambda_handler
+
+        mock_table.scan = MagicMock(return_value={'Items': [
+            {'taskId': '1', 'priority': 'low', 'dueDate': '2025-01-01'},
+            {'taskId': '2', 'priority': 'high', 'dueDate': '2025-01-01'},
+            {'taskId': '3', 'priority': 'high', 'dueDate': '2025-03-01'},
+            {'taskId': '4', 'priority': 'medium', 'dueDate': None},
+            {'taskId': '5', 'priority': 'high', 'dueDate': None}
+        ]})
+        params = {'sort': 'priority,-dueDate', 'limit': '4'}
+
+        body = json.loads(lambda_handler({'queryStringParameters': params}, {})['body'])
+
+        assert [task['taskId'] for task in body['tasks']] == ['3', '2', '5', '4']
+        assert body['sortSource'] == 'topK'
+        assert body['nextToken'] is None
+
+    @patch('get_task.table')
+    def test_list_tasks_sorted_by_index(self, mock_table):
+        """Test a createdAt sort on a status streams straight from the index"""
+        from get_task import lambda_handler
+
+        mock_table.query = MagicMock(return_value={'Items': [{'taskId': '2'}, {'taskId': '1'}]})
+        params = {'status': 'pending', 'sort': '-createdAt', 'limit': '2'}
+
+        body = json.loads(lambda_handler({'queryStringParameters': params}, {})['body'])
+
+        kwargs = mock_table.query.call_args.kwargs
+        assert body['sortSource'] == 'index'
+        assert kwargs['ScanIndexForward'] is False
+        assert kwargs['Limit'] == 2
+
+    def test_list_tasks_invalid_sort(self):
+        """Test sorting by an unknown field is rejected"""
+        from get_task import lambda_handler
+
+        response = lambda_handler({'queryStringParameters': {'sort': 'color'}}, {})
+
+        assert response['statusCode'] == 400
+
+class TestUpdateTask:
+    """Test cases for update_task Lambda function"""
+    
+    @patch('update_task.table')
+    def test_update_task_success(self, mock_table):
+        """Test successful task update"""
+        from update_task import lambda_handler
+        
+        # Mock update_item
+        mock_table.update_item = MagicMock(return_value={
+            'Attributes': {
+                'taskId': 'test-123',
+                'title': 'Updated Title',
+                'status': 'completed'
+            }
+        })
+        
+        event = {
+            'pathParameters': {'taskId': 'test-123'},
+            'body': json.dumps({
+                'title': 'Updated Title',
+                'status': 'completed'
+            })
+        }
+        
+        response = lambda_handler(event, {})
+        
+        assert response['statusCode'] == 200
+        body = json.loads(response['body'])
+        assert body['message'] == 'Task updated successfully'
+        mock_table.get_item.assert_not_called()
+        kwargs = mock_table.update_item.call_args.kwargs
+        assert kwargs['ConditionExpression'] == 'attribute_exists(taskId)'
+    
+    @patch('update_task.table')
+    def test_update_nonexistent_task(self, mock_table):
+        """Test updating non-existent task"""
+        from update_task import lambda_handler
+        
+        mock_table.update_item = MagicMock(side_effect=conditional_check_failed('UpdateItem'))
+        
+        event = {
+            'pathParameters': {'taskId': 'nonexistent'},
+            'body': json.dumps({'title': 'New Title'})
+        }
+        
+        response = lambda_handler(event, {})
+        
+        assert response['statusCode'] == 404
+
+
+class TestDeleteTask:
+    """Test cases for delete_task Lambda function"""
+    
+    @patch('delete_task.table')
+    def test_delete_task_success(self, mock_table):
+        """Test successful task deletion"""
+        from delete_task import lambda_handler
+        
+        mock_table.delete_item = MagicMock(return_value={
+            'Attributes': {'taskId': 'test-123', 'title': 'Old Task'}
+        })
+        
+        event = {
+            'pathParameters': {'taskId': 'test-123'}
+        }
+        
+        response = lambda_handler(event, {})
+        
+        assert response['statusCode'] == 200
+        body = json.loads(response['body'])
+        assert 'deleted successfully' in body['message']
+        assert body['task']['title'] == 'Old Task'
+        mock_table.get_item.assert_not_called()
+        kwargs = mock_table.delete_item.call_args.kwargs
+        assert kwargs['ConditionExpression'] == 'attribute_exists(taskId)'
+        assert kwargs['ReturnValues'] == 'ALL_OLD'
+    
+    @patch('delete_task.table')
+    def test_delete_nonexistent_task(self, mock_table):
+        """Test deleting non-existent task"""
+        from delete_task import lambda_handler
+        
+        mock_table.delete_item = MagicMock(side_effect=conditional_check_failed('DeleteItem'))
+        
+        event = {
+            'pathParameters': {'taskId': 'nonexistent'}
+        }
+        
+        response = lambda_handler(event, {})
+        
+        assert response['statusCode'] == 404
+
+
+class TestTaskStats:
+    """Test cases for the stream processor and stats Lambda functions"""
+
+    @patch('stream_processor.stats_table')
+    def test_stream_records_become_counter_deltas(self, mock_stats_table):
+        """Test old and new images are folded into one ADD update"""
+        from stream_processor import lambda_handler
+
+        def image(status, priority):
+            return {
+                'taskId': {'S': 'test-123'},
+                'status': {'S': status},
+                'priority': {'S': priority}
+            }
+
+        event = {
+            'Records': [
+                {'eventName': 'INSERT', 'dynamodb': {'NewImage': image('pending', 'high')}},
+                {'eventName': 'MODIFY', 'dynamodb': {
+                    'OldImage': image('pending', 'high'), 'NewImage': image('completed', 'high')
+                }},
+                {'eventName': 'MODIFY', 'dynamodb': {
+                    'OldImage': image('completed', 'high'), 'NewImage': image('completed', 'high')
+                }}
+            ]
+        }
+
+        lambda_handler(event, {})
+
+        kwargs = mock_stats_table.update_item.call_args.kwargs
+        deltas = {
+            kwargs['ExpressionAttributeNames'][f'#{name[1:]}']: value
+            for name, value in kwargs['ExpressionAttributeValues'].items()
+        }
+        assert mock_stats_table.update_item.call_count == 1
+        assert kwargs['UpdateExpression'].startswith('ADD ')
+        assert deltas == {
+            'total': 1,
+            'priority#high': 1,
+            'status#completed': 1,
+            'statusPriority#completed#high': 1
+        }
+
+    @patch('stream_processor.stats_table')
+    def test_stream_noop_batch_skips_write(self, mock_stats_table):
+        """Test a batch whose deltas cancel out does not touch the stats table"""
+        from stream_processor import lambda_handler
+
+        image = {'taskId': {'S': '1'}, 'status': {'S': 'pending'}, 'priority': {'S': 'low'}}
+        event = {'Records': [{'eventName': 'MODIFY', 'dynamodb': {'OldImage': image, 'NewImage': image}}]}
+
+        lambda_handler(event, {})
+
+        mock_stats_table.update_item.assert_not_called()
+
+    @patch('stream_processor.stats_table')
+    def test_backfill_replaces_summary_with_table_counts(self, mock_stats_table):
+        """Test the backfill counts existing tasks with a scan and overwrites the summary"""
+        from stream_processor import backfill
+
+        tasks_table = MagicMock()
+        tasks_table.scan = MagicMock(return_value={'Items': [
+            {'status': 'pending', 'priority': 'high'},
+            {'status': 'pending', 'priority': 'low'},
+            {'status': 'completed', 'priority': 'high'}
+        ]})
+
+        assert backfill(tasks_table, total_segments=1) == 3
+
+        summary = mock_stats_table.put_item.call_args.kwargs['Item']
+        assert summary['statsId'] == 'summary'
+        assert summary['status#pending'] == 2
+        assert summary['statusPriority#completed#high'] == 1
+        assert tasks_table.scan.call_args.kwargs['ProjectionExpression'] == '#status, #priority'
+
+    @patch('get_stats.stats_table')
+    def test_get_stats(self, mock_stats_table):
+        """Test the stats endpoint reshapes the summary item"""
+        from get_stats import lambda_handler
+
+        mock_stats_table.get_item = MagicMock(return_value={
+            'Item': {
+                'statsId': 'summary',
+                'total': 3,
+                'status#pending': 2,
+                'status#completed': 1,
+                'priority#high': 3,
+                'statusPriority#pending#high': 2,
+                'statusPriority#completed#high': 1
+            }
+        })
+
+        response = lambda_handler({}, {})
+
+        assert response['statusCode'] == 200
+        stats = json.loads(response['body'])['stats']
+        assert stats['total'] == 3
+        assert stats['byStatus'] == {'pending': 2, 'completed': 1}
+        assert stats['byStatusPriority']['pending'] == {'high': 2}
+
+
+class TestTagIndex:
+    """Test cases for tag index maintenance and tag queries"""
+
+    @patch('stream_processor.stats_table')
+    @patch('tag_index.tag_table')
+    def test_stream_maintains_tag_index(self, mock_tag_table, mock_stats_table):
+        """Test removed tags are deleted and changed or added tags rewritten"""
+        from stream_processor import lambda_handler
+
+        def image(status, tags):
+            return {
+                'taskId': {'S': 'test-123'},
+                'status': {'S': status},
+                'priority': {'S': 'high'},
+                'tags': {'L': [{'S': tag} for tag in tags]}
+            }
+
+        event = {'Records': [{'eventName': 'MODIFY', 'dynamodb': {
+            'OldImage': image('pending', ['ops', 'web']),
+            'NewImage': image('completed', ['web', 'infra'])
+        }}]}
+        mock_tag_table.batch_write_item = MagicMock(return_value=[])
+
+        lambda_handler(event, {})
+
+        requests = mock_tag_table.batch_write_item.call_args.args[0]
+        assert {'DeleteRequest': {'Key': {'tag': 'ops', 'taskId': 'test-123'}}} in requests
+        puts = {request['PutRequest']['Item']['tag']: request['PutRequest']['Item']
+                for request in requests if 'PutRequest' in request}
+        assert set(puts) == {'web', 'infra'}
+        assert puts['web']['status'] == 'completed'
+        assert len(requests) == 3
+
+    @patch('get_task.table')
+    @patch('tag_index.tag_table')
+    def test_list_tasks_by_tags(self, mock_tag_table, mock_table):
+        """Test AND and OR tag filters merge sorted posting lists and page by taskId"""
+        from get_task import lambda_handler
+
+        postings = {'ops': ['a', 'b', 'd', 'f'], 'web': ['b', 'c', 'd', 'e', 'f']}
+
+        def query(**kwargs):
+            values = kwargs['ExpressionAttributeValues']
+            ids = [task_id for task_id in postings[values[':tag']] if task_id > values.get(':after', '')]
+            return {'Items': [{'taskId': task_id} for task_id in ids]}
+
+        mock_tag_table.query = MagicMock(side_effect=query)
+        def batch_get_item(keys, **kwargs):
+            return [{
+                'taskId': key['taskId'],
+                'status': 'pending',
+                'tags': [tag for tag, ids in postings.items() if key['taskId'] in ids]
+            } for key in keys], []
+
+        mock_table.batch_get_item = MagicMock(side_effect=batch_get_item)
+
+        response = lambda_handler({'queryStringParameters': {'tag': 'web,ops', 'limit': '2'}}, {})
+
+        body = json.loads(response['body'])
+        assert response['statusCode'] == 200
+        assert [task['taskId'] for task in body['tasks']] == ['b', 'd']
+        mock_table.scan.assert_not_called()
+
+        params = {'tag': 'web,ops', 'limit': '2', 'nextToken': body['nextToken']}
+        body = json.loads(lambda_handler({'queryStringParameters': params}, {})['body'])
+        assert [task['taskId'] for task in body['tasks']] == ['f']
+        assert body['nextToken'] is None
+
+        params = {'tag': 'ops,web', 'tagMatch': 'any', 'status': 'pending'}
+        body = json.loads(lambda_handler({'queryStringParameters': params}, {})['body'])
+        assert [task['taskId'] for task in body['tasks']] == ['a', 'b', 'c', 'd', 'e', 'f']
+        assert mock_tag_table.query.call_args.kwargs['FilterExpression'] == '#status = :status'
+
+        params = {'tag': 'ops', 'status': 'pending,in-progress'}
+        lambda_handler({'queryStringParameters': params}, {})
+        assert mock_tag_table.query.call_args.kwargs['FilterExpression'] == '#status IN (:status0, :status1)'
+
+    @patch('get_task.table')
+    @patch('tag_index.tag_table')
+    def test_list_tasks_by_tags_drops_stale_index_entries(self, mock_tag_table, mock_table):
+        """Test tasks whose status, priority or tags changed since they were indexed are dropped"""
+        from get_task import lambda_handler
+
+        mock_tag_table.query.return_value = {'Items': [{'taskId': task_id} for task_id in 'abcd']}
+        mock_table.batch_get_item.return_value = ([
+            {'taskId': 'a', 'status': 'pending', 'priority': 'high', 'tags': ['ops']},
+            {'taskId': 'b', 'status': 'completed', 'priority': 'high', 'tags': ['ops']},
+            {'taskId': 'c', 'status': 'pending', 'priority': 'low', 'tags': ['ops']},
+            {'taskId': 'd', 'status': 'pending', 'priority': 'high', 'tags': ['web']}
+        ], [])
+
+        params = {'tag': 'ops', 'status': 'pending', 'priority': 'high', 'fields': 'taskId'}
+        body = json.loads(lambda_handler({'queryStringParameters': params}, {})['body'])
+
+        assert body['tasks'] == [{'taskId': 'a'}]
+        projected = mock_table.batch_get_item.call_args.kwargs['ExpressionAttributeNames'].values()
+        assert {'status', 'priority', 'tags'} <= set(projected)
+
+    @pytest.mark.parametrize('query', [
+        {'tag': 'ops', 'sort': 'priority'},
+        {'ids': 'a,b', 'sort': '-createdAt'},
+    ])
+    def test_sort_is_refused_for_tags_and_ids(self, query):
+        """Test sort is rejected rather than ignored where the results have a fixed order"""
+        from get_task import lambda_handler
+
+        response = lambda_handler({'queryStringParameters': query}, {})
+
+        assert response['statusCode'] == 400
+
+    def test_list_tasks_by_tags_rejects_created_window(self):
+        """Test a createdAt window is refused rather than silently ignored on the tag path"""
+        from get_task import lambda_handler
+
+        response = lambda_handler({'queryStringParameters': {'tag': 'ops', 'createdAfter': '2025-01-01'}}, {})
+
+        assert response['statusCode'] == 400
+
+    def test_list_tasks_by_tags_rejects_bad_match(self):
+        """Test an unknown tagMatch value is a client error"""
+        from get_task import lambda_handler
+
+        response = lambda_handler({'queryStringParameters': {'tag': 'ops', 'tagMatch': 'some'}}, {})
+
+        assert response['statusCode'] == 400
+
+
+class TestBulkJobs:
+    """Test cases for bulk update/delete jobs"""
+
+    @patch('bulk_tasks.start_runner')
+    @patch('bulk_tasks.jobs_table')
+    def test_bulk_update_starts_job(self, mock_jobs_table, mock_start_runner):
+        """Test a bulk update records a queued job and starts its runner"""
+        from bulk_tasks import lambda_handler
+
+        event = {
+            'resource': '/tasks/bulk-update',
+            'body': json.dumps({
+                'filter': {'status': 'pending', 'tag': 'ops'},
+                'patch': {'status': 'completed', 'taskId': 'ignored'}
+            })
+        }
+
+        response = lambda_handler(event, {})
+
+        job = mock_jobs_table.put_item.call_args.kwargs['Item']
+        assert response['statusCode'] == 202
+        assert job['state'] == 'queued'
+        assert job['patch'] == {'status': 'completed'}
+        assert response['headers']['Location'] == f"/tasks/jobs/{job['jobId']}"
+        mock_start_runner.assert_called_once_with(job['jobId'])
+
+    def test_bulk_delete_requires_filter(self):
+        """Test bulk jobs refuse an empty filter"""
+        from bulk_tasks import lambda_handler
+
+        response = lambda_handler({'resource': '/tasks/bulk-delete', 'body': json.dumps({'filter': {}})}, {})
+
+        assert response['statusCode'] == 400
+
+    @patch('bulk_jobs.jobs_table')
+    @patch('bulk_jobs.table')
+    def test_run_update_job_checkpoints_results(self, mock_table, mock_jobs_table):
+        """Test matching tasks get conditional updates and the outcome is checkpointed"""
+        from bulk_jobs import new_job, run_job
+
+        job = new_job('update', {'status': 'pending', 'priority': 'low'}, {'priority': 'high'})
+        mock_jobs_table.get_item = MagicMock(return_value={'Item': job})
+        mock_jobs_table.update_item = MagicMock(side_effect=lambda **kwargs: {
+            'Attributes': dict(job, state=kwargs['ExpressionAttributeValues'][':state'])
+        })
+        mock_table.query = MagicMock(return_value={'Items': [{'taskId': '1'}, {'taskId': '2'}]})
+        mock_table.update_item = MagicMock(side_effect=[{}, conditional_check_failed('UpdateItem')])
+
+        result = run_job(job['jobId'])
+
+        query = mock_table.query.call_args.kwargs
+        update = mock_table.update_item.call_args_list[0].kwargs
+        values = mock_jobs_table.update_item.call_args.kwargs['ExpressionAttributeValues']
+        assert query['IndexName'] == 'status-index'
+        assert query['ProjectionExpression'] == '#p_taskId'
+        assert update['ConditionExpression'] == (
+            'attribute_exists(taskId) AND #f_status IN (:f_status0) AND #f_priority = :f_priority'
+        )
+        assert update['ExpressionAttributeValues'][':priority'] == 'high'
+        assert (values[':succeeded'], values[':skipped'], values[':failed']) == (1, 1, 0)
+        assert values[':cursor'] is None
+        assert result['state'] == 'completed'
+
+    @patch('tag_index.tag_table')
+    def test_tag_job_matches_any_listed_status(self, mock_tag_table):
+        """Test a tag filter with several statuses reads the posting list with an IN filter"""
+        from bulk_jobs import key_pages
+
+        mock_tag_table.query = MagicMock(return_value={'Items': [{'taskId': '1'}, {'taskId': '2'}]})
+
+        pages = list(key_pages({'tag': 'ops', 'status': ['pending', 'in-progress']}))
+
+        query = mock_tag_table.query.call_args.kwargs
+        assert pages == [(['1', '2'], None)]
+        assert query['FilterExpression'] == '#status IN (:status0, :status1)'
+        assert query['ExpressionAttributeValues'][':status1'] == 'in-progress'
+
+    @patch('bulk_jobs.start_runner')
+    @patch('bulk_jobs.jobs_table')
+    @patch('bulk_jobs.table')
+    def test_run_delete_job_hands_over_near_timeout(self, mock_table, mock_jobs_table, mock_start_runner):
+        """Test a job saves its cursor and re-invokes itself when time runs short"""
+        from bulk_jobs import new_job, run_job
+
+        job = new_job('delete', {'priority': 'low'})
+        mock_jobs_table.get_item = MagicMock(return_value={'Item': job})
+        mock_jobs_table.update_item = MagicMock(side_effect=lambda **kwargs: {
+            'Attributes': dict(job, state=kwargs['ExpressionAttributeValues'][':state'], matched=2)
+        })
+        mock_table.scan = MagicMock(return_value={
+            'Items': [{'taskId': '1'}, {'taskId': '2'}],
+            'LastEvaluatedKey': {'taskId': '2'}
+        })
+        mock_table.delete_item = MagicMock(side_effect=[{}, conditional_check_failed('DeleteItem')])
+        context = MagicMock(function_name='dev-bulk-job-runner')
+        context.get_remaining_time_in_millis.return_value = 1000
+
+        result = run_job(job['jobId'], context)
+
+        values = mock_jobs_table.update_item.call_args.kwargs['ExpressionAttributeValues']
+        assert values[':cursor'] == {'read': 0, 'key': {'taskId': '2'}}
+        assert values[':state'] == 'running'
+        assert result['state'] == 'running'
+        # Deletes re-check the filter, and a task that stopped matching is skipped
+        delete = mock_table.delete_item.call_args_list[0].kwargs
+        assert delete['Key'] == {'taskId': '1'}
+        assert delete['ConditionExpression'] == 'attribute_exists(taskId) AND #f_priority = :f_priority'
+        assert (values[':succeeded'], values[':skipped'], values[':failed']) == (1, 1, 0)
+        mock_start_runner.assert_called_once_with(job['jobId'], 'dev-bulk-job-runner')
+
+
+class TestArchive:
+    """Test cases for expiring completed tasks and reading them from the archive"""
+
+    @staticmethod
+    def expiry_record(event_id, task):
+        from runtime import serialize_item
+        return {
+            'eventID': event_id,
+            'eventName': 'REMOVE',
+            'userIdentity': {'type': 'Service', 'principalId': 'dynamodb.amazonaws.com'},
+            'dynamodb': {'OldImage': serialize_item(task), 'ApproximateCreationDateTime': 1760000000}
+        }
+
+    def test_completion_stamps_and_reopening_clears_ttl(self):
+        """Test completing a task sets expiresAt and any other status removes it"""
+        from update_task import build_update
+
+        expression, names, values = build_update({'status': 'completed'})
+        assert '#expiresAt = :expiresAt' in expression
+        assert values[':expiresAt'] > datetime.utcnow().timestamp()
+
+        expression, names, values = build_update({'status': 'pending'})
+        assert expression.endswith(' REMOVE #expiresAt')
+        assert ':expiresAt' not in values
+
+        expression, names, values = build_update({'title': 'Renamed'})
+        assert 'expiresAt' not in expression
+
+    @patch('create_task.table')
+    def test_ttl_is_stored_but_never_returned(self, mock_table):
+        """Test expiresAt is written with a completed task but kept out of API responses"""
+        from codec import EncodedTable
+        from create_task import lambda_handler
+
+        response = lambda_handler({'body': json.dumps({'title': 'Done', 'status': 'completed'})}, {})
+
+        assert 'expiresAt' in mock_table.put_item.call_args.kwargs['Item']
+        assert 'expiresAt' not in json.loads(response['body'])['task']
+
+        stored = {'taskId': '1', 'status': 'completed', 'expiresAt': 4102444800}
+        raw = MagicMock()
+        raw.get_item = MagicMock(return_value={'Item': dict(stored)})
+        raw.batch_write_item = MagicMock(side_effect=lambda requests: requests)
+        table = EncodedTable(raw)
+        assert 'expiresAt' not in table.get_item(Key={'taskId': '1'})['Item']
+        # Unprocessed puts come back with their TTL so a retry keeps it
+        unprocessed = table.batch_write_item([{'PutRequest': {'Item': stored}}])
+        assert unprocessed[0]['PutRequest']['Item']['expiresAt'] == 4102444800
+
+    def test_archiver_writes_only_ttl_deletions(self, tmp_path):
+        """Test expired tasks are archived per creation date and user deletes are ignored"""
+        from archive import LocalArchive, archive_records, read_archived
+        from runtime import serialize_item
+
+        store = LocalArchive(str(tmp_path))
+        task = {'taskId': '1', 'status': 'completed', 'createdAt': '2025-01-02T10:00:00', 'tags': ['ops']}
+        user_delete = {
+            'eventID': 'e2',
+            'eventName': 'REMOVE',
+            'dynamodb': {'OldImage': serialize_item(dict(task, taskId='2'))}
+        }
+
+        assert archive_records([self.expiry_record('e1', task), user_delete], store) == 1
+        # A retried batch rewrites the same object rather than duplicating it
+        archive_records([self.expiry_record('e1', task)], store)
+
+        archived = list(read_archived(store, ['2025-01-02']))
+        assert len(archived) == 1
+        assert archived[0][0].startswith('created=2025-01-02/')
+        assert archived[0][2]['taskId'] == '1'
+        assert 'archivedAt' in archived[0][2]
+
+    @patch('get_task.table')
+    def test_list_archived_tasks_pages_through_window(self, mock_table, tmp_path):
+        """Test ?archived=true reads only the window's partitions and filters and pages the tasks"""
+        from archive import LocalArchive, archive_records
+        from get_task import lambda_handler
+
+        store = LocalArchive(str(tmp_path))
+        archive_records([
+            self.expiry_record(f'e{index}', {
+                'taskId': str(index),
+                'status': 'completed',
+                'priority': 'high' if index % 2 else 'low',
+                'createdAt': f'2025-01-0{index}T10:00:00'
+            })
+            for index in range(1, 6)
+        ], store)
+        query = {
+            'archived': 'true', 'priority': 'high', 'limit': '1',
+            'createdAfter': '2025-01-01', 'createdBefore': '2025-01-04T23:59:59'
+        }
+
+        with patch('get_task.get_archive', return_value=store):
+            first = json.loads(lambda_handler({'queryStringParameters': query}, {})['body'])
+            second = json.loads(lambda_handler({
+                'queryStringParameters': dict(query, nextToken=first['nextToken'])
+            }, {})['body'])
+
+        assert [task['taskId'] for task in first['tasks']] == ['1']
+        assert [task['taskId'] for task in second['tasks']] == ['3']
+        assert second['nextToken'] is None
+        assert first['source'] == 'archive'
+        mock_table.query.assert_not_called()
+        mock_table.scan.assert_not_called()
+
+    def test_archived_listing_requires_window(self):
+        """Test archived reads must name a bounded createdAt window"""
+        from get_task import lambda_handler
+
+        missing = lambda_handler({'queryStringParameters': {'archived': 'true'}}, {})
+        too_wide = lambda_handler({'queryStringParameters': {
+            'archived': 'true', 'createdAfter': '2025-01-01', 'createdBefore': '2025-03-01'
+        }}, {})
+
+        assert missing['statusCode'] == 400
+        assert too_wide['statusCode'] == 400
+
+
+class TestDueIndex:
+    """Test cases for the sparse due-date index"""
+
+    @staticmethod
+    def due_query(tasks):
+        """Fake a due-index Query over `tasks`, honouring the shard, bounds and start key"""
+        from due_index import due_bucket
+
+        def query(**kwargs):
+            values = kwargs['ExpressionAttributeValues']
+            start = kwargs.get('ExclusiveStartKey')
+            items = sorted(
+                (task for task in tasks
+                 if due_bucket(task['taskId']) == values[':dueBucket']
+                 and values.get(':dueAfter', '') <= task['dueDate'] <= values.get(':dueBefore', '\uffff')),
+                key=lambda task: (task['dueDate'], task['taskId'])
+            )
+            if start:
+                items = [task for task in items if (task['dueDate'], task['taskId']) > (start['dueKey'], start['taskId'])]
+            return {'Items': items}
+        return query
+
+    def test_patch_maintains_index_attributes(self):
+        """Test status and dueDate changes set or remove the index keys in the same write"""
+        from due_index import due_bucket
+        from update_task import build_update
+
+        expression, names, values = build_update({'status': 'pending', 'dueDate': '2025-03-01'}, task_id='1')
+        assert '#dueKey = :dueKey' in expression and '#dueBucket = :dueBucket' in expression
+        assert values[':dueBucket'] == due_bucket('1')
+        assert values[':dueKey'] == '2025-03-01'
+
+        expression, names, values = build_update({'status': 'completed', 'dueDate': None}, task_id='1')
+        assert expression.count('REMOVE') == 1
+        assert expression.endswith(' REMOVE #dueKey, #dueBucket')
+        assert names['#dueBucket'] == 'dueBucket'
+
+        expression, names, values = build_update({'title': 'Renamed'}, task_id='1')
+        assert 'due' not in expression
+
+    def test_items_carry_index_attributes_only_while_open(self):
+        """Test whole items are indexed when open with a due date and the keys never reach clients"""
+        from codec import decode_item, encode_item
+
+        task = {'taskId': '1', 'status': 'pending', 'dueDate': '2025-03-01', 'createdAt': '2025-01-01T00:00:00'}
+
+        assert {'dueBucket', 'dueKey'} <= set(encode_item(task))
+        assert 'dueBucket' not in encode_item(dict(task, status='completed'))
+        assert 'dueKey' not in encode_item(dict(task, dueDate=None))
+        assert decode_item(encode_item(task)) == task
+
+    @patch('get_task.table')
+    def test_due_query_merges_shards_and_pages(self, mock_table):
+        """Test ?dueBefore= reads only the due-index shards and pages in dueDate order"""
+        from get_task import lambda_handler
+
+        tasks = [
+            {'taskId': f'task-{index}', 'status': 'pending', 'dueDate': f'2025-03-{index + 1:02d}'}
+            for index in range(8)
+        ]
+        mock_table.query = MagicMock(side_effect=self.due_query(tasks))
+        query = {'dueAfter': '2025-03-02', 'dueBefore': '2025-03-06', 'limit': '3'}
+
+        first = json.loads(lambda_handler({'queryStringParameters': query}, {})['body'])
+        second = json.loads(lambda_handler({
+            'queryStringParameters': dict(query, nextToken=first['nextToken'])
+        }, {})['body'])
+
+        assert [task['dueDate'] for task in first['tasks']] == ['2025-03-02', '2025-03-03', '2025-03-04']
+        assert [task['dueDate'] for task in second['tasks']] == ['2025-03-05', '2025-03-06']
+        assert second['nextToken'] is None
+        for call in mock_table.query.call_args_list:
+            assert call.kwargs['IndexName'] == 'due-index'
+            assert call.kwargs['KeyConditionExpression'] == (
+                '#dueBucket = :dueBucket AND #dueKey BETWEEN :dueAfter AND :dueBefore'
+            )
+        mock_table.scan.assert_not_called()
+
+    @pytest.mark.parametrize('query', [
+        {'dueBefore': 'next week'},
+        {'dueAfter': '2025-03-02', 'dueBefore': '2025-03-01'},
+        {'dueBefore': '2025-03-01', 'sort': 'priority'},
+        {'dueBefore': '2025-03-01', 'tag': 'ops'},
+    ])
+    def test_due_query_rejects_invalid_requests(self, query):
+        """Test malformed bounds, other sorts and tag filters are rejected"""
+        from get_task import lambda_handler
+
+        response = lambda_handler({'queryStringParameters': query}, {})
+
+        assert response['statusCode'] == 400
+
+
+class TestExportTasks:
+    """Test cases for the export_tasks Lambda function"""
+
+    @patch('export_tasks.table')
+    def test_export_status_query_to_gzip_file(self, mock_table, tmp_path):
+        """Test a status export pages the GSI and writes gzipped NDJSON"""
+        from export_tasks import FileSink, export_tasks
+
+        mock_table.query = MagicMock(side_effect=[
+            {'Items': [{'taskId': '1', 'points': 2}], 'LastEvaluatedKey': {'taskId': '1'}},
+            {'Items': [{'taskId': '2', 'points': 3}]}
+        ])
+        path = tmp_path / 'tasks.ndjson.gz'
+
+        stats = export_tasks(FileSink(str(path)), status='pending', compress=True)
+
+        lines = gzip.decompress(path.read_bytes()).decode('utf-8').splitlines()
+        assert stats['count'] == 2
+        assert [json.loads(line) for line in lines] == [{'taskId': '1', 'points': 2}, {'taskId': '2', 'points': 3}]
+        assert mock_table.query.call_args_list[0].kwargs['IndexName'] == 'status-index'
+        assert mock_table.query.call_args_list[1].kwargs['ExclusiveStartKey'] == {'taskId': '1'}
+        mock_table.scan.assert_not_called()
+
+    @patch('export_tasks.table')
+    def test_export_several_statuses(self, mock_table, tmp_path):
+        """Test comma-separated statuses export each status's Query in turn"""
+        from export_tasks import FileSink, export_tasks
+
+        mock_table.query = MagicMock(side_effect=lambda **kwargs: {'Items': [
+            {'taskId': kwargs['ExpressionAttributeValues'][':status']}
+        ]})
+        path = tmp_path / 'tasks.ndjson'
+
+        stats = export_tasks(FileSink(str(path)), status='pending,in-progress')
+
+        assert stats['count'] == 2
+        assert [json.loads(line)['taskId'] for line in path.read_text().splitlines()] == ['pending', 'in-progress']
+        mock_table.scan.assert_not_called()
+
+    @patch('export_tasks.table')
+    def test_export_streams_to_s3_multipart(self, mock_table):
+        """Test the S3 sink uploads parts as chunks arrive and completes the upload"""
+        from export_tasks import S3Sink, export_tasks
+
+        mock_table.scan = MagicMock(return_value={'Items': [{'taskId': str(i)} for i in range(50)]})
+        s3 = MagicMock()
+        s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        s3.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+
+        with patch('export_tasks.scan_segments', 1):
+            stats = export_tasks(S3Sink('bucket', 'tasks.ndjson', client=s3, part_bytes=100))
+
+        parts = s3.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+        body = b''.join(call.kwargs['Body'] for call in s3.upload_part.call_args_list)
+        assert stats['count'] == 50
+        assert len(body.splitlines()) == 50
+        assert parts[0] == {'ETag': 'etag-1', 'PartNumber': 1}
+        s3.abort_multipart_upload.assert_not_called()
+
+
+class TestImportTasks:
+    """Test cases for the bulk task importer"""
+
+    @patch('import_tasks.table')
+    def test_import_validates_batches_and_checkpoints(self, mock_table, tmp_path):
+        """Test valid rows are written in 25-item batches and invalid ones rejected"""
+        import io
+        from import_tasks import Checkpoint, import_tasks, read_rows
+
+        lines = [json.dumps({'title': f'Task {i}', 'priority': 'high'}) for i in range(30)]
+        lines.insert(3, json.dumps({'description': 'no title'}))
+        lines.insert(7, '{not json')
+        mock_table.batch_write_item = MagicMock(return_value=[])
+        rejects = io.StringIO()
+        checkpoint = Checkpoint(str(tmp_path / 'import.ckpt'), source='tasks.ndjson')
+
+        result = import_tasks(read_rows(io.StringIO('\n'.join(lines))), checkpoint, workers=2, rejects=rejects)
+
+        written = [call.args[0] for call in mock_table.batch_write_item.call_args_list]
+        assert sorted(len(requests) for requests in written) == [5, 25]
+        assert result['written'] == 30
+        assert result['rejected'] == 2
+        assert result['line'] == 32
+        assert [json.loads(line)['line'] for line in rejects.getvalue().splitlines()] == [4, 8]
+        assert json.loads((tmp_path / 'import.ckpt').read_text())['line'] == 32
+        task = written[0][0]['PutRequest']['Item']
+        assert task['status'] == 'pending' and task['priority'] == 'high'
+
+    @patch('import_tasks.table')
+    def test_import_rejects_bad_created_at_on_its_own(self, mock_table):
+        """Test a malformed createdAt rejects only its row, not the batch it would have joined"""
+        import io
+        from import_tasks import Checkpoint, import_tasks, read_rows
+
+        rows = [
+            {'title': 'Kept', 'createdAt': '2024-05-01T09:30:00'},
+            {'title': 'Number', 'createdAt': 1714555800},
+            {'title': 'Basic format', 'createdAt': '20240501'},
+            {'title': 'Prose', 'createdAt': 'last tuesday'},
+            {'title': 'Defaulted'}
+        ]
+        mock_table.batch_write_item = MagicMock(return_value=[])
+        rejects = io.StringIO()
+
+        result = import_tasks(
+            read_rows(io.StringIO('\n'.join(json.dumps(row) for row in rows))), Checkpoint(), workers=1, rejects=rejects
+        )
+
+        written = [request['PutRequest']['Item'] for request in mock_table.batch_write_item.call_args.args[0]]
+        assert result['written'] == 2 and result['rejected'] == 3
+        assert written[0]['createdAt'] == '2024-05-01T09:30:00'
+        assert [json.loads(line)['line'] for line in rejects.getvalue().splitlines()] == [2, 3, 4]
+
+    @patch('import_tasks.table')
+    def test_import_resumes_with_stable_task_ids(self, mock_table, tmp_path):
+        """Test a resumed import skips finished rows and rewrites the rest under the same ids"""
+        import io
+        from import_tasks import Checkpoint, import_task, import_tasks, read_rows
+
+        source = '\n'.join(json.dumps({'title': f'Task {i}'}) for i in range(10))
+        path = str(tmp_path / 'import.ckpt')
+        checkpoint = Checkpoint(path, source='tasks.ndjson')
+        checkpoint.state['line'] = 6
+        checkpoint.save()
+        mock_table.batch_write_item = MagicMock(return_value=[])
+
+        resumed = Checkpoint(path, source='tasks.ndjson')
+        import_tasks(read_rows(io.StringIO(source)), resumed, workers=1)
+
+        requests = mock_table.batch_write_item.call_args.args[0]
+        ids = [request['PutRequest']['Item']['taskId'] for request in requests]
+        assert len(ids) == 4
+        assert ids[0] == import_task({'title': 'Task 6'}, checkpoint.state['importId'], 7)['taskId']
+
+    def test_write_batch_backs_off_when_throttled(self):
+        """Test throttling errors and unprocessed items are retried and slow the pool down"""
+        from import_tasks import AdaptiveThrottle, write_batch
+
+        requests = [{'PutRequest': {'Item': {'taskId': str(i)}}} for i in range(3)]
+        throttling = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'slow down'}},
+            'BatchWriteItem'
+        )
+        mock_table = MagicMock()
+        mock_table.batch_write_item = MagicMock(side_effect=[throttling, requests[2:], []])
+        throttle = AdaptiveThrottle()
+
+        with patch('import_tasks.time.sleep'):
+            written, failed = write_batch(mock_table, requests, throttle)
+
+        assert (written, failed) == (3, [])
+        assert throttle.throttled == 2
+        assert mock_table.batch_write_item.call_args.args[0] == requests[2:]
+
+
+class TestRouter:
+    """Test cases for the consolidated router Lambda function"""
+
+    @patch('delete_task.table')
+    def test_router_dispatches_on_method_and_resource(self, mock_table):
+        """Test requests reach the handler registered for their route"""
+        from router import lambda_handler
+
+        mock_table.delete_item = MagicMock(return_value={'Attributes': {'taskId': 'test-123'}})
+
+        event = {
+            'httpMethod': 'DELETE',
+            'resource': '/tasks/{taskId}',
+            'pathParameters': {'taskId': 'test-123'}
+        }
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 200
+        assert mock_table.delete_item.call_args.kwargs['Key'] == {'taskId': 'test-123'}
+
+    def test_router_unknown_routes(self):
+        """Test unsupported methods get 405 with Allow and unknown resources 404"""
+        from router import lambda_handler
+
+        response = lambda_handler({'httpMethod': 'PATCH', 'resource': '/tasks/{taskId}'}, {})
+
+        assert response['statusCode'] == 405
+        assert response['headers']['Allow'] == 'DELETE, GET, PUT'
+
+        response = lambda_handler({'httpMethod': 'GET', 'resource': '/projects'}, {})
+
         assert response['statusCode'] == 404
 
 
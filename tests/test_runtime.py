@@ -0,0 +1,258 @@
+import json
+import pytest
+import os
+import sys
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'handlers'))
+
+
+class TestRuntime:
+    """Test cases for the shared handler runtime"""
+
+    def test_serialize_round_trip(self):
+        """Test Python values survive conversion to and from DynamoDB attributes"""
+        from runtime import deserialize_item, serialize_item
+
+        item = {
+            'taskId': 'test-123',
+            'title': 'Test Task',
+            'points': Decimal('3'),
+            'done': False,
+            'dueDate': None,
+            'tags': ['a', 'b'],
+            'meta': {'estimate': Decimal('1.5')}
+        }
+
+        encoded = serialize_item(item)
+
+        assert encoded['taskId'] == {'S': 'test-123'}
+        assert encoded['points'] == {'N': '3'}
+        assert encoded['dueDate'] == {'NULL': True}
+        assert encoded['tags'] == {'L': [{'S': 'a'}, {'S': 'b'}]}
+        assert deserialize_item(encoded) == item
+
+    @patch('runtime.get_client')
+    def test_table_converts_requests_and_responses(self, mock_get_client):
+        """Test Table speaks plain Python values on top of the low-level client"""
+        from runtime import Table
+
+        client = MagicMock()
+        client.query.return_value = {
+            'Items': [{'taskId': {'S': '1'}, 'status': {'S': 'pending'}}],
+            'LastEvaluatedKey': {'taskId': {'S': '1'}}
+        }
+        mock_get_client.return_value = client
+
+        result = Table('tasks').query(
+            IndexName='status-index',
+            KeyConditionExpression='#status = :status',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':status': 'pending'}
+        )
+
+        kwargs = client.query.call_args.kwargs
+        assert kwargs['TableName'] == 'tasks'
+        assert kwargs['ExpressionAttributeValues'] == {':status': {'S': 'pending'}}
+        assert result['Items'] == [{'taskId': '1', 'status': 'pending'}]
+        assert result['LastEvaluatedKey'] == {'taskId': '1'}
+
+    def test_client_is_created_lazily_once(self):
+        """Test the shared client is only built on first use and then reused"""
+        import runtime
+
+        with patch.object(runtime, '_client', None), patch('runtime.boto3') as mock_boto3:
+            assert runtime._client is None
+            first = runtime.get_client()
+            second = runtime.get_client()
+
+        assert first is second
+        mock_boto3.client.assert_called_once_with('dynamodb', config=runtime.CLIENT_CONFIG)
+
+    def test_build_response(self):
+        """Test the response builder adds the standard headers"""
+        from runtime import build_response
+
+        response = build_response(201, {'task': {'points': Decimal('2')}}, {'ETag': '"abc"'})
+
+        assert response['statusCode'] == 201
+        assert response['headers']['Access-Control-Allow-Origin'] == '*'
+        assert response['headers']['ETag'] == '"abc"'
+        assert json.loads(response['body']) == {'task': {'points': 2}}
+
+    def test_dumps_encodes_decimals_as_numbers(self):
+        """Test DynamoDB numbers are emitted as JSON numbers, with and without orjson"""
+        import serialization
+
+        body = {'tasks': [{'points': Decimal('3'), 'estimate': Decimal('1.5'), 'tags': {'b', 'a'}}]}
+        expected = {'tasks': [{'points': 3, 'estimate': 1.5, 'tags': ['a', 'b']}]}
+
+        assert json.loads(serialization.dumps(body)) == expected
+        with patch.object(serialization, 'orjson', None):
+            encoded = serialization.dumps(body)
+        assert encoded == '{"tasks":[{"points":3,"estimate":1.5,"tags":["a","b"]}]}'
+
+    @patch('runtime.get_client')
+    def test_dynamodb_calls_are_not_recorded_when_idle(self, mock_get_client):
+        """Test no consumed capacity is requested outside an instrumented invocation"""
+        from runtime import Table
+
+        mock_get_client.return_value.get_item.return_value = {}
+
+        Table('tasks').get_item(Key={'taskId': 'test-123'})
+
+        assert 'ReturnConsumedCapacity' not in mock_get_client.return_value.get_item.call_args.kwargs
+
+    @patch('runtime.get_client')
+    def test_invocation_emits_embedded_metrics(self, mock_get_client, capsys):
+        """Test an instrumented invocation records phases and capacity as one EMF line"""
+        import instrumentation
+        from runtime import Table, build_response, load_body
+
+        mock_get_client.return_value.put_item.return_value = {
+            'ConsumedCapacity': {'TableName': 'tasks', 'CapacityUnits': 1.0}
+        }
+
+        with patch.object(instrumentation, '_cold_start', True):
+            with instrumentation.Invocation('create_task') as invocation:
+                load_body({'body': '{"title": "Test"}'})
+                Table('tasks').put_item(Item={'taskId': 'test-123'})
+                build_response(201, {'taskId': 'test-123'})
+                invocation.status_code = 201
+
+        request = mock_get_client.return_value.put_item.call_args.kwargs
+        assert request['ReturnConsumedCapacity'] == 'TOTAL'
+
+        document = json.loads(capsys.readouterr().out)
+        metric_names = {metric['Name'] for metric in document['_aws']['CloudWatchMetrics'][0]['Metrics']}
+        assert document['Handler'] == 'create_task'
+        assert document['statusCode'] == 201
+        assert document['ColdStart'] == 1
+        assert document['DynamoDBCalls'] == 1
+        assert document['ConsumedWriteCapacity'] == 1.0
+        assert document['ConsumedReadCapacity'] == 0.0
+        assert {'Duration', 'ParseTime', 'DynamoDBTime', 'EncodeTime'} <= metric_names
+        assert instrumentation.current() is None
+
+
+    def test_emf_line_stays_bounded_for_many_calls(self):
+        """Test thousands of round trips are emitted as per-operation totals plus a capped sample"""
+        import instrumentation
+
+        invocation = instrumentation.Invocation('bulk_jobs')
+        for _ in range(5000):
+            invocation.add_call('update_item', 2.0, {'TableName': 'tasks', 'CapacityUnits': 1.0})
+        invocation.add_call('query', 4.0, None)
+
+        document = invocation.to_emf(100.0)
+
+        assert len(json.dumps(document)) < 4096
+        assert document['DynamoDBCalls'] == 5001
+        assert document['dynamodbOperations']['update_item'] == {'count': 5000, 'ms': 10000.0, 'capacityUnits': 5000.0}
+        assert len(document['dynamodbCalls']) == instrumentation.MAX_CALL_DETAILS
+        assert document['ConsumedWriteCapacity'] == 5000.0
+
+    def test_function_package_ships_orjson(self):
+        """Test the functions' own requirements pin the same orjson the tests run with"""
+        root = os.path.join(os.path.dirname(__file__), '..')
+
+        def pins(path):
+            with open(os.path.join(root, path)) as f:
+                return {line.split('==')[0]: line.strip() for line in f if '==' in line and not line.startswith('#')}
+
+        assert pins('src/handlers/requirements.txt')['orjson'] == pins('requirements.txt')['orjson']
+
+    def test_write_handlers_do_not_load_export_or_archive(self):
+        """Test the write handlers' cold start stays clear of the export and archive modules"""
+        import subprocess
+
+        handlers = os.path.join(os.path.dirname(__file__), '..', 'src', 'handlers')
+        code = (
+            'import sys, create_task, update_task; '
+            "print(sorted({'archive', 'export_tasks', 'argparse'} & set(sys.modules)))"
+        )
+        env = dict(os.environ, PYTHONPATH=handlers, AWS_DEFAULT_REGION='us-east-1')
+        output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+
+        assert output.strip() == '[]'
+
+class TestCodec:
+    """Test cases for the compact task item encoding"""
+
+    def test_round_trip_compacts_item(self):
+        """Test long descriptions and timestamps are stored compactly and read back unchanged"""
+        from codec import decode_item, encode_item
+
+        task = {
+            'taskId': 'test-123',
+            'title': 'Write report',
+            'description': 'quarterly numbers and notes ' * 40,
+            'status': 'pending',
+            'priority': 'high',
+            'createdAt': '2025-01-02T10:00:00.123456',
+            'updatedAt': '2025-01-02T10:00:00.123456',
+            'tags': ['ops']
+        }
+
+        stored = encode_item(task)
+
+        # Open tasks also carry their due-index shard, which is dropped again on read
+        assert set(stored) == {'taskId', 't', 'd', 'status', 'priority', 'createdAt', 'u', 'tags', 'dueBucket'}
+        assert isinstance(stored['d'], bytes) and len(stored['d']) < len(task['description'])
+        assert isinstance(stored['u'], int)
+        assert stored['createdAt'] == task['createdAt']
+        assert decode_item(dict(stored, u=Decimal(stored['u']))) == task
+
+    def test_timestamps_that_do_not_round_trip_stay_strings(self):
+        """Test only naive isoformat timestamps are turned into numbers"""
+        from codec import compact_timestamp, expand_timestamp
+
+        assert expand_timestamp(compact_timestamp('2025-01-02T10:00:00')) == '2025-01-02T10:00:00'
+        assert compact_timestamp('2025-01-02T10:00:00Z') == '2025-01-02T10:00:00Z'
+        assert compact_timestamp('2025-01-02') == '2025-01-02'
+
+    def test_encoded_table_rewrites_requests(self):
+        """Test names, SET values and projections are mapped and legacy attributes migrated on write"""
+        from codec import EncodedTable
+
+        inner = MagicMock()
+        inner.update_item.return_value = {'Attributes': {'taskId': 'test-123', 't': 'New', 'u': 1735812000000000}}
+        inner.get_item.return_value = {'Item': {'taskId': 'test-123', 'title': 'Legacy'}}
+        table = EncodedTable(inner)
+
+        updated = table.update_item(
+            Key={'taskId': 'test-123'},
+            UpdateExpression='SET #title = :title, #updatedAt = :updatedAt REMOVE #expiresAt',
+            ConditionExpression='attribute_exists(taskId)',
+            ExpressionAttributeNames={'#title': 'title', '#updatedAt': 'updatedAt', '#expiresAt': 'expiresAt'},
+            ExpressionAttributeValues={':title': 'New', ':updatedAt': '2025-01-02T10:00:00'},
+            ReturnValues='ALL_NEW'
+        )
+        legacy = table.get_item(
+            Key={'taskId': 'test-123'},
+            ProjectionExpression='#p_title',
+            ExpressionAttributeNames={'#p_title': 'title'}
+        )
+
+        request = inner.update_item.call_args.kwargs
+        assert request['UpdateExpression'] == (
+            'SET #title = :title, #updatedAt = :updatedAt REMOVE #title_legacy, #updatedAt_legacy, #expiresAt'
+        )
+        assert request['ExpressionAttributeNames']['#title'] == 't'
+        assert request['ExpressionAttributeNames']['#title_legacy'] == 'title'
+        assert request['ExpressionAttributeValues'][':updatedAt'] == 1735812000000000
+        assert updated['Attributes'] == {'taskId': 'test-123', 'title': 'New', 'updatedAt': '2025-01-02T10:00:00'}
+        assert inner.get_item.call_args.kwargs['ProjectionExpression'] == '#p_title, #p_title_legacy'
+        assert legacy['Item']['title'] == 'Legacy'
+
+    def test_encoded_attributes_cannot_be_filtered(self):
+        """Test filtering on a renamed attribute fails loudly instead of missing older items"""
+        from codec import EncodedTable
+
+        table = EncodedTable(MagicMock())
+
+        with pytest.raises(ValueError):
+            table.scan(FilterExpression='#title = :title', ExpressionAttributeNames={'#title': 'title'},
+                       ExpressionAttributeValues={':title': 'x'})